@@ -0,0 +1,192 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+from dotenv import load_dotenv, find_dotenv
+
+from .db import get_conn
+from .models import Citation, User
+from .security import build_qdrant_security_filter
+
+load_dotenv(find_dotenv(usecwd=True), override=True)
+
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "1") == "1"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "600"))
+# Cosine similarity above which a differently worded question reuses an answer
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+
+def init_answer_cache():
+    """One row per tenant; bumping it makes every cached answer of that tenant stale."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS cache_generations(
+      tenant_id TEXT PRIMARY KEY,
+      generation INTEGER NOT NULL
+    )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def tenant_generation(tenant_id: str) -> int:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT generation FROM cache_generations WHERE tenant_id=?", (tenant_id,))
+    row = cur.fetchone()
+    conn.close()
+    return row["generation"] if row else 0
+
+
+def invalidate_tenant(tenant_id: str):
+    """Called after ingest. Goes through SQLite so every uvicorn worker sees it."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO cache_generations(tenant_id, generation) VALUES(?, 1) "
+        "ON CONFLICT(tenant_id) DO UPDATE SET generation = generation + 1",
+        (tenant_id,),
+    )
+    conn.commit()
+    conn.close()
+
+
+def security_scope(user: User) -> str:
+    """
+    Hash of the exact Qdrant filter this user searches with (tenant, role,
+    sensitive visibility, user_id and group ACLs). Two users share cached
+    answers only if their filters are identical, i.e. they can see exactly
+    the same chunks.
+    """
+    flt = build_qdrant_security_filter(user).model_dump_json()
+    return hashlib.sha256(flt.encode()).hexdigest()
+
+
+def normalize_question(question: str) -> str:
+    q = re.sub(r"\s+", " ", question.lower()).strip()
+    return q.rstrip("?!. ")
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    citations: list[Citation]
+    retrieved: list[dict]
+    q_vec: np.ndarray
+    generation: int
+    created_at: float
+
+
+class AnswerCache:
+    """LRU + TTL cache of final answers, partitioned by (tenant, security scope)."""
+
+    def __init__(self, max_entries: int, ttl_s: float, similarity: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self._lru: OrderedDict = OrderedDict()          # (tenant, scope, question) -> None
+        self._scopes: dict[tuple, dict[str, CachedAnswer]] = {}
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+
+    def get(self, tenant_id: str, scope: str, question: str, q_vec: np.ndarray, generation: int):
+        now = time.time()
+        with self._lock:
+            entries = self._scopes.get((tenant_id, scope), {})
+            for q in [q for q, e in entries.items() if e.generation != generation or now - e.created_at > self.ttl_s]:
+                self._remove(tenant_id, scope, q)
+
+            hit = entries.get(question)
+            if hit is not None:
+                self.hits_exact += 1
+            elif entries and self.similarity < 1.0:
+                questions = list(entries)
+                sims = np.stack([entries[q].q_vec for q in questions]) @ q_vec
+                best = int(np.argmax(sims))
+                if sims[best] >= self.similarity:
+                    question = questions[best]
+                    hit = entries[question]
+                    self.hits_semantic += 1
+
+            if hit is None:
+                self.misses += 1
+                return None
+            self._lru.move_to_end((tenant_id, scope, question))
+            return hit
+
+    def put(self, tenant_id: str, scope: str, question: str, entry: CachedAnswer):
+        with self._lock:
+            self._scopes.setdefault((tenant_id, scope), {})[question] = entry
+            self._lru[(tenant_id, scope, question)] = None
+            self._lru.move_to_end((tenant_id, scope, question))
+            while len(self._lru) > self.max_entries:
+                self._remove(*next(iter(self._lru)))
+
+    def _remove(self, tenant_id: str, scope: str, question: str):
+        self._lru.pop((tenant_id, scope, question), None)
+        entries = self._scopes.get((tenant_id, scope))
+        if entries is not None:
+            entries.pop(question, None)
+            if not entries:
+                del self._scopes[(tenant_id, scope)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_exact + self.hits_semantic + self.misses
+            return {
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "hits_exact": self.hits_exact,
+                "hits_semantic": self.hits_semantic,
+                "misses": self.misses,
+                "hit_rate": (self.hits_exact + self.hits_semantic) / lookups if lookups else 0.0,
+            }
+
+
+_cache = AnswerCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL_S, ANSWER_CACHE_SIMILARITY)
+
+
+def _scope(user: User, model: str | None) -> str:
+    # Question vectors of different embedding models (before and after a reindex) are not comparable
+    return security_scope(user) if model is None else f"{security_scope(user)}/{model}"
+
+
+def lookup(user: User, question: str, q_vec: list[float], model: str | None = None) -> tuple[CachedAnswer | None, int]:
+    """
+    Returns (cached answer or None, tenant generation). Pass the generation back
+    to store() so an answer computed while a new document was being ingested
+    is not cached under the new generation. model is the one q_vec comes from.
+    """
+    generation = tenant_generation(user.tenant_id)
+    if not ANSWER_CACHE:
+        return None, generation
+    vec = np.asarray(q_vec, dtype=np.float32)
+    hit = _cache.get(user.tenant_id, _scope(user, model), normalize_question(question), vec, generation)
+    return hit, generation
+
+
+def store(user: User, question: str, q_vec: list[float], answer: str,
+          citations: list[Citation], retrieved: list[dict], generation: int, model: str | None = None):
+    if not ANSWER_CACHE or generation != tenant_generation(user.tenant_id):
+        return
+    entry = CachedAnswer(
+        answer=answer,
+        citations=citations,
+        retrieved=retrieved,
+        q_vec=np.asarray(q_vec, dtype=np.float32),
+        generation=generation,
+        created_at=time.time(),
+    )
+    _cache.put(user.tenant_id, _scope(user, model), normalize_question(question), entry)
+
+
+def stats() -> dict:
+    return _cache.stats()
@@ -1,4 +1,5 @@
 import os
+import json
 import jwt
 from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, status, Depends
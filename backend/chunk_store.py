@@ -0,0 +1,236 @@
+"""
+Chunk texts, kept on the API host instead of in every vector payload.
+
+Qdrant points carry only what search filters on plus ids (doc_id, chunk_id,
+content_hash); search() looks the texts of its hits up here.
+
+    python -m backend.chunk_store migrate    # move texts out of already indexed payloads
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+from dotenv import load_dotenv, find_dotenv
+from qdrant_client import models
+
+load_dotenv(find_dotenv(usecwd=True), override=True)
+
+from .embed_cache import cache_key
+
+CHUNK_STORE_DB = os.getenv("CHUNK_STORE_DB", str(Path(__file__).resolve().parent / "chunk_text.db"))
+# Decompressed texts kept in memory, most recently read first
+CHUNK_TEXT_LRU = int(os.getenv("CHUNK_TEXT_LRU", "10000"))
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class ChunkTextStore:
+    """
+    Chunk texts keyed by (doc_id, chunk_id), zlib-compressed in a SQLite file
+    shared by every worker on the host, with an in-process LRU of the texts
+    read most recently. The LRU is keyed by content hash as well, so a chunk
+    rewritten by another worker is never served stale.
+    """
+
+    def __init__(self, db_path: str, lru_entries: int):
+        self.lru_entries = lru_entries
+        self._lru: OrderedDict[tuple[int, int, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS chunk_texts(
+          doc_id INTEGER NOT NULL,
+          chunk_id INTEGER NOT NULL,
+          tenant_id TEXT NOT NULL,
+          content_hash TEXT NOT NULL,
+          text BLOB NOT NULL,
+          PRIMARY KEY (doc_id, chunk_id)
+        )
+        """)
+        self._db.commit()
+
+    def _remember(self, key: tuple[int, int, str], text: str):
+        self._lru[key] = text
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_entries:
+            self._lru.popitem(last=False)
+
+    def put_many(self, tenant_id: str, doc_id: int, rows: list[tuple[int, str, str]]):
+        """Store (chunk_id, content_hash, text) rows of one document."""
+        packed = [(doc_id, chunk_id, tenant_id, content_hash or "", zlib.compress(text.encode(), 6))
+                  for chunk_id, content_hash, text in rows]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunk_texts(doc_id, chunk_id, tenant_id, content_hash, text) VALUES(?,?,?,?,?)",
+                packed,
+            )
+            self._db.commit()
+
+    def get_many(self, keys: list[tuple[int, int, str | None]], model: str | None = None) -> dict[tuple[int, int], str]:
+        """
+        Texts of (doc_id, chunk_id, content_hash) keys, only where the stored
+        text is the version of the chunk the hash was made from: a point not
+        yet (or never) rewritten with a newer version gets no text rather than
+        the newer one. The stored hash is that of one model; with the model of
+        the points, a text stored under another model's hash is hashed again.
+        Chunks not stored, or stored in another version, are left out.
+        """
+        out: dict[tuple[int, int], str] = {}
+        todo: dict[tuple[int, int], str] = {}
+        with self._lock:
+            for doc_id, chunk_id, content_hash in keys:
+                text = self._lru.get((doc_id, chunk_id, content_hash or ""))
+                if text is not None:
+                    self._lru.move_to_end((doc_id, chunk_id, content_hash or ""))
+                    out[(doc_id, chunk_id)] = text
+                    self.hits += 1
+                else:
+                    todo[(doc_id, chunk_id)] = content_hash or ""
+            todo_keys = list(todo)
+            for i in range(0, len(todo_keys), 400):
+                part = todo_keys[i:i + 400]
+                rows = self._db.execute(
+                    "SELECT doc_id, chunk_id, content_hash, text FROM chunk_texts WHERE (doc_id, chunk_id) IN "
+                    f"(VALUES {','.join(['(?,?)'] * len(part))})",
+                    [v for key in part for v in key],
+                ).fetchall()
+                found = 0
+                for doc_id, chunk_id, content_hash, blob in rows:
+                    text = zlib.decompress(blob).decode()
+                    wanted = todo[(doc_id, chunk_id)]
+                    if content_hash != wanted and not (wanted and model and cache_key(model, text) == wanted):
+                        self.stale += 1
+                        continue
+                    out[(doc_id, chunk_id)] = text
+                    self._remember((doc_id, chunk_id, wanted), text)
+                    found += 1
+                self.disk_hits += found
+                self.misses += len(part) - len(rows)
+        return out
+
+    def rehash(self, rows: list[tuple[str, int, int]]):
+        """New (content_hash, doc_id, chunk_id) of chunks re-embedded with another model; the texts stay."""
+        with self._lock:
+            self._db.executemany("UPDATE chunk_texts SET content_hash=? WHERE doc_id=? AND chunk_id=?", rows)
+            self._db.commit()
+
+    def delete_from(self, doc_id: int, first_chunk_id: int = 0):
+        """Drop a document's chunks from first_chunk_id on (all of them by default)."""
+        with self._lock:
+            self._db.execute("DELETE FROM chunk_texts WHERE doc_id=? AND chunk_id>=?", (doc_id, first_chunk_id))
+            self._db.commit()
+            for key in [k for k in self._lru if k[0] == doc_id and k[1] >= first_chunk_id]:
+                del self._lru[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(text)), 0) FROM chunk_texts").fetchone()
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": entries,
+                "stored_bytes": size,
+                "lru_entries": len(self._lru),
+                "lru_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "missing": self.misses,
+                "stale": self.stale,
+                "lru_hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def get_chunk_store() -> ChunkTextStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ChunkTextStore(CHUNK_STORE_DB, CHUNK_TEXT_LRU)
+    return _store
+
+
+def attach_texts(hits: list, model: str | None = None) -> list:
+    """
+    Fill in payload["text"] of search hits from the store. Points indexed
+    before the store existed still carry their text and are left as they are.
+    Hits whose text is missing from the store, or is another version of the
+    chunk than the one they were indexed from, are dropped: a point keeps its
+    old ACL until the ingest that replaces it has upserted its new version.
+    model is the embedding model of the collection the hits come from.
+    """
+    lookup = lambda p: "text" not in p and "doc_id" in p and "chunk_id" in p
+    missing = [h for h in hits if lookup(h.payload or {})]
+    if not missing:
+        return hits
+    texts = get_chunk_store().get_many(
+        [(h.payload["doc_id"], h.payload["chunk_id"], h.payload.get("content_hash")) for h in missing], model)
+    kept = []
+    for h in hits:
+        if lookup(h.payload or {}):
+            text = texts.get((h.payload["doc_id"], h.payload["chunk_id"]))
+            if text is None:
+                continue
+            h.payload["text"] = text
+        kept.append(h)
+    if len(kept) < len(hits):
+        print(f"{len(hits) - len(kept)} search hits have no current text in the chunk store {CHUNK_STORE_DB}; skipped")
+    return kept
+
+
+def stats() -> dict:
+    return get_chunk_store().stats()
+
+
+def migrate(client, collections: list[str], batch: int = 256) -> int:
+    """Move the texts still in point payloads into the store, then drop them from the payloads."""
+    has_text = models.Filter(must_not=[models.IsEmptyCondition(is_empty=models.PayloadField(key="text"))])
+    store = get_chunk_store()
+    moved = 0
+    for collection in collections:
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection, scroll_filter=has_text, limit=batch, offset=offset,
+                with_payload=["tenant_id", "doc_id", "chunk_id", "content_hash", "text"],
+            )
+            docs: dict[tuple[str, int], list] = {}
+            for r in records:
+                p = r.payload
+                docs.setdefault((p["tenant_id"], p["doc_id"]), []).append((p["chunk_id"], p.get("content_hash"), p["text"]))
+            for (tenant_id, doc_id), rows in docs.items():
+                store.put_many(tenant_id, doc_id, rows)
+            if records:
+                client.delete_payload(collection_name=collection, keys=["text"],
+                                      points=[r.id for r in records], wait=True)
+                moved += len(records)
+            if offset is None:
+                break
+        print(f"{collection}: chunk texts moved to {CHUNK_STORE_DB} ({moved} so far)")
+    return moved
+
+
+def main():
+    ap = argparse.ArgumentParser(prog="python -m backend.chunk_store")
+    ap.add_argument("command", choices=["migrate", "stats"])
+    args = ap.parse_args()
+    if args.command == "stats":
+        print(stats())
+        return
+
+    from .qdrant_store import get_qdrant, vector_collections
+    client = get_qdrant()
+    print(f"Moved {migrate(client, vector_collections(client))} chunk texts out of the vector payloads")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
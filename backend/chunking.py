@@ -0,0 +1,120 @@
+import os
+import re
+from typing import Callable, Iterable, Iterator
+
+from dotenv import load_dotenv, find_dotenv
+
+from .embeddings import count_tokens, max_tokens
+from .tenant_settings import get_setting, set_setting
+
+load_dotenv(find_dotenv(usecwd=True), override=True)
+
+# "tokens" packs whole sentences up to CHUNK_TOKENS model tokens; "chars" is the
+# original fixed 900-character window. Tenants can override all three.
+CHUNKER = os.getenv("CHUNKER", "tokens")
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+
+# A chunk that is at least this full is closed at the end of a paragraph
+# instead of running on into the next one
+PARAGRAPH_FILL = 0.5
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def chunking_settings(tenant_id: str) -> dict:
+    """The tenant's chunking settings, falling back to the env defaults."""
+    settings = {"chunker": CHUNKER, "chunk_tokens": CHUNK_TOKENS, "overlap_tokens": CHUNK_OVERLAP_TOKENS}
+    settings.update(get_setting(tenant_id, "chunking", {}))
+    return settings
+
+def set_chunking_settings(tenant_id: str, chunker: str, chunk_tokens: int, overlap_tokens: int) -> dict:
+    """Validate and store a tenant's chunking settings. Raises ValueError if they cannot work."""
+    if chunker not in ("tokens", "chars"):
+        raise ValueError("chunker must be 'tokens' or 'chars'")
+    if chunker == "tokens":
+        limit = max_tokens()
+        if not 16 <= chunk_tokens <= limit:
+            raise ValueError(f"chunk_tokens must be between 16 and {limit} (the embedding model's window)")
+        if not 0 <= overlap_tokens <= chunk_tokens // 2:
+            raise ValueError("overlap_tokens must be between 0 and half of chunk_tokens")
+    settings = {"chunker": chunker, "chunk_tokens": chunk_tokens, "overlap_tokens": overlap_tokens}
+    set_setting(tenant_id, "chunking", settings)
+    return settings
+
+def split_paragraphs(page: str) -> list[str]:
+    """Blank-line separated paragraphs of a page, with whitespace inside each one collapsed."""
+    paragraphs = (" ".join(p.split()) for p in _PARAGRAPH_BREAK.split(page))
+    return [p for p in paragraphs if p]
+
+def _split_long(sentence: str, limit: int, count: Callable) -> Iterator[tuple[str, int]]:
+    """Break a sentence longer than limit tokens at word boundaries."""
+    words = sentence.split()
+    buf, total = [], 0
+    for word, n in zip(words, count(words)):
+        if buf and total + n > limit:
+            yield " ".join(buf), total
+            buf, total = [], 0
+        buf.append(word)
+        total += n
+    if buf:
+        yield " ".join(buf), total
+
+def _sentences(pages: Iterable[str], limit: int, count: Callable) -> Iterator[tuple[str, int, bool]]:
+    """(sentence, n_tokens, ends_paragraph) for each sentence, counting one page per tokenizer call."""
+    for page in pages:
+        units = []
+        for paragraph in split_paragraphs(page):
+            sentences = _SENTENCE_END.split(paragraph)
+            units.extend((s, i == len(sentences) - 1) for i, s in enumerate(sentences))
+        for (sentence, para_end), n in zip(units, count([s for s, _ in units])):
+            if n <= limit:
+                yield sentence, n, para_end
+                continue
+            parts = list(_split_long(sentence, limit, count))
+            for i, (part, part_n) in enumerate(parts):
+                yield part, part_n, para_end and i == len(parts) - 1
+
+def iter_token_chunks(pages: Iterable[str], chunk_tokens: int = CHUNK_TOKENS,
+                      overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                      count: Callable[[list[str]], list[int]] | None = None) -> Iterator[str]:
+    """
+    Pack whole sentences into chunks of at most chunk_tokens tokens of the
+    embedding model, so nothing is cut off at embed time and no chunk is left
+    needlessly short. Consecutive chunks share up to overlap_tokens of
+    trailing sentences; a chunk that is already half full ends with its
+    paragraph and the next one starts fresh. Works on a stream of pages.
+    count defaults to the embedding model's tokenizer.
+    """
+    if count is None:
+        count = count_tokens
+        chunk_tokens = min(chunk_tokens, max_tokens())
+    window: list[tuple[str, int]] = []
+    total = 0
+    fresh = False  # window holds sentences that have not been emitted yet
+
+    def carry_over():
+        kept, n_kept = [], 0
+        for sentence, n in reversed(window):
+            if n_kept + n > overlap_tokens:
+                break
+            kept.insert(0, (sentence, n))
+            n_kept += n
+        return kept, n_kept
+
+    for sentence, n, para_end in _sentences(pages, chunk_tokens, count):
+        if fresh and total + n > chunk_tokens:
+            yield " ".join(s for s, _ in window)
+            window, total = carry_over()
+        while window and total + n > chunk_tokens:
+            total -= window.pop(0)[1]
+        window.append((sentence, n))
+        total += n
+        fresh = True
+
+        if para_end and total >= chunk_tokens * PARAGRAPH_FILL:
+            yield " ".join(s for s, _ in window)
+            window, total, fresh = [], 0, False
+
+    if fresh:
+        yield " ".join(s for s, _ in window)
@@ -0,0 +1,73 @@
+from dataclasses import dataclass, field
+from typing import Callable
+
+# Shortest text shared by the end of one chunk and the start of the next that
+# counts as chunk overlap (shorter matches are coincidence)
+MIN_OVERLAP_CHARS = 20
+
+@dataclass
+class Passage:
+    """One or more adjacent chunks of the same document, overlap removed."""
+    doc_id: int
+    title: str
+    rank: int  # best search rank among its chunks
+    chunk_ids: list[int] = field(default_factory=list)
+    text: str = ""
+
+    def render(self) -> str:
+        ids = str(self.chunk_ids[0]) if len(self.chunk_ids) == 1 else f"{self.chunk_ids[0]}-{self.chunk_ids[-1]}"
+        return f"[doc_id={self.doc_id} title={self.title} chunk_id={ids}]\n{self.text}"
+
+def _overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of a that is also a prefix of b (0 if shorter than MIN_OVERLAP_CHARS)."""
+    probe = b[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    pos = a.find(probe)
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return len(a) - pos
+        pos = a.find(probe, pos + 1)
+    return 0
+
+def merge_passages(payloads: list[dict]) -> list[Passage]:
+    """Group chunk payloads (in rank order) into passages of consecutive chunks, best rank first."""
+    ranked = sorted(enumerate(payloads), key=lambda rp: (rp[1]["doc_id"], rp[1]["chunk_id"]))
+    passages: list[Passage] = []
+    for rank, p in ranked:
+        last = passages[-1] if passages else None
+        if last and last.doc_id == p["doc_id"] and last.chunk_ids[-1] + 1 == p["chunk_id"]:
+            k = _overlap(last.text, p["text"])
+            last.text = last.text + p["text"][k:] if k else f"{last.text} {p['text']}"
+            last.chunk_ids.append(p["chunk_id"])
+            last.rank = min(last.rank, rank)
+        else:
+            passages.append(Passage(doc_id=p["doc_id"], title=p["title"], rank=rank,
+                                    chunk_ids=[p["chunk_id"]], text=p["text"]))
+    return sorted(passages, key=lambda x: x.rank)
+
+def pack_context(payloads: list[dict], budget_tokens: int,
+                 count_tokens: Callable[[str], int]) -> tuple[list[Passage], list[dict]]:
+    """
+    Fill a token budget with the best-ranked chunks. Chunks are taken in rank
+    order and kept if, merged with their neighbours and without the repeated
+    overlap, everything still fits. Returns the passages for the prompt and
+    the chunk payloads that made it in (in rank order).
+    """
+    counted: dict[str, int] = {}
+
+    def cost(passages: list[Passage]) -> int:
+        total = 0
+        for passage in passages:
+            text = passage.render()
+            if text not in counted:
+                counted[text] = count_tokens(text)
+            total += counted[text] + 4  # separator between passages
+        return total
+
+    chosen: list[dict] = []
+    for p in payloads:
+        trial = chosen + [p]
+        if cost(merge_passages(trial)) <= budget_tokens:
+            chosen = trial
+    return merge_passages(chosen), chosen
@@ -36,11 +36,16 @@ def init_db():
         roles_allowed TEXT NOT NULL,
         allowed_users TEXT NOT NULL DEFAULT '[]',
         allowed_groups TEXT NOT NULL DEFAULT '[]',
+        sensitive INTEGER NOT NULL DEFAULT 0,
         source_type TEXT NOT NULL,
         source_value TEXT NOT NULL,
         created_at TEXT NOT NULL
     )
     """)
+    # Tables created before documents could be replaced lack the sensitive flag
+    cur.execute("PRAGMA table_info(documents)")
+    if "sensitive" not in {row["name"] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE documents ADD COLUMN sensitive INTEGER NOT NULL DEFAULT 0")
     
     conn.commit()
     conn.close()
@@ -75,14 +80,64 @@ def seed_demo_users():
     conn.close()
 
 def create_document(tenant_id: str, title: str, created_by: int, roles_allowed_json: str,
-                    source_type: str, source_value: str) -> int:
+                    source_type: str, source_value: str, sensitive: bool = False,
+                    allowed_users_json: str = "[]", allowed_groups_json: str = "[]") -> int:
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("""
-      INSERT INTO documents(tenant_id,title,created_by,roles_allowed,source_type,source_value,created_at)
-      VALUES(?,?,?,?,?,?,?)
-    """, (tenant_id, title, created_by, roles_allowed_json, source_type, source_value, datetime.utcnow().isoformat()))
+      INSERT INTO documents(tenant_id,title,created_by,roles_allowed,allowed_users,allowed_groups,sensitive,
+                            source_type,source_value,created_at)
+      VALUES(?,?,?,?,?,?,?,?,?,?)
+    """, (tenant_id, title, created_by, roles_allowed_json, allowed_users_json, allowed_groups_json, int(sensitive),
+          source_type, source_value, datetime.utcnow().isoformat()))
     doc_id = cur.lastrowid
     conn.commit()
     conn.close()
-    return doc_id
\ No newline at end of file
+    return doc_id
+
+def find_document(tenant_id: str, source_type: str, source_value: str,
+                  created_by: int | None = None) -> int | None:
+    """
+    Newest document of this tenant that came from the same file name or URL,
+    and with created_by, that this user uploaded.
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT doc_id FROM documents WHERE tenant_id=? AND source_type=? AND source_value=? "
+        "AND (? IS NULL OR created_by=?) ORDER BY doc_id DESC LIMIT 1",
+        (tenant_id, source_type, source_value, created_by, created_by)
+    )
+    row = cur.fetchone()
+    conn.close()
+    return row["doc_id"] if row else None
+
+def get_document(tenant_id: str, doc_id: int) -> dict | None:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM documents WHERE tenant_id=? AND doc_id=?", (tenant_id, doc_id))
+    row = cur.fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def update_document(doc_id: int, title: str, roles_allowed_json: str,
+                    source_type: str | None = None, source_value: str | None = None, sensitive: bool = False,
+                    allowed_users_json: str = "[]", allowed_groups_json: str = "[]"):
+    """New title, roles and ACL; a replaced document also gets its new source."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE documents SET title=?, roles_allowed=?, allowed_users=?, allowed_groups=?, sensitive=?, "
+        "created_at=?, source_type=COALESCE(?, source_type), source_value=COALESCE(?, source_value) WHERE doc_id=?",
+        (title, roles_allowed_json, allowed_users_json, allowed_groups_json, int(sensitive),
+         datetime.utcnow().isoformat(), source_type, source_value, doc_id)
+    )
+    conn.commit()
+    conn.close()
+
+def delete_document(doc_id: int):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM documents WHERE doc_id=?", (doc_id,))
+    conn.commit()
+    conn.close()
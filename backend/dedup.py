@@ -0,0 +1,121 @@
+import hashlib
+import json
+import threading
+
+from .db import get_conn
+from .embed_cache import cache_key
+from .embeddings import EMBED_MODEL
+from .qdrant_store import retrieve_vectors
+
+# Work done by ingests since startup (see /admin/metrics)
+_stats = {"chunks_embedded": 0, "chunks_reused": 0, "chunks_unchanged": 0, "chunks_deleted": 0}
+_stats_lock = threading.Lock()
+
+def init_chunk_hashes():
+    conn = get_conn()
+    cur = conn.cursor()
+    # point_id has no declared type (older tables say INTEGER, which SQLite still lets hold text),
+    # so integer ids of old points and uuid strings of new ones both keep their type
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS chunk_hashes(
+      tenant_id TEXT NOT NULL,
+      doc_id INTEGER NOT NULL,
+      chunk_id INTEGER NOT NULL,
+      content_hash TEXT NOT NULL,
+      meta_hash TEXT NOT NULL,
+      point_id NOT NULL,
+      PRIMARY KEY (doc_id, chunk_id)
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_chunk_hashes_tenant ON chunk_hashes(tenant_id, content_hash)")
+    conn.commit()
+    conn.close()
+
+def chunk_hash(text: str, model: str | None = None) -> str:
+    """Same text and same embedding model → same vector, so the hash covers both."""
+    return cache_key(model or EMBED_MODEL, text)
+
+def meta_hash(**payload_fields) -> str:
+    """Hash of the document-level payload (title, ACL, ...); a change means points need rewriting."""
+    return hashlib.sha256(json.dumps(payload_fields, sort_keys=True).encode()).hexdigest()
+
+def doc_chunk_hashes(doc_id: int) -> dict[int, tuple[str, str, int | str]]:
+    """chunk_id → (content_hash, meta_hash, point_id) as last indexed for this document."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT chunk_id, content_hash, meta_hash, point_id FROM chunk_hashes WHERE doc_id=?", (doc_id,))
+    rows = cur.fetchall()
+    conn.close()
+    return {r["chunk_id"]: (r["content_hash"], r["meta_hash"], r["point_id"]) for r in rows}
+
+def reusable_vectors(client, tenant_id: str, hashes: list[str]) -> dict[str, list[float]]:
+    """
+    Vectors already stored in Qdrant for any of these chunk hashes, from any
+    of the tenant's documents. A point is only trusted if its payload still
+    carries the same hash (it may have been overwritten since).
+    """
+    hashes = list(set(hashes))
+    candidates: dict[int | str, str] = {}
+    conn = get_conn()
+    cur = conn.cursor()
+    for i in range(0, len(hashes), 500):
+        part = hashes[i:i + 500]
+        cur.execute(
+            f"SELECT content_hash, MIN(point_id) AS point_id FROM chunk_hashes "
+            f"WHERE tenant_id=? AND content_hash IN ({','.join('?' * len(part))}) GROUP BY content_hash",
+            (tenant_id, *part)
+        )
+        candidates.update({r["point_id"]: r["content_hash"] for r in cur.fetchall()})
+    conn.close()
+    if not candidates:
+        return {}
+
+    found = {}
+    for record in retrieve_vectors(client, list(candidates), tenant_id):
+        h = candidates.get(record.id)
+        vector = record.vector.get("") if isinstance(record.vector, dict) else record.vector  # dense part only
+        if vector is not None and (record.payload or {}).get("content_hash") == h:
+            found[h] = vector
+    return found
+
+def record_chunks(tenant_id: str, doc_id: int, rows: list[tuple[int, str, str, int | str]]):
+    """Remember (chunk_id, content_hash, meta_hash, point_id) of chunks just written to Qdrant."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT OR REPLACE INTO chunk_hashes(tenant_id,doc_id,chunk_id,content_hash,meta_hash,point_id) "
+        "VALUES(?,?,?,?,?,?)",
+        [(tenant_id, doc_id, *row) for row in rows]
+    )
+    conn.commit()
+    conn.close()
+
+def rehash_chunks(rows: list[tuple[str, int, int, int | str]]):
+    """
+    Set the (content_hash, doc_id, chunk_id, point_id) rows' new hashes after a
+    reindex re-embedded their points with another model.
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.executemany("UPDATE chunk_hashes SET content_hash=? WHERE doc_id=? AND chunk_id=? AND point_id=?", rows)
+    conn.commit()
+    conn.close()
+
+def forget_chunks_from(doc_id: int, first_chunk_id: int = 0):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM chunk_hashes WHERE doc_id=? AND chunk_id>=?", (doc_id, first_chunk_id))
+    conn.commit()
+    conn.close()
+
+def count_work(**counts: int):
+    with _stats_lock:
+        for k, v in counts.items():
+            _stats[f"chunks_{k}"] += v
+
+def stats() -> dict:
+    with _stats_lock:
+        out = dict(_stats)
+    total = out["chunks_embedded"] + out["chunks_reused"] + out["chunks_unchanged"]
+    out["embeddings_saved"] = round((total - out["chunks_embedded"]) / total, 4) if total else 0.0
+    return out
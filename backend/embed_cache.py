@@ -0,0 +1,211 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode()).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """
+    Exact-match cache of question embeddings.
+
+    Tier 1 is an in-process LRU of float32 arrays (1.5 KB per 384-dim vector,
+    vs ~12 KB as a Python list of floats). Tier 2, when db_path is set, is a
+    SQLite file shared by every uvicorn worker on the host.
+    """
+
+    def __init__(self, model_name: str, max_entries: int, db_path: str | None = None, disk_max_entries: int = 100_000):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._puts_since_prune = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+            CREATE TABLE IF NOT EXISTS query_embeddings(
+              key TEXT PRIMARY KEY,
+              vec BLOB NOT NULL,
+              last_used REAL NOT NULL
+            )
+            """)
+            self._db.commit()
+
+    def get(self, text: str) -> np.ndarray | None:
+        key = cache_key(self.model_name, text)
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return vec
+
+        vec = self._disk_get(key)
+        with self._lock:
+            if vec is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._memory_put(key, vec)
+        return vec
+
+    def put(self, text: str, vec: np.ndarray):
+        key = cache_key(self.model_name, text)
+        # A copy: a row of a batched encode would otherwise keep the whole batch alive
+        vec = np.array(vec, dtype=np.float32, copy=True)
+        self._memory_put(key, vec)
+        self._disk_put(key, vec)
+
+    def _memory_put(self, key: str, vec: np.ndarray):
+        with self._lock:
+            old = self._lru.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._lru[key] = vec
+            self._bytes += vec.nbytes
+            while len(self._lru) > self.max_entries:
+                _, evicted = self._lru.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def _disk_get(self, key: str) -> np.ndarray | None:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute("SELECT vec FROM query_embeddings WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE query_embeddings SET last_used=? WHERE key=?", (time.time(), key))
+            self._db.commit()
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def _disk_put(self, key: str, vec: np.ndarray):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO query_embeddings(key, vec, last_used) VALUES(?,?,?)",
+                (key, vec.tobytes(), time.time()),
+            )
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 1000:
+                self._puts_since_prune = 0
+                self._db.execute(
+                    "DELETE FROM query_embeddings WHERE key IN ("
+                    "  SELECT key FROM query_embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,),
+                )
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            out = {
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "memory_bytes": self._bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+        if self._db is not None:
+            with self._db_lock:
+                out["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+        return out
+
+
+class ChunkEmbeddingCache:
+    """
+    On-disk cache of document chunk embeddings, shared by all tenants and
+    workers on the host. Boilerplate (disclaimers, headers, policy clauses)
+    repeats across documents, so ingest looks chunks up here in one query per
+    batch and only encodes the misses. Only vectors are stored, keyed by a
+    hash of model name + text. Least recently used rows are evicted past
+    max_entries.
+    """
+
+    def __init__(self, model_name: str, db_path: str, max_entries: int = 200_000):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._puts_since_prune = 0
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS chunk_embeddings(
+          key TEXT PRIMARY KEY,
+          vec BLOB NOT NULL,
+          last_used REAL NOT NULL
+        )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_chunk_embeddings_used ON chunk_embeddings(last_used)")
+        self._db.commit()
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        keys = [cache_key(self.model_name, t) for t in texts]
+        found: dict[str, np.ndarray] = {}
+        with self._lock:
+            unique = list(set(keys))
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vec FROM chunk_embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update((k, np.frombuffer(v, dtype=np.float32)) for k, v in rows)
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE chunk_embeddings SET last_used=? WHERE key=?", [(now, k) for k in found])
+                self._db.commit()
+            out = [found.get(k) for k in keys]
+            hits = sum(v is not None for v in out)
+            self.hits += hits
+            self.misses += len(out) - hits
+        return out
+
+    def put_many(self, texts: list[str], vectors: np.ndarray):
+        now = time.time()
+        rows = [(cache_key(self.model_name, t), np.asarray(v, dtype=np.float32).tobytes(), now)
+                for t, v in zip(texts, vectors)]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO chunk_embeddings(key, vec, last_used) VALUES(?,?,?)", rows)
+            self._puts_since_prune += len(rows)
+            if self._puts_since_prune >= 1000:
+                self._puts_since_prune = 0
+                cur = self._db.execute(
+                    "DELETE FROM chunk_embeddings WHERE key IN ("
+                    "  SELECT key FROM chunk_embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                self.evicted += cur.rowcount
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(vec)), 0) FROM chunk_embeddings").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "vector_bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,214 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+import numpy as np
+from dotenv import load_dotenv, find_dotenv
+
+from .embed_cache import ChunkEmbeddingCache, QueryEmbeddingCache
+
+load_dotenv(find_dotenv(usecwd=True), override=True)
+
+# Model of every tenant that has not been reindexed to another one (see backend/sharding.py)
+EMBED_MODEL = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+
+# Micro-batching of concurrent /chat/query embeddings
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "1") == "1"
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "32"))
+
+# Exact-match cache of question embeddings (0 disables); the SQLite tier is optional
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "10000"))
+QUERY_EMBED_CACHE_DB = os.getenv("QUERY_EMBED_CACHE_DB", "")
+QUERY_EMBED_CACHE_DISK_MAX = int(os.getenv("QUERY_EMBED_CACHE_DISK_MAX", "100000"))
+
+# On-disk cache of document chunk embeddings used by ingest (max 0 disables)
+CHUNK_EMBED_CACHE_DB = os.getenv("CHUNK_EMBED_CACHE_DB", str(Path(__file__).resolve().parent / "chunk_embeddings.db"))
+CHUNK_EMBED_CACHE_MAX = int(os.getenv("CHUNK_EMBED_CACHE_MAX", "200000"))
+
+# Keyed by model name: a tenant being reindexed, or already moved to another model, uses its own
+_models: dict = {}
+_model_lock = threading.Lock()
+_batchers: dict = {}
+_batcher_lock = threading.Lock()
+_query_caches: dict = {}
+_query_cache_lock = threading.Lock()
+_chunk_caches: dict = {}
+_chunk_cache_lock = threading.Lock()
+
+
+def get_embedder(model: str | None = None):
+    """Load a shared sentence-transformers model (EMBED_MODEL by default) once per process, on first use."""
+    model = model or EMBED_MODEL
+    if model not in _models:
+        with _model_lock:
+            if model not in _models:
+                # Imported here so that importing the backend does not pay for torch
+                from sentence_transformers import SentenceTransformer
+                _models[model] = SentenceTransformer(model)
+    return _models[model]
+
+
+def warm_up():
+    """Load the model and run one tiny encode so the first real request is fast."""
+    get_embedder().encode(["warm up"], normalize_embeddings=True)
+
+
+def start_warm_up():
+    """Warm the model in a background thread so the server can bind right away."""
+    threading.Thread(target=warm_up, name="embedder-warmup", daemon=True).start()
+
+
+def embed_texts(texts: list[str], model: str | None = None) -> np.ndarray:
+    """Turn texts into normalized float32 vectors, one row per text."""
+    vectors = get_embedder(model).encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    return vectors.astype(np.float32, copy=False)
+
+
+def embedding_size(model: str | None = None) -> int:
+    return get_embedder(model).get_sentence_embedding_dimension()
+
+
+def count_tokens(texts: list[str], model: str | None = None) -> list[int]:
+    """Length of each text in the model's own tokens, not counting [CLS]/[SEP]."""
+    if not texts:
+        return []
+    encoded = get_embedder(model).tokenizer(texts, add_special_tokens=False, verbose=False)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def max_tokens(model: str | None = None) -> int:
+    """Longest text (in tokens) the model embeds without truncating it."""
+    return get_embedder(model).max_seq_length - 2
+
+
+class EmbeddingBatcher:
+    """
+    Gathers questions from concurrent requests for a short window (or until
+    max_batch are waiting), runs one batched encode, and hands each caller
+    its own vector. Callers block on a Future, so it works from FastAPI's
+    threadpool without touching the event loop.
+    """
+
+    def __init__(self, window_ms: float = EMBED_BATCH_WINDOW_MS, max_batch: int = EMBED_BATCH_MAX,
+                 model: str | None = None):
+        self.model = model
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                vectors = embed_texts([text for text, _ in batch], self.model)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), vec in zip(batch, vectors):
+                fut.set_result(vec)
+
+
+def get_batcher(model: str | None = None) -> EmbeddingBatcher:
+    model = model or EMBED_MODEL
+    if model not in _batchers:
+        with _batcher_lock:
+            if model not in _batchers:
+                _batchers[model] = EmbeddingBatcher(model=model)
+    return _batchers[model]
+
+
+def get_query_cache(model: str | None = None) -> QueryEmbeddingCache | None:
+    if QUERY_EMBED_CACHE_SIZE <= 0:
+        return None
+    model = model or EMBED_MODEL
+    if model not in _query_caches:
+        with _query_cache_lock:
+            if model not in _query_caches:
+                _query_caches[model] = QueryEmbeddingCache(
+                    model,
+                    max_entries=QUERY_EMBED_CACHE_SIZE,
+                    db_path=QUERY_EMBED_CACHE_DB or None,
+                    disk_max_entries=QUERY_EMBED_CACHE_DISK_MAX,
+                )
+    return _query_caches[model]
+
+
+def query_cache_stats() -> dict:
+    cache = get_query_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+
+def get_chunk_cache(model: str | None = None) -> ChunkEmbeddingCache | None:
+    if CHUNK_EMBED_CACHE_MAX <= 0:
+        return None
+    model = model or EMBED_MODEL
+    if model not in _chunk_caches:
+        with _chunk_cache_lock:
+            if model not in _chunk_caches:
+                _chunk_caches[model] = ChunkEmbeddingCache(model, CHUNK_EMBED_CACHE_DB, max_entries=CHUNK_EMBED_CACHE_MAX)
+    return _chunk_caches[model]
+
+
+def chunk_cache_stats() -> dict:
+    cache = get_chunk_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+
+def embed_chunks(texts: list[str], model: str | None = None) -> np.ndarray:
+    """embed_texts() for document chunks: cached vectors are re-used, only the misses are encoded."""
+    cache = get_chunk_cache(model)
+    if cache is None:
+        return embed_texts(texts, model)
+    cached = cache.get_many(texts)
+    misses = [i for i, vec in enumerate(cached) if vec is None]
+    if not misses:
+        return np.stack(cached)
+    fresh = embed_texts([texts[i] for i in misses], model)
+    cache.put_many([texts[i] for i in misses], fresh)
+    if len(misses) == len(texts):
+        return fresh
+    out = np.empty((len(texts), fresh.shape[1]), dtype=np.float32)
+    for i, vec in zip(misses, fresh):
+        out[i] = vec
+    for i, vec in enumerate(cached):
+        if vec is not None:
+            out[i] = vec
+    return out
+
+
+def embed_query(question: str, model: str | None = None) -> list[float]:
+    """Embed a single chat question: cache first, then a forward pass shared with concurrent callers."""
+    cache = get_query_cache(model)
+    vec = cache.get(question) if cache else None
+    if vec is None:
+        vec = get_batcher(model).embed(question) if EMBED_BATCHING else embed_texts([question], model)[0]
+        if cache:
+            cache.put(question, vec)
+    return vec.tolist()
@@ -0,0 +1,190 @@
+import io
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from queue import Empty
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Iterator
+import requests
+from bs4 import BeautifulSoup
+from readability import Document as Readable
+from pypdf import PdfReader
+
+# Text extraction is CPU-bound pure Python, so it runs in worker processes where
+# it cannot hold the API process's GIL. This module keeps its imports light
+# because every worker imports it. EXTRACT_WORKERS=0 extracts in-process.
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "2"))
+EXTRACT_TIMEOUT_S = float(os.getenv("EXTRACT_TIMEOUT_S", "120"))
+EXTRACT_PAGES_PER_TASK = int(os.getenv("EXTRACT_PAGES_PER_TASK", "20"))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+# Workers put (task, start time) on this queue when a task starts running, so
+# its timeout starts then and not while it waits behind other uploads' tasks
+_started = None
+_start_times: dict[str, float | None] = {}  # tasks not collected yet → start time, None while queued
+
+def iter_pdf_pages(source) -> Iterator[str]:
+    """Yield the text of one PDF page at a time; source is a file path or binary file object."""
+    reader = PdfReader(source)
+    for page_num, page in enumerate(reader.pages):
+        text = page.extract_text()
+        if text:
+            yield f"[Page {page_num+1}]\n{text}"
+
+def extract_pdf(file_bytes: bytes) -> str:
+    """Read text from PDF file, like opening a book and copying the words."""
+    try:
+        return "\n\n".join(iter_pdf_pages(io.BytesIO(file_bytes)))
+    except Exception:
+        return ""
+
+def extract_url(url: str) -> str:
+    """Get readable text from webpage, like copying the main article."""
+    try:
+        response = requests.get(url, timeout=20)
+        response.raise_for_status()
+        html = response.text
+
+        # readability-lxml extracts the main content, ignoring ads/menus
+        readable_doc = Readable(html)
+        summary_html = readable_doc.summary(html_partial=True)
+
+        # BeautifulSoup cleans up the HTML into plain text
+        soup = BeautifulSoup(summary_html, "html.parser")
+        text = soup.get_text("\n\n")
+
+        return text.strip()
+    except Exception:
+        return ""
+
+def _pdf_page_range(path: str, start: int, stop: int) -> list[str]:
+    """Worker task: text of pages [start, stop) of the PDF at path."""
+    reader = PdfReader(path)
+    pages = []
+    for page_num in range(start, stop):
+        text = reader.pages[page_num].extract_text()
+        if text:
+            pages.append(f"[Page {page_num+1}]\n{text}")
+    return pages
+
+def _pdf_page_count(path: str) -> int:
+    """Worker task: reading the page tree can itself hang on a malformed PDF."""
+    return len(PdfReader(path).pages)
+
+def _init_worker(started):
+    global _started
+    _started = started
+
+def _timed(task: str, fn: Callable, *args):
+    """Worker side of every task: report when it starts running."""
+    _started.put((task, time.time()))
+    return fn(*args)
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _started
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the API process runs threads (embedding batcher, ingest jobs)
+            ctx = multiprocessing.get_context("spawn")
+            _started = ctx.Queue()
+            _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=ctx,
+                                        initializer=_init_worker, initargs=(_started,))
+        return _pool
+
+def _submit(pool: ProcessPoolExecutor, fn: Callable, *args) -> tuple[Future, str]:
+    task = uuid.uuid4().hex
+    with _pool_lock:
+        _start_times[task] = None
+    return pool.submit(_timed, task, fn, *args), task
+
+def _started_at(task: str) -> float | None:
+    """When the task started running in a worker, or None while it is still queued."""
+    with _pool_lock:
+        try:
+            while _started is not None:
+                started_task, at = _started.get_nowait()
+                if started_task in _start_times:
+                    _start_times[started_task] = at
+        except Empty:
+            pass
+        return _start_times.get(task)
+
+def _kill_pool(pool: ProcessPoolExecutor):
+    """Terminate the workers (a stuck pypdf call cannot be interrupted any other way)."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for proc in list(getattr(pool, "_processes", {}).values()):
+        proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _result(pool: ProcessPoolExecutor, fut: Future, task: str, what: str):
+    """The task's result, once it finishes or EXTRACT_TIMEOUT_S after it started running."""
+    try:
+        while not fut.done():
+            started = _started_at(task)
+            wait = 0.5 if started is None else min(0.5, started + EXTRACT_TIMEOUT_S - time.time())
+            if wait <= 0:
+                # Other documents sharing the pool fail too and can be re-uploaded
+                _kill_pool(pool)
+                raise TimeoutError(f"{what} took longer than {EXTRACT_TIMEOUT_S:.0f}s and was stopped")
+            try:
+                return fut.result(timeout=wait)
+            except FutureTimeout:
+                continue
+        return fut.result()
+    finally:
+        with _pool_lock:
+            _start_times.pop(task, None)
+
+def iter_pdf_pages_pooled(path: str) -> Iterator[str]:
+    """
+    iter_pdf_pages() on the process pool. Large PDFs are split into
+    EXTRACT_PAGES_PER_TASK-page ranges parsed in parallel; pages are still
+    yielded in order and only a few ranges are in flight at once. Counting
+    the pages runs on the pool too. Each task must finish within
+    EXTRACT_TIMEOUT_S of starting to run; queued behind other uploads' tasks
+    it has no deadline yet.
+    """
+    if EXTRACT_WORKERS <= 0:
+        yield from iter_pdf_pages(path)
+        return
+
+    n_pages = run_in_pool(_pdf_page_count, path, what="Reading the PDF's pages")
+    ranges = deque((s, min(s + EXTRACT_PAGES_PER_TASK, n_pages)) for s in range(0, n_pages, EXTRACT_PAGES_PER_TASK))
+    pool = _get_pool()
+    in_flight: deque[tuple[Future, str]] = deque()
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < 2 * EXTRACT_WORKERS:
+                in_flight.append(_submit(pool, _pdf_page_range, path, *ranges.popleft()))
+            fut, task = in_flight.popleft()
+            yield from _result(pool, fut, task, "PDF extraction")
+    finally:
+        for fut, task in in_flight:
+            fut.cancel()
+            with _pool_lock:
+                _start_times.pop(task, None)
+
+def run_in_pool(fn: Callable, *args, what: str = "Extraction"):
+    """Run one extraction function on the process pool, with the same timeout."""
+    if EXTRACT_WORKERS <= 0:
+        return fn(*args)
+    pool = _get_pool()
+    return _result(pool, *_submit(pool, fn, *args), what)
+
+def extract_url_pooled(url: str) -> str:
+    return run_in_pool(extract_url, url, what="URL extraction")
+
+def shutdown_extract_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
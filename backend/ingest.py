@@ -1,19 +1,24 @@
-import io
 import json
+import os
 import re
-import requests
-from bs4 import BeautifulSoup
-from readability import Document as Readable
-from pypdf import PdfReader
-from sentence_transformers import SentenceTransformer
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator
 from qdrant_client import models
 from datetime import datetime
 
-from .db import create_document
-from .qdrant_store import get_qdrant, ensure_collection, upsert_chunks
+from .db import create_document, find_document, get_document, update_document, delete_document
+from .qdrant_store import get_qdrant, bootstrap_schema, ensure_collection, upsert_chunks, upserts_wait, wait_until_indexed, delete_doc_chunks_from, delete_points, has_sparse_vectors, write_indexes, tenant_model, point_id, SPARSE_VECTOR
+from .sparse import sparse_doc_vector
 from .models import User
+from .embeddings import embed_chunks, count_tokens, max_tokens, EMBED_MODEL
+from .answer_cache import invalidate_tenant
+from .chunk_store import get_chunk_store
+from .chunking import chunking_settings, iter_token_chunks
+from .dedup import chunk_hash, meta_hash, doc_chunk_hashes, reusable_vectors, record_chunks, forget_chunks_from, count_work
 
-_embedder = SentenceTransformer("all-MiniLM-L6-v2")
+# Chunks per embed/upsert step of the ingest pipeline
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "128"))
 
 def compute_acl_mode(allowed_users: list[int], allowed_groups: list[str]) -> str:
     """
@@ -41,127 +46,281 @@ def chunk_text(text: str, chunk_size: int = 900, overlap: int = 150) -> list[str
             break
     return chunks
 
+def iter_clean(pieces: Iterable[str]) -> Iterator[str]:
+    """clean_text() for a stream of pages; pieces that end up empty are dropped."""
+    for piece in pieces:
+        piece = clean_text(piece)
+        if piece:
+            yield piece
+
+def iter_chunks(pieces: Iterable[str], chunk_size: int = 900, overlap: int = 150) -> Iterator[str]:
+    """
+    Streaming chunk_text(): yields the same chunks as chunk_text(" ".join(pieces))
+    while holding only about one chunk plus one page in memory. The overlap
+    carries across page boundaries.
+    """
+    step = chunk_size - overlap
+    buf = ""
+    for piece in pieces:
+        buf = f"{buf} {piece}" if buf else piece
+        while len(buf) >= chunk_size:
+            yield buf[:chunk_size]
+            buf = buf[step:]
+    while buf:
+        yield buf
+        buf = buf[step:]
+
+def document_chunks(pieces: Iterable[str], tenant_id: str) -> Iterator[str]:
+    """Chunk a stream of pages with the tenant's chunker (token-aware by default)."""
+    settings = chunking_settings(tenant_id)
+    if settings["chunker"] == "chars":
+        return iter_chunks(iter_clean(pieces))
+    model = tenant_model(tenant_id)
+    if model != EMBED_MODEL:
+        # Counted in the tokens of the model the tenant was reindexed to
+        return iter_token_chunks(pieces, min(settings["chunk_tokens"], max_tokens(model)), settings["overlap_tokens"],
+                                 count=lambda texts: count_tokens(texts, model))
+    return iter_token_chunks(pieces, settings["chunk_tokens"], settings["overlap_tokens"])
+
+def _batched(items: Iterable, n: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def embedded_with(model: str, points: list[models.PointStruct], chunks: list[str]) -> list[models.PointStruct]:
+    """The same points with their chunks embedded by another model."""
+    dense = embed_chunks(chunks, model).tolist()
+    return [models.PointStruct(
+        id=p.id,
+        vector={**p.vector, "": vec} if isinstance(p.vector, dict) else vec,
+        payload={**p.payload, "content_hash": chunk_hash(chunk, model)},
+    ) for p, chunk, vec in zip(points, chunks, dense)]
+
 def heuristic_sensitive(text: str) -> bool:
     """Check if text looks secret by looking for special words."""
     keywords = ["password", "secret", "api key", "confidential", "ssn", "credit card"]
     t = text.lower()
     return any(k in t for k in keywords)
 
-def extract_pdf(file_bytes: bytes) -> str:
-    """Read text from PDF file, like opening a book and copying the words."""
-    try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        pages = []
-        for page_num, page in enumerate(reader.pages):
-            text = page.extract_text()
-            if text:
-                pages.append(f"[Page {page_num+1}]\n{text}")
-        return "\n\n".join(pages)
-    except Exception:
-        return ""
-
-def extract_url(url: str) -> str:
-    """Get readable text from webpage, like copying the main article."""
-    try:
-        response = requests.get(url, timeout=20)
-        response.raise_for_status()
-        html = response.text
-        
-        # readability-lxml extracts the main content, ignoring ads/menus
-        readable_doc = Readable(html)
-        summary_html = readable_doc.summary(html_partial=True)
-        
-        # BeautifulSoup cleans up the HTML into plain text
-        soup = BeautifulSoup(summary_html, "html.parser")
-        text = soup.get_text("\n\n")
-        
-        return text.strip()
-    except Exception:
-        return ""
-
 def ingest_document_for_user(
     user: User,
     title: str,
     roles_allowed: list[str],
     source_type: str,
     source_value: str,
-    raw_text: str,
+    raw_text: str | Iterable[str],
     sensitive_flag: bool,
     max_chunks: int,
     allowed_users: list[int] | None = None,     # NEW
     allowed_groups: list[str] | None = None,    # NEW
+    on_progress: Callable[[str, int, int], None] | None = None,
+    doc_id: int | None = None,
 ):
 
-    """Main factory: document → chunks → vectors → Qdrant + SQLite"""
+    """
+    Main factory: document → chunks → vectors → Qdrant + SQLite.
+    raw_text is either the whole text or an iterable of pages (see iter_pdf_pages).
+    Re-ingesting a source_value the user uploaded before (for admins, any of
+    the tenant's) updates that document:
+    only new or changed chunks are embedded and upserted, stale ones deleted.
+    With doc_id, that document of the tenant is replaced, whatever its source was.
+    Returns (doc_id, n_chunks, work) where work counts embedded / re-used /
+    unchanged / deleted chunks.
+    """
     
-    # STEP 1: Save document info in SQLite (like writing in a notebook)
-    doc_id = create_document(
-        tenant_id=user.tenant_id,
-        title=title,
-        created_by=user.user_id,
-        roles_allowed_json=json.dumps(roles_allowed),
-        source_type=source_type,
-        source_value=source_value,
-    )
-
     allowed_users = allowed_users or []
     allowed_groups = allowed_groups or []
     acl_mode = compute_acl_mode(allowed_users, allowed_groups)
+    report = on_progress or (lambda stage, done, total: None)
 
-
-    # STEP 2: Clean up messy text
-    text = clean_text(raw_text)
-    if not text:
+    # STEP 1-2: Clean up messy text and split it into chunks, lazily, one page
+    # at a time (max limit for safety/cost). Chunk sizes follow the tenant's settings.
+    report("chunk", 0, 0)
+    pieces = [raw_text] if isinstance(raw_text, str) else raw_text
+    chunks = islice(document_chunks(pieces, user.tenant_id), max_chunks)
+    batches = _batched(chunks, INGEST_BATCH_SIZE)
+    first_batch = next(batches, None)
+    if not first_batch:
         raise ValueError("No text extracted from document")
 
-    # STEP 3: Split into chunks (max limit for safety/cost)
-    chunks = chunk_text(text)[:max_chunks]
-    print(f"Created {len(chunks)} chunks from {title}")
-
-    # STEP 4: Convert text to numbers (embeddings) using sentence-transformers
-    vectors = _embedder.encode(chunks, normalize_embeddings=True).tolist()
-    vector_size = len(vectors[0])  # Usually 384 for MiniLM
+    # STEP 3: Save document info in SQLite (like writing in a notebook).
+    # Uploading the same file name or URL again updates that document in place,
+    # if the user may change it: their own first, and for admins anyone's.
+    roles_allowed_json = json.dumps(roles_allowed)
+    if doc_id is None:
+        doc_id = find_document(user.tenant_id, source_type, source_value, created_by=user.user_id)
+        if doc_id is None and user.role == "admin":
+            doc_id = find_document(user.tenant_id, source_type, source_value)
+    elif get_document(user.tenant_id, doc_id) is None:
+        raise ValueError(f"Document {doc_id} not found")
+    existing = doc_id is not None
+    if existing:
+        update_document(doc_id, title, roles_allowed_json, source_type, source_value, bool(sensitive_flag),
+                        json.dumps(allowed_users), json.dumps(allowed_groups))
+        previous = doc_chunk_hashes(doc_id)
+    else:
+        doc_id = create_document(
+            tenant_id=user.tenant_id,
+            title=title,
+            created_by=user.user_id,
+            roles_allowed_json=roles_allowed_json,
+            source_type=source_type,
+            source_value=source_value,
+            sensitive=bool(sensitive_flag),
+            allowed_users_json=json.dumps(allowed_users),
+            allowed_groups_json=json.dumps(allowed_groups),
+        )
+        previous = {}
+    meta = meta_hash(title=title, roles_allowed=roles_allowed, acl_mode=acl_mode, allowed_users=allowed_users,
+                     allowed_groups=allowed_groups, sensitive=bool(sensitive_flag))
 
-    # STEP 5: Connect to Qdrant and setup collection
+    # STEP 4-7: Embed and upload in batches. While one batch is being
+    # upserted to Qdrant, the next one is already being embedded.
     qc = get_qdrant()
-    ensure_collection(qc, vector_size)
-
-    # STEP 6: Create Qdrant points (vector + security metadata)
-    points = []
-    for idx, (chunk, vec) in enumerate(zip(chunks, vectors)):
-        point_id = int(f"{doc_id * 10000 + idx}")
-
-        payload = {
-            # ---- tenant + doc identity ----
-            "tenant_id": user.tenant_id,
-            "doc_id": doc_id,
-            "title": title,
-            "chunk_id": idx,
-
-            # ---- RBAC ----
-            "roles_allowed": roles_allowed,
-
-            # ---- Document-level ACL ----
-            "acl_mode": acl_mode,                 
-            "allowed_users": allowed_users,       
-            "allowed_groups": allowed_groups,     
-
-            # ---- sensitivity ----
-            "sensitive": bool(sensitive_flag or heuristic_sensitive(chunk)),
-
-            # ---- actual text used by RAG ----
-            "text": chunk,
-
-            # ---- metadata ----
-            "created_at": datetime.utcnow().isoformat(),
-        }
-
-        points.append(models.PointStruct(
-            id=point_id,
-            vector=vec,
-            payload=payload
-        ))
-
-    # STEP 7: Save to Qdrant
-    upsert_chunks(qc, points)
-    return doc_id, len(points)
\ No newline at end of file
+    bootstrap_schema(qc, user.tenant_id)  # the tenant's collection may be a dedicated one
+    created_at = datetime.utcnow().isoformat()
+    chunked = 0  # chunks produced so far; the final total is only known at the end
+    uploaded = 0
+    work = {"embedded": 0, "reused": 0, "unchanged": 0, "deleted": 0}
+
+    def upload(batch_model, points, rows, texts, stale):
+        # Texts first, so every point a search can find already has its text
+        get_chunk_store().put_many(user.tenant_id, doc_id, texts)
+        for collection, model in write_indexes(user.tenant_id):
+            # While a reindex moves the tenant to another model, that model's index gets the chunks too
+            same = points if model == batch_model else embedded_with(model, points, [chunk for _, _, chunk in texts])
+            upsert_chunks(qc, same, collection=collection)
+        if stale:
+            delete_points(qc, user.tenant_id, stale)
+        record_chunks(user.tenant_id, doc_id, rows)
+        return len(rows)
+
+    with ThreadPoolExecutor(max_workers=1) as uploader:
+        pending = None
+        for batch in chain([first_batch], batches):
+            start = chunked
+            chunked += len(batch)
+
+            # STEP 4: Convert text to numbers (embeddings) using sentence-transformers,
+            # with the tenant's model. Chunks unchanged since the last version are
+            # skipped, identical chunks already indexed for this tenant lend their
+            # stored vector, and the on-disk chunk cache answers before the model is called.
+            model = tenant_model(user.tenant_id)
+            todo = []
+            for idx, chunk in enumerate(batch, start=start):
+                h = chunk_hash(chunk, model)
+                if previous.get(idx, ())[:2] == (h, meta):
+                    work["unchanged"] += 1
+                else:
+                    todo.append((idx, chunk, h))
+            known = reusable_vectors(qc, user.tenant_id, [h for _, _, h in todo]) if todo else {}
+            new = {h: chunk for _, chunk, h in todo if h not in known}
+            if new:
+                vectors = embed_chunks(list(new.values()), model)
+
+                # STEP 5: Setup collection (cached after the first call)
+                ensure_collection(qc, vectors.shape[1], user.tenant_id, model=model)  # Usually 384 for MiniLM
+                known.update(zip(new, vectors.tolist()))
+            work["embedded"] += len(new)
+            work["reused"] += len(todo) - len(new)
+            report("embed", chunked, chunked)
+
+            # STEP 6: Create Qdrant points (vector + security metadata), with BM25
+            # term weights for hybrid search when the collection has room for them
+            with_sparse = has_sparse_vectors(user.tenant_id)
+            points, rows, texts, stale = [], [], [], []
+            for idx, chunk, h in todo:
+                pid = point_id(user.tenant_id, doc_id, idx)
+                if idx in previous and previous[idx][2] != pid:
+                    stale.append(previous[idx][2])  # indexed under an old integer id
+
+                payload = {
+                    # ---- tenant + doc identity ----
+                    "tenant_id": user.tenant_id,
+                    "doc_id": doc_id,
+                    "title": title,
+                    "chunk_id": idx,
+
+                    # ---- RBAC ----
+                    "roles_allowed": roles_allowed,
+
+                    # ---- Document-level ACL ----
+                    "acl_mode": acl_mode,                 
+                    "allowed_users": allowed_users,       
+                    "allowed_groups": allowed_groups,     
+
+                    # ---- sensitivity ----
+                    "sensitive": bool(sensitive_flag or heuristic_sensitive(chunk)),
+
+                    # ---- metadata (the text itself is in the chunk store) ----
+                    "content_hash": h,
+                    "created_at": created_at,
+                }
+
+                vector = {"": known[h], SPARSE_VECTOR: sparse_doc_vector(chunk)} if with_sparse else known[h]
+                points.append(models.PointStruct(
+                    id=pid,
+                    vector=vector,
+                    payload=payload
+                ))
+                rows.append((idx, h, meta, pid))
+                texts.append((idx, h, chunk))
+
+            # STEP 7: Save to Qdrant (wait for the previous batch first)
+            if pending is not None:
+                uploaded += pending.result()
+                pending = None
+            if points:
+                pending = uploader.submit(upload, model, points, rows, texts, stale)
+            report("upsert", uploaded + work["unchanged"], chunked)
+
+        if pending is not None:
+            uploaded += pending.result()
+            report("upsert", uploaded + work["unchanged"], chunked)
+
+    # A previous version of the document may have had more chunks than this one
+    if existing:
+        work["deleted"] = sum(1 for chunk_id in previous if chunk_id >= chunked)
+        delete_doc_chunks_from(qc, user.tenant_id, doc_id, chunked)
+        forget_chunks_from(doc_id, chunked)
+        get_chunk_store().delete_from(doc_id, chunked)
+    print(f"Indexed {chunked} chunks from {title}: {work['embedded']} embedded, {work['reused']} re-used, "
+          f"{work['unchanged']} unchanged, {work['deleted']} removed")
+    count_work(**work)
+
+    # With QDRANT_UPSERT_WAIT=0 the upserts were only acknowledged; wait until they are applied
+    if not upserts_wait() and uploaded:
+        doc_filter = models.Filter(must=[
+            models.FieldCondition(key="tenant_id", match=models.MatchValue(value=user.tenant_id)),
+            models.FieldCondition(key="doc_id", match=models.MatchValue(value=doc_id)),
+        ])
+        wait_until_indexed(qc, doc_filter, chunked)
+
+    # STEP 8: Cached answers for this tenant may now be incomplete
+    invalidate_tenant(user.tenant_id)
+    return doc_id, chunked, work
+
+def delete_document_for_user(user: User, doc_id: int) -> int:
+    """
+    Remove a document of the user's tenant everywhere: its points (one filtered
+    delete per collection), chunk hashes, stored texts and its row.
+    Returns how many chunks it had.
+    """
+    document = get_document(user.tenant_id, doc_id)
+    if document is None:
+        raise ValueError(f"Document {doc_id} not found")
+    n_chunks = len(doc_chunk_hashes(doc_id))
+    delete_doc_chunks_from(get_qdrant(), user.tenant_id, doc_id)
+    forget_chunks_from(doc_id)
+    get_chunk_store().delete_from(doc_id)
+    delete_document(doc_id)
+    print(f"Deleted {document['title']} ({n_chunks} chunks)")
+
+    # Cached answers may cite it
+    invalidate_tenant(user.tenant_id)
+    return n_chunks
@@ -0,0 +1,189 @@
+import os
+import shutil
+import socket
+import tempfile
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable
+
+from .db import get_conn
+from .models import User
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+
+# Jobs run inside the API process that queued them. Each job row names that
+# process (host/pid/start time), so a restarted process can tell its
+# predecessor's abandoned jobs from those of other live workers.
+_HOST = socket.gethostname()
+_OWNER = f"{_HOST}/{os.getpid()}/{time.time():.0f}"
+# Uploads are spooled under one directory per process
+SPOOL_ROOT = Path(tempfile.gettempdir()) / "rag_uploads"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _abandoned(owner: str | None) -> bool:
+    """Was the owner a process on this host that is gone (or an earlier process under our pid)?"""
+    if not owner:
+        return True  # queued before jobs named their process
+    host, pid, _ = owner.split("/")
+    if host != _HOST:
+        return False
+    return owner != _OWNER and (int(pid) == os.getpid() or not _pid_alive(int(pid)))
+
+
+def upload_spool_dir() -> str:
+    path = SPOOL_ROOT / str(os.getpid())
+    path.mkdir(parents=True, exist_ok=True)
+    return str(path)
+
+
+def _sweep_spool_dirs():
+    """Delete uploads spooled by processes that are gone (their jobs can no longer clean up)."""
+    if not SPOOL_ROOT.is_dir():
+        return
+    for path in SPOOL_ROOT.iterdir():
+        if path.name.isdigit() and (int(path.name) == os.getpid() or not _pid_alive(int(path.name))):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def init_jobs():
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS ingest_jobs(
+      job_id TEXT PRIMARY KEY,
+      tenant_id TEXT NOT NULL,
+      created_by INTEGER NOT NULL,
+      title TEXT NOT NULL,
+      source_type TEXT NOT NULL,
+      source_value TEXT NOT NULL,
+      status TEXT NOT NULL,
+      stage TEXT NOT NULL,
+      chunks_done INTEGER NOT NULL DEFAULT 0,
+      chunks_total INTEGER NOT NULL DEFAULT 0,
+      chunks_embedded INTEGER NOT NULL DEFAULT 0,
+      chunks_reused INTEGER NOT NULL DEFAULT 0,
+      doc_id INTEGER,
+      error TEXT,
+      owner TEXT,
+      created_at TEXT NOT NULL,
+      updated_at TEXT NOT NULL
+    )
+    """)
+    # Tables created before dedup reporting lack the work columns
+    cur.execute("PRAGMA table_info(ingest_jobs)")
+    columns = {row["name"] for row in cur.fetchall()}
+    for col in ("chunks_embedded", "chunks_reused"):
+        if col not in columns:
+            cur.execute(f"ALTER TABLE ingest_jobs ADD COLUMN {col} INTEGER NOT NULL DEFAULT 0")
+    if "owner" not in columns:
+        cur.execute("ALTER TABLE ingest_jobs ADD COLUMN owner TEXT")
+
+    # Jobs of a process that crashed or was restarted never finish: fail them so pollers stop
+    cur.execute("SELECT job_id, owner FROM ingest_jobs WHERE status IN ('queued', 'running')")
+    abandoned = [row["job_id"] for row in cur.fetchall() if _abandoned(row["owner"])]
+    now = datetime.utcnow().isoformat()
+    cur.executemany("UPDATE ingest_jobs SET status='failed', error='interrupted by restart', updated_at=? "
+                    "WHERE job_id=?", [(now, job_id) for job_id in abandoned])
+    conn.commit()
+    conn.close()
+    if abandoned:
+        print(f"Marked {len(abandoned)} ingest jobs interrupted by a restart as failed")
+    _sweep_spool_dirs()
+
+
+def _update_job(job_id: str, **fields):
+    fields["updated_at"] = datetime.utcnow().isoformat()
+    cols = ", ".join(f"{k}=?" for k in fields)
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(f"UPDATE ingest_jobs SET {cols} WHERE job_id=?", (*fields.values(), job_id))
+    conn.commit()
+    conn.close()
+
+
+def submit_ingest_job(user: User, title: str, source_type: str, source_value: str,
+                      extract: Callable[[], str | Iterable[str]], ingest: Callable,
+                      cleanup: Callable[[], None] | None = None) -> str:
+    """
+    Queue extract → chunk → embed → upsert on the ingest worker pool and
+    return the job id right away. `extract()` produces the raw text (or an
+    iterable of pages); `ingest(raw_text, on_progress)` runs the rest and
+    returns (doc_id, n_chunks, work). `cleanup()` runs afterwards, even on failure.
+    A reindex job extracts nothing and its doc_id is None.
+    """
+    job_id = uuid.uuid4().hex
+    now = datetime.utcnow().isoformat()
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO ingest_jobs(job_id,tenant_id,created_by,title,source_type,source_value,"
+        "status,stage,created_at,updated_at,owner) VALUES(?,?,?,?,?,?,?,?,?,?,?)",
+        (job_id, user.tenant_id, user.user_id, title, source_type, source_value, "queued", "queued", now, now,
+         _OWNER),
+    )
+    conn.commit()
+    conn.close()
+
+    _executor.submit(_run_job, job_id, extract, ingest, cleanup)
+    return job_id
+
+
+def _run_job(job_id: str, extract: Callable, ingest: Callable, cleanup: Callable[[], None] | None):
+    def on_progress(stage: str, done: int, total: int):
+        if stage in ("upsert", "copy"):
+            _update_job(job_id, stage=stage, chunks_done=done, chunks_total=total)
+        else:
+            _update_job(job_id, stage=stage, chunks_total=total)
+
+    try:
+        _update_job(job_id, status="running", stage="extract")
+        raw_text = extract()
+        doc_id, n_chunks, work = ingest(raw_text, on_progress)
+        _update_job(job_id, status="done", stage="done", doc_id=doc_id,
+                    chunks_done=n_chunks, chunks_total=n_chunks, chunks_embedded=work["embedded"],
+                    chunks_reused=work["reused"] + work["unchanged"])
+    except Exception as e:
+        traceback.print_exc()
+        _update_job(job_id, status="failed", error=str(e) or type(e).__name__)
+    finally:
+        if cleanup is not None:
+            try:
+                cleanup()
+            except OSError:
+                pass
+
+
+def get_job(job_id: str, tenant_id: str) -> dict | None:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM ingest_jobs WHERE job_id=? AND tenant_id=?", (job_id, tenant_id))
+    row = cur.fetchone()
+    conn.close()
+    if not row:
+        return None
+
+    job = dict(row)
+    total = job["chunks_total"]
+    job["progress"] = 1.0 if job["status"] == "done" else (job["chunks_done"] / total if total else 0.0)
+    return job
+
+
+def shutdown_jobs():
+    """Stop taking jobs; queued ones are dropped and failed (with their spooled uploads removed) at the next start."""
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,44 @@
+import os
+import re
+import threading
+
+NO_ANSWER = "I don't have information about that."
+
+
+class FakeBackend:
+    """
+    Deterministic stand-in for tests and load tests: answers with the start of
+    the first context passage, or NO_ANSWER without context. No model, no network.
+    """
+
+    name = "fake"
+
+    def __init__(self, n_ctx: int):
+        self.n_ctx = n_ctx
+        self.replicas = list(range(int(os.getenv("LLM_REPLICAS", "1"))))
+        self._stats = {"requests": 0}
+        self._lock = threading.Lock()
+
+    def _answer(self, messages: list[dict], max_tokens: int) -> list[str]:
+        with self._lock:
+            self._stats["requests"] += 1
+        context = messages[-1]["content"].split("\n\nQUESTION: ")[0].removeprefix("CONTEXT:\n")
+        # drop the [doc_id=... chunk_id=...] passage headers
+        text = re.sub(r"^\[doc_id=[^\]]*\]$", "", context, flags=re.MULTILINE).split("\n\n---\n\n")[0]
+        if context == "NO_CONTEXT" or not text.strip():
+            return NO_ANSWER.split()
+        return text.split()[:max_tokens]
+
+    def complete(self, replica, messages: list[dict], max_tokens: int) -> str:
+        return " ".join(self._answer(messages, max_tokens))
+
+    def stream(self, replica, messages: list[dict], max_tokens: int):
+        words = self._answer(messages, max_tokens)
+        return (w if i == 0 else " " + w for i, w in enumerate(words))
+
+    def count_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,111 @@
+import json
+import math
+import os
+import threading
+import requests
+from fastapi import HTTPException
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Any server speaking the OpenAI chat completions API: llama.cpp's llama-server,
+# vLLM, Ollama, LM Studio... One server can be shared by every API worker.
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://127.0.0.1:8080/v1").rstrip("/")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+LLM_MODEL = os.getenv("LLM_MODEL", "local")
+
+# Generations this worker sends at once; the rest wait in the scheduler queue.
+# Match it to the server's parallel slots (llama-server --parallel).
+LLM_HTTP_CONCURRENCY = int(os.getenv("LLM_HTTP_CONCURRENCY", "4"))
+LLM_CONNECT_TIMEOUT_S = float(os.getenv("LLM_CONNECT_TIMEOUT_S", "3"))
+# Longest wait for the next bytes: the first token (prompt evaluation) or between tokens
+LLM_READ_TIMEOUT_S = float(os.getenv("LLM_READ_TIMEOUT_S", "120"))
+
+# The server's tokenizer is not available locally; context packing estimates
+# tokens from length instead. Lower values leave more headroom.
+LLM_CHARS_PER_TOKEN = float(os.getenv("LLM_CHARS_PER_TOKEN", "3.5"))
+
+
+class OpenAICompatBackend:
+    """Chat completions over HTTP with a pooled keep-alive session."""
+
+    name = "openai_compat"
+
+    def __init__(self, n_ctx: int):
+        self.n_ctx = n_ctx
+        self.replicas = list(range(LLM_HTTP_CONCURRENCY))
+        self._session = requests.Session()
+        # One connection per concurrent generation, reused across requests.
+        # Only connection failures are retried: nothing reached the server yet.
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=LLM_HTTP_CONCURRENCY,
+            max_retries=Retry(total=2, connect=2, read=0, status=0, redirect=0, backoff_factor=0.2),
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        if LLM_API_KEY:
+            self._session.headers["Authorization"] = f"Bearer {LLM_API_KEY}"
+        self._stats = {"requests": 0, "errors": 0, "timeouts": 0}
+        self._lock = threading.Lock()
+
+    def _post(self, messages: list[dict], max_tokens: int, stream: bool) -> requests.Response:
+        with self._lock:
+            self._stats["requests"] += 1
+        try:
+            r = self._session.post(
+                f"{LLM_BASE_URL}/chat/completions",
+                json={"model": LLM_MODEL, "messages": messages, "max_tokens": max_tokens,
+                      "temperature": 0.1, "stream": stream},
+                timeout=(LLM_CONNECT_TIMEOUT_S, LLM_READ_TIMEOUT_S),
+                stream=stream,
+            )
+        except requests.Timeout:
+            self._count("timeouts")
+            raise HTTPException(504, "LLM server timed out")
+        except requests.ConnectionError:
+            self._count("errors")
+            raise HTTPException(503, "LLM server unavailable", headers={"Retry-After": "2"})
+        if r.status_code >= 400:
+            self._count("errors")
+            detail = r.text[:200]
+            r.close()
+            raise HTTPException(502, f"LLM server returned {r.status_code}: {detail}")
+        return r
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def complete(self, replica, messages: list[dict], max_tokens: int) -> str:
+        r = self._post(messages, max_tokens, stream=False)
+        return r.json()["choices"][0]["message"]["content"]
+
+    def stream(self, replica, messages: list[dict], max_tokens: int):
+        # Send now so a refused or failing request raises before the response starts
+        r = self._post(messages, max_tokens, stream=True)
+        r.encoding = "utf-8"  # text/event-stream defaults to latin-1 in requests
+        return self._events(r)
+
+    def _events(self, r: requests.Response):
+        # Closing early (client went away) drops the connection, which stops the generation
+        with r:
+            for line in r.iter_lines(decode_unicode=True):
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    continue  # read to the end of the body so the connection goes back to the pool
+                choices = json.loads(data).get("choices") or [{}]
+                piece = choices[0].get("delta", {}).get("content")
+                if piece:
+                    yield piece
+
+    def count_tokens(self, text: str) -> int:
+        return math.ceil(len(text) / LLM_CHARS_PER_TOKEN)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["base_url"] = LLM_BASE_URL
+        out["model"] = LLM_MODEL
+        return out
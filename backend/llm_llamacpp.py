@@ -0,0 +1,100 @@
+import os
+import threading
+from llama_cpp import Llama, LlamaRAMCache
+
+MODEL_PATH = os.getenv("GGUF_MODEL_PATH")
+
+# Each replica is an independent llama.cpp context. Keep
+# LLM_REPLICAS * LLM_N_THREADS at or below the number of physical cores.
+LLM_REPLICAS = int(os.getenv("LLM_REPLICAS", "1"))
+LLM_N_THREADS = int(os.getenv("LLM_N_THREADS", "4"))
+
+# Each replica keeps the KV cache of its last prompt and only evaluates the
+# tokens after the longest shared prefix. LLM_PRIME_PROMPT evaluates the system
+# prompt at load so the first request of every replica starts warm, and
+# LLM_PROMPT_CACHE_MB (split across replicas, 0 = off) keeps saved KV states of
+# recent prompts in RAM so a hot document context can be restored after other
+# requests ran on the replica. A saved state is roughly the KV cache of its
+# prompt: tens of MB for a small model and a 2k-token prompt.
+LLM_PRIME_PROMPT = os.getenv("LLM_PRIME_PROMPT", "1") == "1"
+LLM_PROMPT_CACHE_MB = int(os.getenv("LLM_PROMPT_CACHE_MB", "0"))
+
+_prompt_stats = {"prompts": 0, "prompt_tokens": 0, "reused_tokens": 0, "prefix_hits": 0, "context_cache_hits": 0}
+_prompt_lock = threading.Lock()
+
+
+class _Llama(Llama):
+    """Llama that counts how much of each prompt is served from its KV cache."""
+
+    def generate(self, tokens, *args, **kwargs):
+        # Same prefix match as Llama.generate, after any state restored from the prompt cache
+        reused = 0
+        if kwargs.get("reset", True) and self.n_tokens > 0:
+            reused = Llama.longest_token_prefix(self._input_ids.tolist(), tokens[:-1])
+        with _prompt_lock:
+            _prompt_stats["prompts"] += 1
+            _prompt_stats["prompt_tokens"] += len(tokens)
+            _prompt_stats["reused_tokens"] += reused
+            _prompt_stats["prefix_hits"] += reused > 0
+        return super().generate(tokens, *args, **kwargs)
+
+    def load_state(self, state):
+        # only called by create_completion on a prompt cache hit
+        with _prompt_lock:
+            _prompt_stats["context_cache_hits"] += 1
+        super().load_state(state)
+
+
+class LlamaCppBackend:
+    """In-process llama.cpp: LLM_REPLICAS copies of the GGUF model in this worker's memory."""
+
+    name = "local_llamacpp"
+
+    def __init__(self, n_ctx: int, prime_messages: list[dict] | None = None):
+        if not MODEL_PATH or not os.path.exists(MODEL_PATH):
+            raise RuntimeError(f"GGUF model not found: {MODEL_PATH}. Download to ./models/ and restart.")
+        self.n_ctx = n_ctx
+        self.replicas = [
+            _Llama(model_path=MODEL_PATH, n_ctx=n_ctx, verbose=False, n_threads=LLM_N_THREADS)
+            for _ in range(LLM_REPLICAS)
+        ]
+        if LLM_PROMPT_CACHE_MB > 0:
+            for llm in self.replicas:
+                llm.set_cache(LlamaRAMCache(capacity_bytes=LLM_PROMPT_CACHE_MB * 2**20 // LLM_REPLICAS))
+        if LLM_PRIME_PROMPT and prime_messages:
+            for llm in self.replicas:
+                self.prime(llm, prime_messages)
+            with _prompt_lock:
+                _prompt_stats.update(dict.fromkeys(_prompt_stats, 0))
+
+    def prime(self, llm: Llama, messages: list[dict]):
+        """Evaluate a prompt prefix (the system prompt) so requests only evaluate what follows it."""
+        llm.create_chat_completion(messages=messages, max_tokens=1, temperature=0.1)
+
+    def complete(self, llm: Llama, messages: list[dict], max_tokens: int) -> str:
+        response = llm.create_chat_completion(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.1  # Low creativity, stick to facts
+        )
+        return response["choices"][0]["message"]["content"]
+
+    def stream(self, llm: Llama, messages: list[dict], max_tokens: int):
+        chunks = llm.create_chat_completion(messages=messages, max_tokens=max_tokens, temperature=0.1, stream=True)
+        for chunk in chunks:
+            piece = chunk["choices"][0]["delta"].get("content")
+            if piece:
+                yield piece
+
+    def count_tokens(self, text: str) -> int:
+        # the tokenizer only reads the model vocab, so any replica will do
+        return len(self.replicas[0].tokenize(text.encode("utf-8"), add_bos=False))
+
+    def stats(self) -> dict:
+        with _prompt_lock:
+            out = dict(_prompt_stats)
+        out["primed"] = LLM_PRIME_PROMPT
+        out["context_cache_mb"] = LLM_PROMPT_CACHE_MB
+        out["evaluated_tokens"] = out["prompt_tokens"] - out["reused_tokens"]
+        out["reuse_ratio"] = round(out["reused_tokens"] / out["prompt_tokens"], 3) if out["prompt_tokens"] else 0.0
+        return out
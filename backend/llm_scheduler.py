@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from fastapi import HTTPException
+
+
+class QueueFullError(HTTPException):
+    """No room to wait for a model slot: tell the client to back off."""
+
+    def __init__(self, detail: str = "LLM is busy, please retry shortly"):
+        super().__init__(status_code=429, detail=detail, headers={"Retry-After": "1"})
+
+
+class QueueTimeoutError(HTTPException):
+    """Waited in the queue for too long without getting a model slot."""
+
+    def __init__(self, detail: str = "LLM queue wait timed out"):
+        super().__init__(status_code=503, detail=detail, headers={"Retry-After": "2"})
+
+
+class _Ticket:
+    __slots__ = ("tenant_id", "replica", "enqueued_at")
+
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        self.replica = None
+        self.enqueued_at = time.monotonic()
+
+
+class InferenceScheduler:
+    """
+    Hands out a fixed set of model replicas (slots) to callers.
+
+    - At most len(replicas) generations run at once, so llama.cpp threads never
+      oversubscribe the CPU.
+    - Callers that cannot get a slot wait in a bounded queue (max_queue total,
+      max_per_tenant per tenant) for at most timeout_s.
+    - Freed slots go to tenants round-robin, so one busy tenant cannot starve
+      the others.
+    """
+
+    def __init__(self, replicas: list, max_queue: int, max_per_tenant: int, timeout_s: float):
+        self._free = list(replicas)
+        self._n_slots = len(replicas)
+        self.max_queue = max_queue
+        self.max_per_tenant = max_per_tenant
+        self.timeout_s = timeout_s
+
+        self._cond = threading.Condition()
+        self._waiting: dict[str, deque] = {}
+        self._turns: deque = deque()  # tenants with waiting tickets, round-robin order
+        self._queued = 0
+
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._wait_ms: deque = deque(maxlen=1000)
+
+    @contextmanager
+    def slot(self, tenant_id: str):
+        replica = self.acquire(tenant_id)
+        try:
+            yield replica
+        finally:
+            self.release(replica)
+
+    def acquire(self, tenant_id: str):
+        with self._cond:
+            if self._free and not self._queued:
+                self._admitted += 1
+                self._wait_ms.append(0.0)
+                return self._free.pop()
+
+            tenant_queue = self._waiting.get(tenant_id)
+            if self._queued >= self.max_queue or (tenant_queue and len(tenant_queue) >= self.max_per_tenant):
+                self._rejected += 1
+                raise QueueFullError()
+
+            ticket = _Ticket(tenant_id)
+            if tenant_queue is None:
+                tenant_queue = self._waiting[tenant_id] = deque()
+                self._turns.append(tenant_id)
+            tenant_queue.append(ticket)
+            self._queued += 1
+
+            deadline = ticket.enqueued_at + self.timeout_s
+            while ticket.replica is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._drop(ticket)
+                    self._timed_out += 1
+                    raise QueueTimeoutError()
+                self._cond.wait(remaining)
+
+            self._admitted += 1
+            self._wait_ms.append((time.monotonic() - ticket.enqueued_at) * 1000)
+            return ticket.replica
+
+    def release(self, replica):
+        with self._cond:
+            ticket = self._next_ticket()
+            if ticket is None:
+                self._free.append(replica)
+                return
+            ticket.replica = replica
+            self._cond.notify_all()
+
+    def _next_ticket(self) -> _Ticket | None:
+        if not self._turns:
+            return None
+        tenant_id = self._turns.popleft()
+        tenant_queue = self._waiting[tenant_id]
+        ticket = tenant_queue.popleft()
+        self._queued -= 1
+        if tenant_queue:
+            self._turns.append(tenant_id)
+        else:
+            del self._waiting[tenant_id]
+        return ticket
+
+    def _drop(self, ticket: _Ticket):
+        tenant_queue = self._waiting[ticket.tenant_id]
+        tenant_queue.remove(ticket)
+        self._queued -= 1
+        if not tenant_queue:
+            del self._waiting[ticket.tenant_id]
+            self._turns.remove(ticket.tenant_id)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            waits = sorted(self._wait_ms)
+            return {
+                "slots": self._n_slots,
+                "in_flight": self._n_slots - len(self._free),
+                "queue_depth": self._queued,
+                "queue_depth_by_tenant": {t: len(q) for t, q in self._waiting.items()},
+                "max_queue": self.max_queue,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "wait_ms_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_ms_p95": waits[min(len(waits) - 1, math.ceil(0.95 * len(waits)) - 1)] if waits else 0.0,
+            }
@@ -0,0 +1,657 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+from qdrant_client import models
+from qdrant_client.http.models import QueryResponse
+from qdrant_client.hybrid.fusion import reciprocal_rank_fusion
+
+# Rows allocated when a tenant's vector file is created; the file doubles when full
+_INITIAL_ROWS = 1024
+# Rows dequantized at a time when scoring int8 codes (bounds the temporary float32 copy)
+_INT8_BLOCK_ROWS = 16384
+# Set bits of every byte value, for Hamming distances of binary codes (np.bitwise_count needs NumPy 2)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _as_list(conditions) -> list:
+    if conditions is None:
+        return []
+    return conditions if isinstance(conditions, list) else [conditions]
+
+
+def _values(payload: dict, key: str) -> list:
+    value = payload.get(key)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _condition(cond, point_id, payload: dict) -> bool:
+    if isinstance(cond, models.Filter):
+        return matches(cond, point_id, payload)
+    if isinstance(cond, models.IsEmptyCondition):
+        return not _values(payload, cond.is_empty.key)
+    if isinstance(cond, models.HasIdCondition):
+        return point_id in cond.has_id
+    if isinstance(cond, models.FieldCondition):
+        values = _values(payload, cond.key)
+        if isinstance(cond.match, models.MatchValue):
+            return cond.match.value in values
+        if isinstance(cond.match, models.MatchAny):
+            return any(v in cond.match.any for v in values)
+        if cond.match is None and cond.range is not None:
+            r = cond.range
+            return any(
+                isinstance(v, (int, float)) and not isinstance(v, bool)
+                and (r.gte is None or v >= r.gte) and (r.gt is None or v > r.gt)
+                and (r.lte is None or v <= r.lte) and (r.lt is None or v < r.lt)
+                for v in values
+            )
+    raise ValueError(f"Filter condition not supported by the local index: {cond!r}")
+
+
+def matches(q_filter: models.Filter | None, point_id, payload: dict) -> bool:
+    """Qdrant filter semantics: every must, no must_not, and at least one should (if any)."""
+    if q_filter is None:
+        return True
+    if not all(_condition(c, point_id, payload) for c in _as_list(q_filter.must)):
+        return False
+    if any(_condition(c, point_id, payload) for c in _as_list(q_filter.must_not)):
+        return False
+    should = _as_list(q_filter.should)
+    return not should or any(_condition(c, point_id, payload) for c in should)
+
+
+def _tenant_of(q_filter: models.Filter | None) -> str | None:
+    """The tenant a filter is pinned to (a must tenant_id == value), so only its partition is searched."""
+    for cond in _as_list(q_filter.must if q_filter else None):
+        if isinstance(cond, models.Filter):
+            tenant = _tenant_of(cond)
+            if tenant is not None:
+                return tenant
+        elif (isinstance(cond, models.FieldCondition) and cond.key == "tenant_id"
+              and isinstance(cond.match, models.MatchValue)):
+            return str(cond.match.value)
+    return None
+
+
+def _both(a: models.Filter | None, b: models.Filter | None) -> models.Filter | None:
+    if a is None or b is None:
+        return a or b
+    return models.Filter(must=[a, b])
+
+
+def _project(payload: dict, with_payload) -> dict | None:
+    if with_payload is True:
+        return dict(payload)
+    if isinstance(with_payload, list):
+        return {k: payload[k] for k in with_payload if k in payload}
+    return None
+
+
+def _quantization_name(config) -> str | None:
+    if isinstance(config, models.ScalarQuantization):
+        return "int8"
+    if isinstance(config, models.BinaryQuantization):
+        return "binary"
+    return None
+
+
+def _top_rows(scores: np.ndarray, accept, limit: int) -> list[tuple[float, int]]:
+    """
+    Best-scoring rows that pass accept(row), best first. Looks at the top
+    few candidates first and widens only when the filter rejected too many.
+    Rows scored -inf are never returned.
+    """
+    out: list[tuple[float, int]] = []
+    checked: set[int] = set()
+    k = max(limit * 4, 32)
+    while True:
+        if k >= len(scores):
+            order = np.argsort(-scores, kind="stable")
+        else:
+            top = np.argpartition(-scores, k - 1)[:k]
+            order = top[np.argsort(-scores[top], kind="stable")]
+        for row in order.tolist():
+            if row in checked:
+                continue
+            checked.add(row)
+            if scores[row] == -np.inf:
+                return out
+            if accept(row):
+                out.append((float(scores[row]), row))
+                if len(out) == limit:
+                    return out
+        if k >= len(scores):
+            return out
+        k *= 4
+
+
+class _Partition:
+    """
+    One tenant's points: a memory-mapped float32 matrix with one row per point,
+    and with quantization an in-RAM copy of it (int8 with a per-row scale, or
+    one sign bit per dimension) that searches scan instead.
+    """
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self.quantization: str | None = None
+        self.codes: np.ndarray | None = None
+        self.scales: np.ndarray | None = None
+        self.n_rows = 0  # high-water mark; rows below it are in use or free
+        self.ids: list = []
+        self.payloads: list[dict | None] = []
+        self.sparse: list[dict | None] = []
+        self.free: list[int] = []
+        self.postings: dict[str, dict[int, dict[int, float]]] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.truncate(_INITIAL_ROWS * dim * 4)
+        self._map()
+
+    def _map(self):
+        capacity = os.path.getsize(self.path) // (self.dim * 4)
+        self.vectors = np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.alive)] = self.alive
+        self.alive = alive
+        if self.quantization:
+            self._resize_codes()
+
+    def _resize_codes(self):
+        capacity = len(self.vectors)
+        if self.quantization == "int8":
+            codes = np.zeros((capacity, self.dim), dtype=np.int8)
+        else:
+            codes = np.zeros((capacity, (self.dim + 7) // 8), dtype=np.uint8)
+        scales = np.zeros(capacity, dtype=np.float32)
+        if self.codes is not None and self.codes.shape[1] == codes.shape[1] and self.codes.dtype == codes.dtype:
+            codes[:len(self.codes)] = self.codes
+            scales[:len(self.scales)] = self.scales
+        self.codes, self.scales = codes, scales
+
+    def _encode(self, start: int, stop: int):
+        v = np.asarray(self.vectors[start:stop])
+        if self.quantization == "int8":
+            scale = np.abs(v).max(axis=1)
+            scale[scale == 0] = 1.0
+            self.codes[start:stop] = np.round(v / scale[:, None] * 127)
+            self.scales[start:stop] = scale / 127
+        else:
+            self.codes[start:stop] = np.packbits(v > 0, axis=1)
+
+    def quantize(self, mode: str | None):
+        """(Re)build the quantized copy of every row for mode int8, binary or None (drop it)."""
+        self.quantization = mode
+        self.codes = self.scales = None
+        if mode:
+            self._resize_codes()
+            self._encode(0, self.n_rows)
+
+    def _grow(self):
+        self.vectors.flush()
+        capacity = len(self.vectors)
+        del self.vectors
+        with open(self.path, "r+b") as f:
+            f.truncate(capacity * 2 * self.dim * 4)
+        self._map()
+
+    def _slot(self, row: int):
+        while self.n_rows <= row:
+            if self.n_rows == len(self.vectors):
+                self._grow()
+            self.ids.append(None)
+            self.payloads.append(None)
+            self.sparse.append(None)
+            self.n_rows += 1
+
+    def load(self, row: int, point_id, payload: dict, sparse: dict):
+        """Register a row already on disk (startup)."""
+        self._slot(row)
+        self._set(row, point_id, payload, sparse)
+
+    def put(self, point_id, vector: np.ndarray, payload: dict, sparse: dict, row: int | None = None) -> int:
+        if row is None:
+            row = self.free.pop() if self.free else self.n_rows
+        self._slot(row)
+        self.vectors[row] = vector
+        if self.quantization:
+            self._encode(row, row + 1)
+        self._set(row, point_id, payload, sparse)
+        return row
+
+    def _set(self, row: int, point_id, payload: dict, sparse: dict):
+        self.ids[row] = point_id
+        self.payloads[row] = payload
+        self.sparse[row] = sparse
+        self.alive[row] = True
+        for name, (indices, values) in sparse.items():
+            postings = self.postings.setdefault(name, {})
+            for term, weight in zip(indices, values):
+                postings.setdefault(term, {})[row] = weight
+
+    def remove(self, row: int) -> dict:
+        sparse = self.sparse[row] or {}
+        for name, (indices, _) in sparse.items():
+            for term in indices:
+                self.postings[name][term].pop(row, None)
+        self.ids[row] = self.payloads[row] = self.sparse[row] = None
+        self.alive[row] = False
+        self.free.append(row)
+        return sparse
+
+    def dense_scores(self, query: np.ndarray) -> np.ndarray:
+        scores = self.vectors[:self.n_rows] @ query
+        scores[~self.alive[:self.n_rows]] = -np.inf
+        return scores
+
+    def approx_scores(self, query: np.ndarray) -> np.ndarray:
+        """Scores from the quantized copy: int8 dot products, or 1 - 2 * Hamming distance / dim."""
+        n = self.n_rows
+        if self.quantization == "int8":
+            scores = np.empty(n, dtype=np.float32)
+            for start in range(0, n, _INT8_BLOCK_ROWS):
+                stop = min(start + _INT8_BLOCK_ROWS, n)
+                scores[start:stop] = self.codes[start:stop].astype(np.float32) @ query
+            scores *= self.scales[:n]
+        else:
+            distance = _POPCOUNT[self.codes[:n] ^ np.packbits(query > 0)].sum(axis=1, dtype=np.int32)
+            scores = 1 - 2 * distance.astype(np.float32) / self.dim
+        scores[~self.alive[:n]] = -np.inf
+        return scores
+
+    def exact_scores(self, rows: list[int], query: np.ndarray) -> list[float]:
+        """Full-precision scores of a few rows, read from the vector file."""
+        return (np.asarray(self.vectors[rows]) @ query).tolist() if rows else []
+
+    def sparse_scores(self, name: str, weights: dict[int, float]) -> np.ndarray:
+        scores = np.zeros(self.n_rows, dtype=np.float32)
+        postings = self.postings.get(name, {})
+        for term, qw in weights.items():
+            for row, w in postings.get(term, {}).items():
+                scores[row] += qw * w
+        scores[scores <= 0] = -np.inf  # like Qdrant: no shared term, no hit
+        return scores
+
+
+class _Collection:
+    """A collection on disk: config.json, points.db (ids, payloads, sparse vectors) and one vector file per tenant."""
+
+    def __init__(self, path: str, config: dict):
+        self.path = path
+        self.config = config
+        self.dim = config["size"]
+        self.lock = threading.RLock()
+        self.partitions: dict[str, _Partition] = {}
+        self.where: dict = {}  # point id -> (tenant, row)
+        self.df: dict[str, dict[int, int]] = {name: {} for name in config["sparse_vectors"]}
+        os.makedirs(path, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(path, "points.db"), check_same_thread=False, timeout=5)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # id has no declared type, so integer and string (uuid) ids both keep their type
+        self.db.execute("""
+        CREATE TABLE IF NOT EXISTS points(
+          id PRIMARY KEY,
+          tenant_id TEXT NOT NULL,
+          row INTEGER NOT NULL,
+          payload TEXT NOT NULL,
+          sparse TEXT NOT NULL
+        )
+        """)
+        self.db.commit()
+        self.save_config()
+        for point_id, tenant, row, payload, sparse in self.db.execute("SELECT id, tenant_id, row, payload, sparse FROM points"):
+            sparse = json.loads(sparse)
+            self._partition(tenant).load(row, point_id, json.loads(payload), sparse)
+            self.where[point_id] = (tenant, row)
+            self._count_terms(sparse, +1)
+        for part in self.partitions.values():
+            part.free = [r for r in range(part.n_rows) if part.ids[r] is None]
+            part.quantize(config.get("quantization"))
+
+    def save_config(self):
+        with open(os.path.join(self.path, "config.json"), "w") as f:
+            json.dump(self.config, f)
+
+    def _partition(self, tenant: str) -> _Partition:
+        part = self.partitions.get(tenant)
+        if part is None:
+            name = hashlib.sha1(tenant.encode()).hexdigest()[:16]
+            part = self.partitions[tenant] = _Partition(os.path.join(self.path, f"{name}.f32"), self.dim)
+            part.quantize(self.config.get("quantization"))
+        return part
+
+    def set_quantization(self, mode: str | None):
+        with self.lock:
+            self.config["quantization"] = mode
+            self.save_config()
+            for part in self.partitions.values():
+                part.quantize(mode)
+
+    def _count_terms(self, sparse: dict, delta: int):
+        for name, (indices, _) in sparse.items():
+            df = self.df.setdefault(name, {})
+            for term in indices:
+                df[term] = df.get(term, 0) + delta
+
+    def _partitions_for(self, q_filter) -> list[_Partition]:
+        tenant = _tenant_of(q_filter)
+        if tenant is None:
+            return list(self.partitions.values())
+        return [self.partitions[tenant]] if tenant in self.partitions else []
+
+    def upsert(self, points: list[models.PointStruct]):
+        with self.lock:
+            rows, touched = [], set()
+            for p in points:
+                vector = p.vector if isinstance(p.vector, dict) else {"": p.vector}
+                dense = np.asarray(vector[""], dtype=np.float32)
+                norm = np.linalg.norm(dense)
+                dense = dense / norm if norm else dense  # cosine, as Qdrant stores it
+                sparse = {name: (list(v.indices), list(v.values)) for name, v in vector.items() if name}
+                payload = p.payload or {}
+                tenant = str(payload.get("tenant_id", ""))
+
+                reuse = None
+                if p.id in self.where:
+                    old_tenant, old_row = self.where[p.id]
+                    self._count_terms(self.partitions[old_tenant].remove(old_row), -1)
+                    if old_tenant == tenant:
+                        self.partitions[tenant].free.remove(old_row)
+                        reuse = old_row
+                part = self._partition(tenant)
+                row = part.put(p.id, dense, payload, sparse, row=reuse)
+                self.where[p.id] = (tenant, row)
+                self._count_terms(sparse, +1)
+                touched.add(tenant)
+                rows.append((p.id, tenant, row, json.dumps(payload), json.dumps(sparse)))
+            # vectors reach the disk before the rows that point at them
+            for tenant in touched:
+                self.partitions[tenant].vectors.flush()
+            self.db.executemany("INSERT OR REPLACE INTO points(id, tenant_id, row, payload, sparse) VALUES(?,?,?,?,?)", rows)
+            self.db.commit()
+
+    def delete(self, point_ids: list):
+        with self.lock:
+            gone = [pid for pid in point_ids if pid in self.where]
+            for pid in gone:
+                tenant, row = self.where.pop(pid)
+                self._count_terms(self.partitions[tenant].remove(row), -1)
+            self.db.executemany("DELETE FROM points WHERE id=?", [(pid,) for pid in gone])
+            self.db.commit()
+
+    def delete_payload(self, keys: list[str], point_ids: list):
+        with self.lock:
+            rows = []
+            for pid in point_ids:
+                if pid not in self.where:
+                    continue
+                tenant, row = self.where[pid]
+                payload = self.partitions[tenant].payloads[row]
+                for key in keys:
+                    payload.pop(key, None)
+                rows.append((json.dumps(payload), pid))
+            self.db.executemany("UPDATE points SET payload=? WHERE id=?", rows)
+            self.db.commit()
+
+    def matching_ids(self, q_filter) -> list:
+        with self.lock:
+            return [
+                part.ids[row]
+                for part in self._partitions_for(q_filter)
+                for row in np.flatnonzero(part.alive[:part.n_rows]).tolist()
+                if matches(q_filter, part.ids[row], part.payloads[row])
+            ]
+
+    def _idf_weights(self, name: str, query: models.SparseVector) -> dict[int, float]:
+        modifier = self.config["sparse_vectors"].get(name)
+        n = len(self.where)
+        weights = {}
+        for term, value in zip(query.indices, query.values):
+            if modifier == "idf":
+                df = self.df.get(name, {}).get(term, 0)
+                value *= math.log((n - df + 0.5) / (df + 0.5) + 1)
+            weights[term] = weights.get(term, 0.0) + value
+        return weights
+
+    def query(self, query, using: str | None, q_filter, limit: int, with_payload, with_vectors=False,
+              params: models.SearchParams | None = None) -> list[models.ScoredPoint]:
+        with self.lock:
+            fetch, rescore = limit, False
+            if isinstance(query, models.SparseVector):
+                weights = self._idf_weights(using, query)
+                score = lambda part: part.sparse_scores(using, weights)
+            else:
+                q = np.asarray(query, dtype=np.float32)
+                norm = np.linalg.norm(q)
+                q = q / norm if norm else q
+                score = lambda part: part.dense_scores(q)
+                quantization = params.quantization if params is not None else None
+                if self.config.get("quantization") and not (quantization and quantization.ignore):
+                    # Like Qdrant: oversample by the quantized score, rescore with the originals
+                    score = lambda part: part.approx_scores(q)
+                    rescore = quantization is None or quantization.rescore is not False
+                    oversampling = quantization.oversampling if quantization and quantization.oversampling else 1.0
+                    fetch = max(limit, math.ceil(limit * oversampling))
+
+            found = []
+            for part in self._partitions_for(q_filter):
+                if part.n_rows == 0:
+                    continue
+                accept = lambda row, part=part: matches(q_filter, part.ids[row], part.payloads[row])
+                hits = _top_rows(score(part), accept, fetch)
+                if rescore:
+                    rows = [row for _, row in hits]
+                    hits = list(zip(part.exact_scores(rows, q), rows))
+                found.extend((s, part, row) for s, row in hits)
+            found.sort(key=lambda x: -x[0])
+            return [
+                models.ScoredPoint(id=part.ids[row], version=0, score=s,
+                                   payload=_project(part.payloads[row], with_payload),
+                                   vector=self._vector(part, row) if with_vectors else None)
+                for s, part, row in found[:limit]
+            ]
+
+    def _vector(self, part: _Partition, row: int):
+        dense = part.vectors[row].tolist()
+        if not self.config["sparse_vectors"]:
+            return dense
+        out = {"": dense}
+        for name, (indices, values) in (part.sparse[row] or {}).items():
+            out[name] = models.SparseVector(indices=indices, values=values)
+        return out
+
+    def records(self, point_ids: list, with_payload, with_vectors) -> list[models.Record]:
+        with self.lock:
+            out = []
+            for pid in point_ids:
+                if pid not in self.where:
+                    continue
+                tenant, row = self.where[pid]
+                part = self.partitions[tenant]
+                out.append(models.Record(id=pid, payload=_project(part.payloads[row], with_payload),
+                                         vector=self._vector(part, row) if with_vectors else None))
+            return out
+
+    def close(self):
+        with self.lock:
+            for part in self.partitions.values():
+                part.vectors.flush()
+            self.db.close()
+
+
+class LocalIndex:
+    """
+    In-process stand-in for QdrantClient (VECTOR_STORE=local), with the same
+    methods and arguments qdrant_store uses, so the rest of the code does not
+    change. Each tenant's vectors live in their own memory-mapped float32
+    file and a search only scans the partition its filter is pinned to:
+    an exact NumPy dot-product top-k, checked against the very same
+    models.Filter Qdrant would get (tenant, roles, sensitive, ACLs). Dense,
+    BM25 sparse (with IDF) and RRF hybrid queries are supported, and int8 or
+    binary quantization with oversampling and rescoring. Everything is
+    persisted under `path` and loaded when the index is opened.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._collections: dict[str, _Collection] = {}
+        os.makedirs(path, exist_ok=True)
+        for name in sorted(os.listdir(path)):
+            config = os.path.join(path, name, "config.json")
+            if os.path.exists(config):
+                with open(config) as f:
+                    self._collections[name] = _Collection(os.path.join(path, name), json.load(f))
+
+    def _get(self, collection_name: str) -> _Collection:
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return collection
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self._collections
+
+    def get_collections(self):
+        return SimpleNamespace(collections=[SimpleNamespace(name=n) for n in sorted(self._collections)])
+
+    def create_collection(self, collection_name: str, vectors_config: models.VectorParams,
+                          sparse_vectors_config: dict | None = None, **kwargs) -> bool:
+        if vectors_config.distance != models.Distance.COSINE:
+            raise ValueError("The local index only supports cosine distance")
+        with self._lock:
+            if collection_name in self._collections:
+                raise ValueError(f"Collection {collection_name} already exists")
+            config = {
+                "size": vectors_config.size,
+                "sparse_vectors": {
+                    name: "idf" if params.modifier == models.Modifier.IDF else None
+                    for name, params in (sparse_vectors_config or {}).items()
+                },
+                "payload_schema": {},
+                "quantization": _quantization_name(kwargs.get("quantization_config")),
+            }
+            self._collections[collection_name] = _Collection(os.path.join(self.path, collection_name), config)
+        return True
+
+    def delete_collection(self, collection_name: str) -> bool:
+        with self._lock:
+            collection = self._collections.pop(collection_name, None)
+        if collection is None:
+            return False
+        collection.close()
+        shutil.rmtree(collection.path, ignore_errors=True)
+        return True
+
+    def get_collection(self, collection_name: str):
+        collection = self._get(collection_name)
+        config = collection.config
+        sparse = {
+            name: models.SparseVectorParams(modifier=models.Modifier.IDF if modifier == "idf" else None)
+            for name, modifier in config["sparse_vectors"].items()
+        }
+        quantization = config.get("quantization")
+        return SimpleNamespace(
+            status=models.CollectionStatus.GREEN,
+            points_count=len(collection.where),
+            payload_schema=dict(config["payload_schema"]),
+            config=SimpleNamespace(
+                params=SimpleNamespace(
+                    vectors=models.VectorParams(size=config["size"], distance=models.Distance.COSINE,
+                                                on_disk=True if quantization else None),
+                    sparse_vectors=sparse,
+                ),
+                quantization_config=(
+                    models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8))
+                    if quantization == "int8" else
+                    models.BinaryQuantization(binary=models.BinaryQuantizationConfig())
+                    if quantization == "binary" else None
+                ),
+            ),
+        )
+
+    def update_collection(self, collection_name: str, quantization_config=None, **kwargs) -> bool:
+        # Only the quantization can change; the originals are always in the memory-mapped files
+        if quantization_config is not None:
+            self._get(collection_name).set_quantization(_quantization_name(quantization_config))
+        return True
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs):
+        # Filters are checked on candidates in score order, so there is nothing to build;
+        # remember the field so the schema check in qdrant_store is satisfied.
+        collection = self._get(collection_name)
+        with collection.lock:
+            collection.config["payload_schema"][field_name] = str(getattr(field_schema, "type", field_schema))
+            collection.save_config()
+
+    def upsert(self, collection_name: str, points: list[models.PointStruct], wait: bool = True, **kwargs):
+        self._get(collection_name).upsert(points)
+
+    def delete_payload(self, collection_name: str, keys: list[str], points, wait: bool = True, **kwargs):
+        self._get(collection_name).delete_payload(keys, _as_list(points))
+
+    def delete(self, collection_name: str, points_selector, wait: bool = True, **kwargs):
+        collection = self._get(collection_name)
+        if isinstance(points_selector, models.FilterSelector):
+            ids = collection.matching_ids(points_selector.filter)
+        elif isinstance(points_selector, models.PointIdsList):
+            ids = points_selector.points
+        else:
+            ids = list(points_selector)
+        collection.delete(ids)
+
+    def count(self, collection_name: str, count_filter: models.Filter | None = None, exact: bool = True):
+        return models.CountResult(count=len(self._get(collection_name).matching_ids(count_filter)))
+
+    def retrieve(self, collection_name: str, ids: list, with_payload=True, with_vectors=False, **kwargs):
+        return self._get(collection_name).records(ids, with_payload, with_vectors)
+
+    def scroll(self, collection_name: str, scroll_filter: models.Filter | None = None, limit: int = 10,
+               offset=None, with_payload=True, with_vectors=False, **kwargs):
+        """Points in id order from offset on, and the id to continue from (None at the end)."""
+        collection = self._get(collection_name)
+        key = lambda pid: (isinstance(pid, str), pid)
+        ids = sorted(collection.matching_ids(scroll_filter), key=key)
+        if offset is not None:
+            ids = [pid for pid in ids if key(pid) >= key(offset)]
+        page, rest = ids[:limit], ids[limit:]
+        return collection.records(page, with_payload, with_vectors), (rest[0] if rest else None)
+
+    def search(self, collection_name: str, query_vector, query_filter: models.Filter | None = None,
+               search_params: models.SearchParams | None = None, limit: int = 10, with_payload=True,
+               with_vectors=False, **kwargs) -> list[models.ScoredPoint]:
+        return self._get(collection_name).query(query_vector, None, query_filter, limit, with_payload, with_vectors,
+                                                search_params)
+
+    def query_points(self, collection_name: str, query=None, using: str | None = None, prefetch=None,
+                     query_filter: models.Filter | None = None, search_params: models.SearchParams | None = None,
+                     limit: int = 10, with_payload=True, with_vectors=False, **kwargs) -> QueryResponse:
+        collection = self._get(collection_name)
+        if prefetch:
+            if not (isinstance(query, models.FusionQuery) and query.fusion == models.Fusion.RRF):
+                raise ValueError("The local index only supports RRF fusion over prefetches")
+            results = [
+                collection.query(pf.query, pf.using, _both(pf.filter, query_filter), pf.limit, with_payload, with_vectors,
+                                 pf.params)
+                for pf in _as_list(prefetch)
+            ]
+            return QueryResponse(points=reciprocal_rank_fusion(results, limit=limit))
+        return QueryResponse(points=collection.query(query, using, query_filter, limit, with_payload, with_vectors,
+                                                     search_params))
+
+    def close(self):
+        with self._lock:
+            for collection in self._collections.values():
+                collection.close()
+            self._collections.clear()
@@ -1,44 +1,197 @@
 import os
 import json
+import tempfile
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv, find_dotenv
-from sentence_transformers import SentenceTransformer
 
-from .db import init_db, seed_demo_users
+# Before the backend imports: several modules read their settings when imported
+load_dotenv(find_dotenv(usecwd=True), override=True)
+
+from .db import init_db, seed_demo_users, get_document
 from .audit import init_audit, log_audit
+from . import answer_cache, chunk_store, dedup, rerank
 from .auth import login, require_user
-from .models import LoginRequest, LoginResponse, ChatRequest, ChatResponse, Citation, User
+from .models import (LoginRequest, LoginResponse, ChatRequest, ChatResponse, Citation, User, ChunkingSettings,
+                     ReindexRequest)
 from .security import build_qdrant_security_filter
-from .qdrant_store import get_qdrant, search
-from .rag_llm import answer_from_context
-from .ingest import ingest_document_for_user, extract_url, extract_pdf
+from .qdrant_store import get_qdrant, close_qdrant, bootstrap_schema, search, shard_stats, tenant_route, tenant_model
+from . import rag_llm
+from .rag_llm import answer_from_context, stream_answer_from_context, context_budget, count_tokens as count_llm_tokens
+from .context import pack_context
+from .ingest import ingest_document_for_user, delete_document_for_user
+from .extract import iter_pdf_pages_pooled, extract_url_pooled, shutdown_extract_pool
+from .tenant_settings import init_tenant_settings
+from .chunking import chunking_settings, set_chunking_settings
+from .jobs import init_jobs, submit_ingest_job, get_job, shutdown_jobs, upload_spool_dir
+from .embeddings import embed_query, start_warm_up, query_cache_stats, chunk_cache_stats
+from .sharding import move_tenant, claim_move, release_move
 
 from .rbac import require_admin
 from .audit import list_audit_for_tenant
 
-load_dotenv(find_dotenv(usecwd=True), override=True)
-
 app = FastAPI(title="Enterprise RAG Platform")
 
-_embedder = SentenceTransformer("all-MiniLM-L6-v2")
-
 @app.get("/admin/audit")
 def admin_audit(user: User = Depends(require_user), limit: int = 100):
     require_admin(user)
     return {"items": list_audit_for_tenant(user.tenant_id, limit=limit)}
 
+@app.get("/admin/metrics")
+def admin_metrics(user: User = Depends(require_user)):
+    require_admin(user)
+    return {
+        "llm": rag_llm.metrics(),
+        "llm_backend": rag_llm.backend_stats(),
+        "answer_cache": answer_cache.stats(),
+        "query_embed_cache": query_cache_stats(),
+        "chunk_embed_cache": chunk_cache_stats(),
+        "ingest_dedup": dedup.stats(),
+        "rerank": rerank.stats(),
+        "vector_shards": shard_stats(),
+        "chunk_text_store": chunk_store.stats(),
+    }
+
+@app.get("/admin/chunking")
+def admin_get_chunking(user: User = Depends(require_user)):
+    require_admin(user)
+    return chunking_settings(user.tenant_id)
+
+@app.put("/admin/chunking")
+def admin_set_chunking(req: ChunkingSettings, user: User = Depends(require_user)):
+    """Chunking used for this tenant's future uploads (already indexed documents keep theirs)."""
+    require_admin(user)
+    try:
+        return set_chunking_settings(user.tenant_id, req.chunker, req.chunk_tokens, req.overlap_tokens)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@app.post("/admin/reindex", status_code=202)
+def admin_reindex(req: ReindexRequest, user: User = Depends(require_user)):
+    """
+    Re-embed the tenant's chunks with another embedding model in a background
+    job; searches use the current index until the new one is complete.
+    """
+    require_admin(user)
+    claim = claim_move(user.tenant_id)
+    if claim is None:
+        raise HTTPException(409, "This tenant's index is already being moved or reindexed")
+
+    def run(_, on_progress):
+        try:
+            route = tenant_route(user.tenant_id)
+            n = move_tenant(get_qdrant(), user.tenant_id, route["shard"], model=req.embed_model,
+                            on_progress=on_progress, claim=claim)
+        finally:
+            release_move(user.tenant_id, claim)
+        return None, n, {"embedded": n, "reused": 0, "unchanged": 0}
+
+    try:
+        job_id = submit_ingest_job(user, f"Reindex with {req.embed_model}", "reindex", req.embed_model,
+                                   extract=lambda: None, ingest=run)
+    except BaseException:
+        release_move(user.tenant_id, claim)
+        raise
+    return {"job_id": job_id, "status": "queued"}
+
 @app.on_event("startup")
 def _startup():
     init_db()
     init_audit()
+    answer_cache.init_answer_cache()
+    init_jobs()
+    init_tenant_settings()
+    dedup.init_chunk_hashes()
     seed_demo_users()
+    if os.getenv("EMBED_WARMUP", "1") == "1":
+        start_warm_up()
+        if rerank.RERANK:
+            rerank.start_warm_up()
+    if os.getenv("LLM_WARMUP", "1") == "1":
+        rag_llm.start_warm_up()
+    bootstrap_schema(get_qdrant())
+
+@app.on_event("shutdown")
+async def _shutdown():
+    shutdown_jobs()
+    shutdown_extract_pool()
+    await close_qdrant()
 
 @app.post("/auth/login", response_model=LoginResponse)
 def auth_login(req: LoginRequest):
     token = login(req.username, req.password)
     return LoginResponse(access_token=token)
 
-@app.post("/documents/upload_pdf")
+def _ingest_job(user: User, title: str, roles_allowed: str, source_type: str, source_value: str, sensitive: bool,
+                doc_id: int | None = None, allowed_users: list[int] | None = None,
+                allowed_groups: list[str] | None = None):
+    """Bind the upload's metadata (and the document it replaces); the job worker supplies the extracted text."""
+    roles = [r.strip() for r in roles_allowed.split(",") if r.strip()]
+    max_chunks = int(os.getenv("MAX_CHUNKS_PER_DOC", "400"))
+
+    def run(raw_text: str, on_progress):
+        return ingest_document_for_user(
+            user=user,
+            title=title,
+            roles_allowed=roles,
+            source_type=source_type,
+            source_value=source_value,
+            raw_text=raw_text,
+            sensitive_flag=sensitive,
+            max_chunks=max_chunks,
+            on_progress=on_progress,
+            doc_id=doc_id,
+            allowed_users=allowed_users,
+            allowed_groups=allowed_groups,
+        )
+    return run
+
+async def _spool_pdf(file: UploadFile) -> str:
+    """Spool the upload to a temp file in 1 MB pieces instead of buffering it all; returns its path."""
+    max_mb = int(os.getenv("MAX_UPLOAD_MB", "15"))
+    if not file.content_type or "pdf" not in file.content_type.lower():
+        raise HTTPException(400, "Please upload a PDF file")
+
+    spooled = tempfile.NamedTemporaryFile(prefix="upload_", suffix=".pdf", dir=upload_spool_dir(), delete=False)
+    try:
+        size = 0
+        while piece := await file.read(1024 * 1024):
+            size += len(piece)
+            if size > max_mb * 1024 * 1024:
+                raise HTTPException(413, f"File too large (max {max_mb}MB)")
+            spooled.write(piece)
+        spooled.close()
+    except BaseException:
+        spooled.close()
+        os.unlink(spooled.name)
+        raise
+    return spooled.name
+
+def _replacement_job(user: User, document: dict, title: str | None, roles_allowed: str | None,
+                     sensitive: bool | None, source_type: str, source_value: str):
+    """_ingest_job() for a replacement: what the request leaves out stays as the document has it."""
+    return _ingest_job(
+        user,
+        title or document["title"],
+        roles_allowed or ",".join(json.loads(document["roles_allowed"])),
+        source_type,
+        source_value,
+        bool(document["sensitive"]) if sensitive is None else sensitive,
+        document["doc_id"],
+        json.loads(document["allowed_users"]),
+        json.loads(document["allowed_groups"]),
+    )
+
+def _editable_document(user: User, doc_id: int) -> dict:
+    """The tenant's document, if the user may change it: admins, or whoever uploaded it."""
+    document = get_document(user.tenant_id, doc_id)
+    if document is None:
+        raise HTTPException(404, "Document not found")
+    if user.role != "admin" and document["created_by"] != user.user_id:
+        raise HTTPException(403, "Only admins and the uploader can change this document")
+    return document
+
+@app.post("/documents/upload_pdf", status_code=202)
 async def upload_pdf(
     title: str = Form(...),
     roles_allowed: str = Form("member"),
@@ -46,80 +199,116 @@ async def upload_pdf(
     file: UploadFile = File(...),
     user: User = Depends(require_user),  # Fixed: use Depends
 ):
-    """Upload PDF → extract text → chunk → embed → store with security metadata"""
-    
-    max_mb = int(os.getenv("MAX_UPLOAD_MB", "15"))
-    if not file.content_type or "pdf" not in file.content_type.lower():
-        raise HTTPException(400, "Please upload a PDF file")
-    
-    data = await file.read()
-    if len(data) > max_mb * 1024 * 1024:
-        raise HTTPException(413, "File too large (max 15MB)")
-    
-    # Extract text using PyPDF2 (real PDF parsing)
-    raw_text = extract_pdf(data)
-    
-    roles = [r.strip() for r in roles_allowed.split(",") if r.strip()]
-    max_chunks = int(os.getenv("MAX_CHUNKS_PER_DOC", "400"))
-
-    doc_id, n_chunks = ingest_document_for_user(
-        user=user,
-        title=title,
-        roles_allowed=roles,
-        source_type="pdf",
-        source_value=file.filename,
-        raw_text=raw_text,
-        sensitive_flag=sensitive,
-        max_chunks=max_chunks,
+    """Upload PDF → queue a background job (extract → chunk → embed → store); poll /documents/jobs/{job_id}"""
+    path = await _spool_pdf(file)
+    job_id = submit_ingest_job(
+        user, title, "pdf", file.filename,
+        # Extract text page by page using pypdf (real PDF parsing) on the extraction process pool
+        extract=lambda: iter_pdf_pages_pooled(path),
+        ingest=_ingest_job(user, title, roles_allowed, "pdf", file.filename, sensitive),
+        cleanup=lambda: os.unlink(path),
     )
     
     return {
         "success": True,
-        "doc_id": doc_id,
-        "chunks_indexed": n_chunks,
-        "message": f"Successfully indexed {n_chunks} chunks from {title}"
+        "job_id": job_id,
+        "status": "queued",
+        "message": f"Queued {title} for indexing"
     }
 
-@app.post("/documents/upload_url")
+@app.post("/documents/upload_url", status_code=202)
 def upload_url(
     title: str,
     url: str,
     roles_allowed: str = "member",
     sensitive: bool = False,
-    user: User = require_user,
+    user: User = Depends(require_user),
 ):
-    roles = [r.strip() for r in roles_allowed.split(",") if r.strip()]
-    text = extract_url(url)
-    max_chunks = int(os.getenv("MAX_CHUNKS_PER_DOC", "400"))
+    job_id = submit_ingest_job(
+        user, title, "url", url,
+        extract=lambda: extract_url_pooled(url),
+        ingest=_ingest_job(user, title, roles_allowed, "url", url, sensitive),
+    )
+    return {"job_id": job_id, "status": "queued"}
 
-    doc_id, n = ingest_document_for_user(
-        user=user,
-        title=title,
-        roles_allowed=roles,
-        source_type="url",
-        source_value=url,
-        raw_text=text,
-        sensitive_flag=sensitive,
-        max_chunks=max_chunks,
+@app.put("/documents/{doc_id}/pdf", status_code=202)
+async def replace_pdf(
+    doc_id: int,
+    title: str | None = Form(None),
+    roles_allowed: str | None = Form(None),
+    sensitive: bool | None = Form(None),
+    file: UploadFile = File(...),
+    user: User = Depends(require_user),
+):
+    """
+    Replace a document with a new PDF, keeping its doc_id. Title, roles and
+    the sensitive flag default to the current ones, and the ACL stays.
+    """
+    document = _editable_document(user, doc_id)
+    path = await _spool_pdf(file)
+    job_id = submit_ingest_job(
+        user, title or document["title"], "pdf", file.filename,
+        extract=lambda: iter_pdf_pages_pooled(path),
+        ingest=_replacement_job(user, document, title, roles_allowed, sensitive, "pdf", file.filename),
+        cleanup=lambda: os.unlink(path),
     )
-    return {"doc_id": doc_id, "chunks_indexed": n}
+    return {"job_id": job_id, "status": "queued"}
 
-@app.post("/chat/query", response_model=ChatResponse)
-def chat_query(req: ChatRequest, user: User = require_user):
+@app.put("/documents/{doc_id}/url", status_code=202)
+def replace_url(
+    doc_id: int,
+    url: str,
+    title: str | None = None,
+    roles_allowed: str | None = None,
+    sensitive: bool | None = None,
+    user: User = Depends(require_user),
+):
+    """Replace a document with the contents of a URL, keeping its doc_id (defaults as for a PDF)."""
+    document = _editable_document(user, doc_id)
+    job_id = submit_ingest_job(
+        user, title or document["title"], "url", url,
+        extract=lambda: extract_url_pooled(url),
+        ingest=_replacement_job(user, document, title, roles_allowed, sensitive, "url", url),
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+@app.delete("/documents/{doc_id}")
+def delete_doc(doc_id: int, user: User = Depends(require_user)):
+    """Delete a document with its chunks, vectors and stored texts (admins, or whoever uploaded it)."""
+    _editable_document(user, doc_id)
+    return {"doc_id": doc_id, "deleted_chunks": delete_document_for_user(user, doc_id)}
+
+@app.get("/documents/jobs/{job_id}")
+def document_job(job_id: str, user: User = Depends(require_user)):
+    """Ingest job status: status (queued/running/done/failed), stage, progress, doc_id, error."""
+    job = get_job(job_id, user.tenant_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+NO_CONTEXT_CITATION = Citation(doc_id=-1, title="none", chunk_id=-1, snippet="No relevant authorized context found.")
+
+def retrieve_context(question: str, user: User, q_vec: list[float], embed_model: str | None = None):
+    """Security-filtered retrieval → (citations, context pack, audit rows); embed_model is q_vec's."""
     top_k = int(os.getenv("TOP_K", "6"))
 
-    q_vec = _embedder.encode([req.question], normalize_embeddings=True)[0].tolist()
     q_filter = build_qdrant_security_filter(user)
 
     qc = get_qdrant()
-    hits = search(qc, q_vec, q_filter, top_k=top_k)
+    if rerank.RERANK:
+        # Over-fetch under the same filter, then let the cross-encoder pick the best top_k
+        hits = search(qc, q_vec, q_filter, top_k=max(top_k, rerank.RERANK_CANDIDATES), query_text=question,
+                      embed_model=embed_model)
+        hits = rerank.rerank(question, hits, top_k)
+    else:
+        hits = search(qc, q_vec, q_filter, top_k=top_k, query_text=question, embed_model=embed_model)
+
+    # Merge neighbouring chunks, drop repeated overlap, and keep what fits the LLM's budget
+    passages, used = pack_context([h.payload for h in hits], context_budget(question), count_llm_tokens)
 
     citations = []
-    context_lines = []
     retrieved_for_audit = []
-
-    for h in hits:
-        p = h.payload
+    for p in used:
         snippet = (p["text"][:220] + "...") if len(p["text"]) > 220 else p["text"]
         citations.append(
             Citation(
@@ -129,19 +318,60 @@ def chat_query(req: ChatRequest, user: User = require_user):
                 snippet=snippet,
             )
         )
-        context_lines.append(
-            f"[doc_id={p['doc_id']} title={p['title']} chunk_id={p['chunk_id']}]\n{p['text']}"
-        )
         retrieved_for_audit.append({"doc_id": p["doc_id"], "chunk_id": p["chunk_id"]})
 
-    context_pack = "\n\n---\n\n".join(context_lines) if context_lines else "NO_CONTEXT"
-    answer = answer_from_context(req.question, context_pack)
+    context_pack = "\n\n---\n\n".join(passage.render() for passage in passages) if passages else "NO_CONTEXT"
+    return citations, context_pack, retrieved_for_audit
+
+@app.post("/chat/query", response_model=ChatResponse)
+def chat_query(req: ChatRequest, user: User = Depends(require_user)):
+    model = tenant_model(user.tenant_id)  # the one its index was built with
+    q_vec = embed_query(req.question, model)
+    cached, generation = answer_cache.lookup(user, req.question, q_vec, model)
+    if cached is not None:
+        citations, answer, retrieved_for_audit = cached.citations, cached.answer, cached.retrieved
+    else:
+        citations, context_pack, retrieved_for_audit = retrieve_context(req.question, user, q_vec, model)
+        answer = answer_from_context(req.question, context_pack, tenant_id=user.tenant_id)
+        answer_cache.store(user, req.question, q_vec, answer, citations, retrieved_for_audit, generation, model)
 
     log_audit(user.tenant_id, user.user_id, req.question, json.dumps(retrieved_for_audit))
 
     return ChatResponse(
         answer=answer,
-        citations=citations if citations else [
-            Citation(doc_id=-1, title="none", chunk_id=-1, snippet="No relevant authorized context found.")
-        ],
-    )
\ No newline at end of file
+        citations=citations if citations else [NO_CONTEXT_CITATION],
+    )
+
+@app.post("/chat/stream")
+def chat_stream(req: ChatRequest, user: User = Depends(require_user)):
+    """
+    Same answer as /chat/query, streamed as NDJSON so the UI can show the first
+    token as soon as the LLM produces it:
+      {"type": "citations", "citations": [...]}   (first, before generation)
+      {"type": "token", "text": "..."}            (repeated)
+      {"type": "done"}
+    """
+    model = tenant_model(user.tenant_id)  # the one its index was built with
+    q_vec = embed_query(req.question, model)
+    cached, generation = answer_cache.lookup(user, req.question, q_vec, model)
+    if cached is not None:
+        citations, retrieved_for_audit = cached.citations, cached.retrieved
+        tokens = iter([cached.answer])
+    else:
+        citations, context_pack, retrieved_for_audit = retrieve_context(req.question, user, q_vec, model)
+        tokens = stream_answer_from_context(req.question, context_pack, tenant_id=user.tenant_id)
+    log_audit(user.tenant_id, user.user_id, req.question, json.dumps(retrieved_for_audit))
+
+    def events():
+        shown = citations if citations else [NO_CONTEXT_CITATION]
+        yield json.dumps({"type": "citations", "citations": [c.model_dump() for c in shown]}) + "\n"
+        pieces = []
+        for piece in tokens:
+            pieces.append(piece)
+            yield json.dumps({"type": "token", "text": piece}) + "\n"
+        yield json.dumps({"type": "done"}) + "\n"
+        if cached is None:
+            answer_cache.store(user, req.question, q_vec, "".join(pieces), citations, retrieved_for_audit, generation,
+                               model)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
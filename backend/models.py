@@ -23,6 +23,14 @@ class UploadDocRequest(BaseModel):
     roles_allowed: List[Role] = Field(default_factory=lambda: ["member"])
     sensitive: bool = False
 
+class ChunkingSettings(BaseModel):
+    chunker: Literal["tokens", "chars"] = "tokens"
+    chunk_tokens: int = 200
+    overlap_tokens: int = 40
+
+class ReindexRequest(BaseModel):
+    embed_model: str
+
 class ChatRequest(BaseModel):
     question: str
 
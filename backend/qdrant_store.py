@@ -1,33 +1,533 @@
+import hashlib
 import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from qdrant_client import QdrantClient, models
+from pathlib import Path
+import httpx
+from qdrant_client import QdrantClient, AsyncQdrantClient, models
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from .sparse import sparse_query_vector
+from .chunk_store import attach_texts
+from .embeddings import EMBED_MODEL
+from .tenant_settings import settings_for_key, set_setting
 
 COLLECTION = os.getenv("QDRANT_COLLECTION", "enterprise_chunks")
 
-def get_qdrant() -> QdrantClient:
-    return QdrantClient(
+# Named sparse vector holding BM25 term weights next to the (unnamed) dense vector
+SPARSE_VECTOR = "bm25"
+
+# Point ids are uuid5(tenant, doc, chunk): stable across re-ingests and reindexes, and
+# unlike the old doc_id * 10000 + chunk_id they cannot collide. Old points keep their integer ids.
+POINT_ID_NAMESPACE = uuid.UUID("3f1c2a5e-8d47-4b6a-9c0e-6a7b2d9e4f10")
+
+# Payload fields a search returns: ids for the chunk store, and the citation title.
+# "text" only exists on points indexed before texts moved to the chunk store.
+SEARCH_PAYLOAD = ["doc_id", "chunk_id", "title", "content_hash", "text"]
+
+_client: QdrantClient | None = None
+_async_client: AsyncQdrantClient | None = None
+_client_lock = threading.Lock()
+
+# Collections whose schema (payload indexes included) is known to be in place
+_ready_collections: set[str] = set()
+_schema_lock = threading.Lock()
+# Ready collections that also have the BM25 sparse vector
+_sparse_collections: set[str] = set()
+# Ready collections with quantized vectors, and their mode ("int8" or "binary")
+_quantized_collections: dict[str, str] = {}
+
+# A tenant's chunks live in the shared COLLECTION, kept apart by the tenant_id
+# filter, unless the tenant is routed to a dedicated collection of its own.
+# A tenant reindexed to another embedding model than EMBED_MODEL is in that
+# model's collections instead (its route names the model).
+# Routes are tenant settings changed online by backend/sharding.py; every
+# worker re-reads them at most SHARD_ROUTE_TTL_S seconds later.
+SHARD_ROUTE_KEY = "vector_shard"
+SHARED = "shared"
+DEDICATED = "dedicated"
+
+_routes: dict[str, dict] = {}
+_routes_read_at = float("-inf")
+_routes_lock = threading.Lock()
+
+def _client_kwargs() -> dict:
+    # Read at call time: .env is loaded after this module is imported
+    pool_size = int(os.getenv("QDRANT_POOL_SIZE", "16"))
+    return dict(
         url=os.environ["QDRANT_URL"],
         api_key=os.environ["QDRANT_API_KEY"],
+        timeout=int(os.getenv("QDRANT_TIMEOUT_S", "30")),
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=float(os.getenv("QDRANT_KEEPALIVE_S", "60")),
+        ),
+    )
+
+def get_qdrant() -> QdrantClient:
+    """
+    Process-wide Qdrant client; its keep-alive pool is reused by every request.
+    With VECTOR_STORE=local it is the in-process LocalIndex instead, opened
+    (and loaded from LOCAL_INDEX_DIR) on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if os.getenv("VECTOR_STORE", "qdrant") == "local":
+                    from .local_index import LocalIndex
+                    _client = LocalIndex(os.getenv("LOCAL_INDEX_DIR", str(Path(__file__).resolve().parent / "vector_index")))
+                else:
+                    _client = QdrantClient(**_client_kwargs())
+    return _client
+
+def get_async_qdrant() -> AsyncQdrantClient:
+    """Async twin of get_qdrant() for async endpoints (must be used on one event loop)."""
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncQdrantClient(**_client_kwargs())
+    return _async_client
+
+async def close_qdrant():
+    """Close pooled connections on shutdown."""
+    global _client, _async_client
+    with _client_lock:
+        client, async_client = _client, _async_client
+        _client = _async_client = None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.close()
+
+def _tenant_index_enabled() -> bool:
+    return os.getenv("QDRANT_TENANT_INDEX", "0") == "1"
+
+def security_payload_schema() -> dict:
+    """Payload indexes for every field build_qdrant_security_filter() filters on."""
+    return {
+        "tenant_id": models.KeywordIndexParams(
+            type=models.KeywordIndexType.KEYWORD,
+            is_tenant=_tenant_index_enabled(),
+        ),
+        "roles_allowed": models.PayloadSchemaType.KEYWORD,
+        "allowed_groups": models.PayloadSchemaType.KEYWORD,
+        "allowed_users": models.IntegerIndexParams(
+            type=models.IntegerIndexType.INTEGER, lookup=True, range=False,
+        ),
+        "sensitive": models.PayloadSchemaType.BOOL,
+    }
+
+def document_payload_schema() -> dict:
+    """Payload indexes for the document deletes: doc_id matches, chunk_id ranges (delete_doc_chunks_from())."""
+    return {
+        "doc_id": models.IntegerIndexParams(type=models.IntegerIndexType.INTEGER, lookup=True, range=False),
+        "chunk_id": models.IntegerIndexParams(type=models.IntegerIndexType.INTEGER, lookup=False, range=True),
+    }
+
+def quantization_mode() -> str:
+    """QDRANT_QUANTIZATION for new collections: none, int8 or binary."""
+    mode = os.getenv("QDRANT_QUANTIZATION", "none")
+    if mode not in ("none", "int8", "binary"):
+        raise ValueError(f"QDRANT_QUANTIZATION must be none, int8 or binary, not {mode!r}")
+    return mode
+
+def quantization_config(mode: str):
+    """
+    A quantized copy of every vector kept in RAM (int8: 4x smaller, binary: 32x)
+    while the float32 originals stay on disk for rescoring. None for "none".
+    """
+    if mode == "int8":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+    if mode == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+def _quantization_of(info) -> str | None:
+    config = getattr(info.config, "quantization_config", None)
+    if isinstance(config, models.ScalarQuantization):
+        return "int8"
+    if isinstance(config, models.BinaryQuantization):
+        return "binary"
+    return None
+
+def search_params(collection: str) -> models.SearchParams | None:
+    """
+    For a quantized collection: fetch QDRANT_OVERSAMPLING times the asked-for
+    hits by their quantized score, then rescore them with the original vectors.
+    """
+    mode = _quantized_collections.get(collection)
+    if mode is None:
+        return None
+    oversampling = float(os.getenv("QDRANT_OVERSAMPLING", "0")) or (8.0 if mode == "binary" else 2.0)
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=os.getenv("QDRANT_RESCORE", "1") == "1", oversampling=oversampling))
+
+def _ensure_payload_indexes(client: QdrantClient, collection: str):
+    info = client.get_collection(collection)
+    existing = info.payload_schema or {}
+    for field, schema in {**security_payload_schema(), **document_payload_schema()}.items():
+        if field not in existing:
+            client.create_payload_index(collection, field_name=field, field_schema=schema, wait=True)
+
+    mode = _quantization_of(info)
+    if mode:
+        _quantized_collections[collection] = mode
+    else:
+        _quantized_collections.pop(collection, None)
+
+    if SPARSE_VECTOR in (info.config.params.sparse_vectors or {}):
+        _sparse_collections.add(collection)
+    else:
+        # Sparse vectors cannot be added to an existing collection
+        print(f"Collection {collection} has no '{SPARSE_VECTOR}' sparse vector; hybrid search is off until it is re-created")
+
+def route_ttl_s() -> float:
+    return float(os.getenv("SHARD_ROUTE_TTL_S", "5"))
+
+def _all_routes() -> dict[str, dict]:
+    global _routes, _routes_read_at
+    if time.monotonic() - _routes_read_at >= route_ttl_s():
+        with _routes_lock:
+            if time.monotonic() - _routes_read_at >= route_ttl_s():
+                try:
+                    _routes = settings_for_key(SHARD_ROUTE_KEY)
+                except sqlite3.OperationalError:
+                    _routes = {}  # no tenant_settings table yet, so no tenant has been moved
+                _routes_read_at = time.monotonic()
+    return _routes
+
+def tenant_route(tenant_id: str) -> dict:
+    """
+    {"shard": "shared" or "dedicated", "model": None (EMBED_MODEL) or the
+    embedding model the tenant was reindexed to, "migrating_to": None, or
+    during a move the other shard, which gets every write too, and
+    "migrating_model": that shard's model}.
+    """
+    return _all_routes().get(tenant_id) or {"shard": SHARED, "migrating_to": None}
+
+def set_tenant_route(tenant_id: str, shard: str, migrating_to: str | None = None, model: str | None = None,
+                     migrating_model: str | None = None, claimed_by: str | None = None):
+    """Write a route; claimed_by keeps (and renews) the claim of the move writing it (sharding.claim_move())."""
+    global _routes
+    route = {"shard": shard, "migrating_to": migrating_to, "model": model, "migrating_model": migrating_model}
+    if claimed_by is not None:
+        route.update(claimed_by=claimed_by, claimed_at=time.time())
+    set_setting(tenant_id, SHARD_ROUTE_KEY, route)
+    with _routes_lock:
+        _routes = {**_routes, tenant_id: route}
+
+def _slug(name: str) -> str:
+    return f"{re.sub(r'[^A-Za-z0-9_-]', '_', name)[:32]}_{hashlib.sha1(name.encode()).hexdigest()[:8]}"
+
+def shard_collection(tenant_id: str | None, shard: str, model: str | None = None) -> str:
+    """
+    Collection name of one shard: the shared COLLECTION or the tenant's own,
+    or with a model other than EMBED_MODEL, the same within that model's collections.
+    """
+    base = COLLECTION if model is None else f"{COLLECTION}__model_{_slug(model)}"
+    if shard == SHARED or tenant_id is None:
+        return base
+    return f"{base}__{_slug(tenant_id)}"
+
+def write_indexes(tenant_id: str | None) -> list[tuple[str, str]]:
+    """
+    (collection, embedding model) of each index the tenant's writes go to: the
+    one its searches go to first, then during a move the one it moves to or from.
+    """
+    if tenant_id is None:
+        return [(COLLECTION, EMBED_MODEL)]
+    route = tenant_route(tenant_id)
+    indexes = [(shard_collection(tenant_id, route["shard"], route.get("model")), route.get("model") or EMBED_MODEL)]
+    if route.get("migrating_to"):
+        other = route.get("migrating_model")
+        indexes.append((shard_collection(tenant_id, route["migrating_to"], other), other or EMBED_MODEL))
+    return indexes
+
+def tenant_model(tenant_id: str | None) -> str:
+    """Embedding model of the tenant's searches (and of its chunk hashes)."""
+    return write_indexes(tenant_id)[0][1]
+
+def tenant_collection(tenant_id: str | None, model: str | None = None) -> str:
+    """
+    Collection the tenant's searches go to. With the model a question was
+    embedded with, the index of that model: while a reindex switches over, a
+    worker still on the old route searches the old collection, which is only
+    dropped once every worker has moved on.
+    """
+    indexes = write_indexes(tenant_id)
+    for collection, index_model in indexes:
+        if index_model == model:
+            return collection
+    return indexes[0][0]
+
+def write_collections(tenant_id: str | None) -> list[str]:
+    """Collections the tenant's writes go to: both shards while a move is copying."""
+    return [collection for collection, _ in write_indexes(tenant_id)]
+
+def point_id(tenant_id: str, doc_id: int, chunk_id: int) -> str:
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{tenant_id}/{doc_id}/{chunk_id}"))
+
+def filter_tenant(q_filter: models.Filter | None) -> str | None:
+    """The tenant a filter is pinned to by a tenant_id match (every security filter is)."""
+    must = q_filter.must if q_filter is not None else None
+    for cond in must if isinstance(must, list) else [must] if must else []:
+        if isinstance(cond, models.Filter):
+            tenant_id = filter_tenant(cond)
+            if tenant_id is not None:
+                return tenant_id
+        elif (isinstance(cond, models.FieldCondition) and cond.key == "tenant_id"
+              and isinstance(cond.match, models.MatchValue)):
+            return cond.match.value
+    return None
+
+def vector_collections(client: QdrantClient) -> list[str]:
+    """The shared collection and every dedicated tenant collection that exist."""
+    return [c.name for c in client.get_collections().collections
+            if c.name == COLLECTION or c.name.startswith(f"{COLLECTION}__")]
+
+def shard_stats() -> dict:
+    routes = _all_routes().values()
+    return {
+        "dedicated_tenants": sum(r["shard"] == DEDICATED for r in routes),
+        "moving_tenants": sum(bool(r.get("migrating_to")) for r in routes),
+        "reindexed_tenants": sum(bool(r.get("model")) for r in routes),
+    }
+
+def has_sparse_vectors(tenant_id: str | None = None) -> bool:
+    """Whether new points should carry BM25 sparse vectors (every collection they go to has the slot)."""
+    return all(c in _sparse_collections for c in write_collections(tenant_id))
+
+def hybrid_enabled(collection: str | None = None) -> bool:
+    return os.getenv("HYBRID_SEARCH", "1") == "1" and (collection or COLLECTION) in _sparse_collections
+
+def bootstrap_schema(client: QdrantClient, tenant_id: str | None = None) -> bool:
+    """
+    Startup hook: if the collection already exists, add any missing payload
+    indexes and mark it ready. Returns False when it still has to be created
+    (that needs the vector size, so ensure_collection() does it on first ingest).
+    With tenant_id, the same for every collection that tenant is routed to.
+    """
+    ready = True
+    with _schema_lock:
+        for collection in write_collections(tenant_id):
+            if collection in _ready_collections:
+                continue
+            if not client.collection_exists(collection):
+                ready = False
+                continue
+            _ensure_payload_indexes(client, collection)
+            _ready_collections.add(collection)
+    return ready
+
+def ensure_collection(client: QdrantClient, vector_size: int, tenant_id: str | None = None,
+                      collection: str | None = None, model: str | None = None):
+    """
+    Create the collection (the tenant's, only those of one embedding model if
+    given, or the one named) and its payload indexes once; later calls are a
+    set lookup.
+    """
+    names = [collection] if collection else [c for c, m in write_indexes(tenant_id) if model in (None, m)]
+    for name in names:
+        if name in _ready_collections:
+            continue
+        with _schema_lock:
+            if name in _ready_collections:
+                continue
+            if not client.collection_exists(name):
+                # With tenant indexing every search of the shared collection carries a tenant_id filter,
+                # so Qdrant can build per-tenant HNSW graphs (payload_m) instead of one global graph (m=0).
+                # A dedicated collection holds one tenant and keeps the default global graph.
+                hnsw = models.HnswConfigDiff(payload_m=16, m=0) if _tenant_index_enabled() and name == COLLECTION else None
+                # Quantized collections keep only the quantized vectors in RAM, the originals on disk
+                quantization = quantization_config(quantization_mode())
+                client.create_collection(
+                    collection_name=name,
+                    vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE,
+                                                       on_disk=True if quantization else None),
+                    sparse_vectors_config={SPARSE_VECTOR: models.SparseVectorParams(modifier=models.Modifier.IDF)},
+                    hnsw_config=hnsw,
+                    quantization_config=quantization,
+                )
+            _ensure_payload_indexes(client, name)
+            _ready_collections.add(name)
+
+def set_quantization(client: QdrantClient, collection: str, mode: str):
+    """
+    Switch an existing collection to another quantization mode in place.
+    Qdrant rebuilds its segments in the background and keeps serving searches.
+    """
+    client.update_collection(
+        collection_name=collection,
+        vectors_config={"": models.VectorParamsDiff(on_disk=mode != "none")},
+        quantization_config=quantization_config(mode) or models.Disabled.DISABLED,
+    )
+    with _schema_lock:
+        _ensure_payload_indexes(client, collection)
+
+def upserts_wait() -> bool:
+    """False when upserts are fire-and-forget and need a wait_until_indexed() barrier."""
+    return os.getenv("QDRANT_UPSERT_WAIT", "1") == "1"
+
+def _upsert_settings() -> tuple[int, int, int]:
+    return (
+        int(os.getenv("QDRANT_UPSERT_BATCH", "32")),
+        int(os.getenv("QDRANT_UPSERT_PARALLEL", "4")),
+        int(os.getenv("QDRANT_UPSERT_RETRIES", "3")),
     )
 
-def ensure_collection(client: QdrantClient, vector_size: int):
-    existing = [c.name for c in client.get_collections().collections]
-    if COLLECTION in existing:
-        return
+def _transient(e: Exception) -> bool:
+    """Worth retrying: transport errors, timeouts, 5xx and 429. A 4xx (wrong vector size, bad payload) is not."""
+    if isinstance(e, UnexpectedResponse):
+        return e.status_code is None or e.status_code >= 500 or e.status_code == 429
+    return isinstance(e, (ResponseHandlingException, httpx.TransportError, TimeoutError, ConnectionError))
+
+def _upsert_batch_with_retry(client: QdrantClient, collection: str, batch: list[models.PointStruct],
+                             wait: bool, retries: int):
+    for attempt in range(retries + 1):
+        try:
+            client.upsert(collection_name=collection, points=batch, wait=wait)
+            return
+        except Exception as e:
+            if attempt == retries or not _transient(e):
+                raise
+            delay = 0.5 * 2 ** attempt + random.uniform(0, 0.25)
+            reason = str(e).splitlines()[0] if str(e) else type(e).__name__
+            print(f"Qdrant upsert of {len(batch)} points failed ({reason}); retry {attempt + 1}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+def upsert_chunks(client: QdrantClient, points: list[models.PointStruct], wait: bool | None = None,
+                  collection: str | None = None) -> int:
+    """
+    Upsert in QDRANT_UPSERT_BATCH-sized requests, QDRANT_UPSERT_PARALLEL at a
+    time. Each batch retries transient errors on its own with exponential
+    backoff, so one does not lose the whole document; other errors fail at once.
+
+    Points go to the collection named, or else to the collections of their
+    payload's tenant_id (see write_collections()).
 
-    client.create_collection(
-        collection_name=COLLECTION,
-        vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+    With wait=False (or QDRANT_UPSERT_WAIT=0) Qdrant only acknowledges receipt;
+    call wait_until_indexed() once at the end as a consistency barrier.
+    """
+    batch_size, parallel, retries = _upsert_settings()
+    wait = upserts_wait() if wait is None else wait
+    routed = defaultdict(list)
+    for point in points:
+        for name in [collection] if collection else write_collections((point.payload or {}).get("tenant_id")):
+            routed[name].append(point)
+    batches = [(collection, group[i:i + batch_size])
+               for collection, group in routed.items() for i in range(0, len(group), batch_size)]
+
+    if len(batches) <= 1 or parallel <= 1:
+        for collection, batch in batches:
+            _upsert_batch_with_retry(client, collection, batch, wait, retries)
+    else:
+        with ThreadPoolExecutor(max_workers=min(parallel, len(batches))) as pool:
+            futures = [pool.submit(_upsert_batch_with_retry, client, collection, batch, wait, retries)
+                       for collection, batch in batches]
+            for fut in futures:
+                fut.result()
+    return len(points)
+
+def wait_until_indexed(client: QdrantClient, q_filter: models.Filter, expected: int, timeout_s: float = 60.0):
+    """Barrier for wait=False upserts: poll until `expected` points match the filter in the tenant's collection."""
+    collection = tenant_collection(filter_tenant(q_filter))
+    deadline = time.monotonic() + timeout_s
+    delay = 0.05
+    while True:
+        count = client.count(collection_name=collection, count_filter=q_filter, exact=True).count
+        if count >= expected:
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Only {count}/{expected} points visible in Qdrant after {timeout_s:.0f}s")
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+
+def retrieve_vectors(client: QdrantClient, point_ids: list, tenant_id: str | None = None) -> list[models.Record]:
+    """Stored vectors (and content hashes) of existing points, for re-use instead of re-embedding."""
+    return client.retrieve(
+        collection_name=tenant_collection(tenant_id),
+        ids=point_ids,
+        with_vectors=True,
+        with_payload=["content_hash"],
     )
 
-def upsert_chunks(client: QdrantClient, points: list[models.PointStruct]):
-    client.upsert(collection_name=COLLECTION, points=points)
-
-def search(client: QdrantClient, query_vector: list[float], q_filter: models.Filter, top_k: int):
-    return client.search(
-        collection_name=COLLECTION,
-        query_vector=query_vector,
-        query_filter=q_filter,
-        limit=top_k,
-        with_payload=True,
-    )
\ No newline at end of file
+def delete_doc_chunks_from(client: QdrantClient, tenant_id: str, doc_id: int, first_chunk_id: int = 0):
+    """
+    Drop a document's chunks from first_chunk_id on (left over when a new
+    version is shorter), or all of them, with one filtered delete per collection.
+    """
+    for collection in write_collections(tenant_id):
+        client.delete(
+            collection_name=collection,
+            points_selector=models.FilterSelector(filter=models.Filter(must=[
+                models.FieldCondition(key="tenant_id", match=models.MatchValue(value=tenant_id)),
+                models.FieldCondition(key="doc_id", match=models.MatchValue(value=doc_id)),
+                models.FieldCondition(key="chunk_id", range=models.Range(gte=first_chunk_id)),
+            ])),
+            wait=True,
+        )
+
+def delete_points(client: QdrantClient, tenant_id: str, point_ids: list):
+    """Drop points by id, e.g. a re-ingested chunk's old integer id once it is stored under its uuid."""
+    for collection in write_collections(tenant_id):
+        client.delete(collection_name=collection, points_selector=models.PointIdsList(points=point_ids), wait=True)
+
+def search(client: QdrantClient, query_vector: list[float], q_filter: models.Filter, top_k: int,
+           query_text: str | None = None, with_payload=SEARCH_PAYLOAD, embed_model: str | None = None):
+    """
+    Top chunks under the security filter. With query_text and hybrid search on,
+    Qdrant runs the dense and the BM25 search side by side in one request
+    (both filtered) and fuses the two rankings with reciprocal rank fusion,
+    so exact identifiers and acronyms are found even when the embedding
+    misses them.
+
+    The search goes straight to the collection the filter's tenant is routed
+    to (for embed_model, the model query_vector comes from); a dedicated
+    collection holds no other tenant's points. On a quantized collection the
+    dense search oversamples and rescores (search_params()).
+
+    Hits come back with a minimal payload (SEARCH_PAYLOAD); their text is
+    read from the local chunk store, for the version of the chunk each hit
+    was indexed from.
+    """
+    tenant_id = filter_tenant(q_filter)
+    collection = tenant_collection(tenant_id, embed_model)
+    model = dict(write_indexes(tenant_id)).get(collection, embed_model)  # the model of its chunk hashes
+    if collection not in _ready_collections:
+        bootstrap_schema(client, tenant_id)
+    params = search_params(collection)
+    sparse = sparse_query_vector(query_text) if query_text and hybrid_enabled(collection) else None
+    if sparse is not None and sparse.indices:
+        candidates = max(top_k * int(os.getenv("HYBRID_CANDIDATES_FACTOR", "4")), 20)
+        hits = client.query_points(
+            collection_name=collection,
+            prefetch=[
+                models.Prefetch(query=query_vector, filter=q_filter, limit=candidates, params=params),
+                models.Prefetch(query=sparse, using=SPARSE_VECTOR, filter=q_filter, limit=candidates),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            query_filter=q_filter,
+            limit=top_k,
+            with_payload=with_payload,
+        ).points
+    else:
+        hits = client.search(
+            collection_name=collection,
+            query_vector=query_vector,
+            query_filter=q_filter,
+            search_params=params,
+            limit=top_k,
+            with_payload=with_payload,
+        )
+    return attach_texts(hits, model)
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Switch the existing vector collections (the shared one and every dedicated
+tenant collection) to quantized vectors, or back, in place and online.
+
+    python -m backend.quantize int8|binary|none
+
+Set QDRANT_QUANTIZATION to the same mode so collections created later match.
+"""
+import argparse
+import time
+from dotenv import load_dotenv, find_dotenv
+
+# Before qdrant_store is imported: it reads QDRANT_COLLECTION then
+load_dotenv(find_dotenv(usecwd=True), override=True)
+
+from . import qdrant_store
+from .qdrant_store import get_qdrant, set_quantization, vector_collections
+
+def wait_until_optimized(client, collection: str, timeout_s: float = 3600.0):
+    """Searches keep working meanwhile; this only waits for the rebuilt segments."""
+    deadline = time.monotonic() + timeout_s
+    while client.get_collection(collection).status != "green":
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{collection} is still optimizing after {timeout_s:.0f}s")
+        time.sleep(2)
+
+def quantize_all(client, mode: str, wait: bool = True) -> list[str]:
+    collections = vector_collections(client)
+    for collection in collections:
+        t0 = time.monotonic()
+        set_quantization(client, collection, mode)
+        if wait:
+            wait_until_optimized(client, collection)
+        print(f"{collection}: quantization {mode} ({time.monotonic() - t0:.1f}s)")
+    return collections
+
+def main():
+    ap = argparse.ArgumentParser(prog="python -m backend.quantize")
+    ap.add_argument("mode", choices=["int8", "binary", "none"])
+    ap.add_argument("--no-wait", action="store_true", help="do not wait for Qdrant to rebuild the segments")
+    args = ap.parse_args()
+
+    client = get_qdrant()
+    if not quantize_all(client, args.mode, wait=not args.no_wait):
+        print(f"No collection named {qdrant_store.COLLECTION} yet; set QDRANT_QUANTIZATION={args.mode} "
+              f"and it is created quantized")
+    elif qdrant_store.quantization_mode() != args.mode:
+        print(f"Set QDRANT_QUANTIZATION={args.mode} so collections created from now on match")
+    client.close()
+
+if __name__ == "__main__":
+    main()
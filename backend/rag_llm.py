@@ -1,21 +1,21 @@
 import os
+import threading
 from dotenv import load_dotenv, find_dotenv
-from llama_cpp import Llama
+from .llm_scheduler import InferenceScheduler
 
 load_dotenv(find_dotenv(usecwd=True), override=True)
 
-MODEL_PATH = os.getenv("GGUF_MODEL_PATH")
-if not MODEL_PATH or not os.path.exists(MODEL_PATH):
-    raise RuntimeError(f"GGUF model not found: {MODEL_PATH}. Download to ./models/ and restart.")
+# local_llamacpp: GGUF model in this process (GGUF_MODEL_PATH)
+# openai_compat:  a shared OpenAI-compatible server (LLM_BASE_URL), e.g. llama-server
+# fake:           deterministic answers from the context, for tests
+LLM_MODE = os.getenv("LLM_MODE", "local_llamacpp")
 
 MAX_NEW_TOKENS = int(os.getenv("MAX_NEW_TOKENS", "384"))
+LLM_N_CTX = int(os.getenv("LLM_N_CTX", "4096"))
 
-_llm = Llama(
-    model_path=MODEL_PATH, 
-    n_ctx=4096,
-    verbose=False,
-    n_threads=4 
-)
+# Upper bound for retrieved context in the prompt. Prompt evaluation dominates
+# CPU latency, so a smaller pack answers faster.
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1536"))
 
 SYSTEM_PROMPT = (
     "You are a helpful assistant for an enterprise document Q&A system.\n"
@@ -25,15 +25,92 @@ SYSTEM_PROMPT = (
     "Always stay professional and factual."
 )
 
-def answer_from_context(question: str, context_pack: str) -> str:
-    """Ask LLM to answer using ONLY the provided context chunks."""
-    messages = [
+_backend = None
+_scheduler = None
+_backend_lock = threading.Lock()
+
+def _build_messages(question: str, context_pack: str) -> list[dict]:
+    return [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": f"CONTEXT:\n{context_pack}\n\nQUESTION: {question}"},
     ]
-    response = _llm.create_chat_completion(
-        messages=messages, 
-        max_tokens=MAX_NEW_TOKENS,
-        temperature=0.1  # Low creativity, stick to facts
-    )
-    return response["choices"][0]["message"]["content"]
\ No newline at end of file
+
+def _create_backend():
+    if LLM_MODE == "local_llamacpp":
+        from .llm_llamacpp import LlamaCppBackend
+        return LlamaCppBackend(LLM_N_CTX, prime_messages=_build_messages("", ""))
+    if LLM_MODE == "openai_compat":
+        from .llm_http import OpenAICompatBackend
+        return OpenAICompatBackend(LLM_N_CTX)
+    if LLM_MODE == "fake":
+        from .llm_fake import FakeBackend
+        return FakeBackend(LLM_N_CTX)
+    raise RuntimeError(f"Unknown LLM_MODE: {LLM_MODE} (expected local_llamacpp, openai_compat or fake)")
+
+def get_backend():
+    """Create the LLM backend and its slot scheduler once per process, on first use."""
+    global _backend, _scheduler
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = _create_backend()
+                _scheduler = InferenceScheduler(
+                    backend.replicas,
+                    max_queue=int(os.getenv("LLM_MAX_QUEUE", "16")),
+                    max_per_tenant=int(os.getenv("LLM_MAX_QUEUE_PER_TENANT", "8")),
+                    timeout_s=float(os.getenv("LLM_QUEUE_TIMEOUT_S", "30")),
+                )
+                _backend = backend
+    return _backend
+
+def start_warm_up():
+    """Load the backend (for llama.cpp, the GGUF model) in the background."""
+    threading.Thread(target=_load, name="llm-warmup", daemon=True).start()
+
+def _load():
+    try:
+        get_backend()
+    except Exception as e:
+        print(f"Could not load LLM backend {LLM_MODE}: {e}")
+
+def metrics() -> dict:
+    """Slot and queue counters; only the mode until the backend is loaded."""
+    out = {"mode": LLM_MODE, "loaded": _backend is not None}
+    if _backend is not None:
+        out.update(_scheduler.metrics())
+    return out
+
+def backend_stats() -> dict:
+    return _backend.stats() if _backend is not None else {}
+
+def count_tokens(text: str) -> int:
+    """Tokens the LLM will see for this text (estimated from length for openai_compat)."""
+    return get_backend().count_tokens(text)
+
+def context_budget(question: str) -> int:
+    """Tokens left for context once the prompt around it and the answer are accounted for."""
+    overhead = count_tokens(SYSTEM_PROMPT) + count_tokens(question) + 64  # chat template, labels
+    return max(0, min(CONTEXT_MAX_TOKENS, LLM_N_CTX - MAX_NEW_TOKENS - overhead))
+
+def answer_from_context(question: str, context_pack: str, tenant_id: str = "default") -> str:
+    """Ask LLM to answer using ONLY the provided context chunks."""
+    backend = get_backend()
+    with _scheduler.slot(tenant_id) as replica:
+        return backend.complete(replica, _build_messages(question, context_pack), MAX_NEW_TOKENS)
+
+def _stream_tokens(question: str, context_pack: str, tenant_id: str):
+    backend = get_backend()
+    with _scheduler.slot(tenant_id) as replica:
+        pieces = backend.stream(replica, _build_messages(question, context_pack), MAX_NEW_TOKENS)
+        yield None  # slot acquired; see stream_answer_from_context
+        yield from pieces
+
+def stream_answer_from_context(question: str, context_pack: str, tenant_id: str = "default"):
+    """
+    Same as answer_from_context, but yields text pieces as the model generates them.
+    The model slot is taken before returning, so a full queue raises 429/503 here
+    (and an unreachable LLM server 503/504) instead of breaking an already-started stream.
+    """
+    tokens = _stream_tokens(question, context_pack, tenant_id)
+    next(tokens)
+    return tokens
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv, find_dotenv
+
+load_dotenv(find_dotenv(usecwd=True), override=True)
+
+# Optional second stage: over-fetch RERANK_CANDIDATES hits under the security
+# filter, score (question, chunk) pairs with a small CPU cross-encoder and keep
+# the best TOP_K. If scoring runs past RERANK_BUDGET_MS the vector order is used.
+RERANK = os.getenv("RERANK", "0") == "1"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "24"))
+RERANK_BATCH = int(os.getenv("RERANK_BATCH", "8"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "250"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+
+_model = None
+_model_lock = threading.Lock()
+_loading = False
+
+_scores: OrderedDict[tuple[str, str], float] = OrderedDict()
+_stats = {"queries": 0, "fallbacks": 0, "pairs_scored": 0, "cache_hits": 0, "total_ms": 0.0}
+_lock = threading.Lock()
+
+
+def get_reranker():
+    """Load the cross-encoder once per process, on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import CrossEncoder
+                _model = CrossEncoder(RERANK_MODEL, max_length=512, device="cpu")
+    return _model
+
+
+def start_warm_up():
+    """Load the model in the background; until it is ready, queries keep vector order."""
+    global _loading
+    with _model_lock:
+        if _model is not None or _loading:
+            return
+        _loading = True
+    threading.Thread(target=_load, name="reranker-warmup", daemon=True).start()
+
+
+def _load():
+    global _loading
+    try:
+        get_reranker()
+    except Exception as e:
+        print(f"Could not load reranker {RERANK_MODEL}: {e}")
+    finally:
+        _loading = False
+
+
+def _pair_key(question: str, payload: dict) -> tuple[str, str]:
+    # content_hash is in the payload of chunks indexed since dedup; hash the text otherwise
+    chunk = payload.get("content_hash") or hashlib.sha256(payload["text"].encode()).hexdigest()
+    return " ".join(question.lower().split()), chunk
+
+
+def _cached(key: tuple[str, str]) -> float | None:
+    with _lock:
+        score = _scores.get(key)
+        if score is not None:
+            _scores.move_to_end(key)
+        return score
+
+
+def _remember(pairs: dict[tuple[str, str], float]):
+    with _lock:
+        _scores.update(pairs)
+        while len(_scores) > RERANK_CACHE_SIZE:
+            _scores.popitem(last=False)
+
+
+def rerank(question: str, hits: list, top_k: int, budget_ms: float = RERANK_BUDGET_MS) -> list:
+    """
+    Reorder search hits by cross-encoder score and return the best top_k.
+    Cached scores are reused; the rest are scored in batches until the
+    latency budget runs out, in which case the hits keep their vector order.
+    Scores finished before the cut-off are still cached for next time.
+    """
+    t0 = time.perf_counter()
+    deadline = t0 + budget_ms / 1000
+    keys = [_pair_key(question, h.payload) for h in hits]
+    scores = [_cached(k) for k in keys]
+    todo = [i for i, s in enumerate(scores) if s is None]
+
+    model = _model
+    if todo and model is None:
+        start_warm_up()
+    fell_back = bool(todo) and model is None
+
+    scored = {}
+    for start in range(0, len(todo), RERANK_BATCH):
+        if fell_back:
+            break
+        batch = todo[start:start + RERANK_BATCH]
+        batch_scores = model.predict([(question, hits[i].payload["text"]) for i in batch], batch_size=RERANK_BATCH)
+        for i, s in zip(batch, batch_scores):
+            scores[i] = float(s)
+            scored[keys[i]] = float(s)
+        if time.perf_counter() > deadline and start + RERANK_BATCH < len(todo):
+            fell_back = True
+    _remember(scored)
+
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    with _lock:
+        _stats["queries"] += 1
+        _stats["fallbacks"] += fell_back
+        _stats["pairs_scored"] += len(scored)
+        _stats["cache_hits"] += len(hits) - len(todo)
+        _stats["total_ms"] += elapsed_ms
+
+    if fell_back:
+        return hits[:top_k]
+    order = sorted(range(len(hits)), key=lambda i: scores[i], reverse=True)
+    return [hits[i] for i in order[:top_k]]
+
+
+def stats() -> dict:
+    with _lock:
+        out = dict(_stats)
+        out["cache_entries"] = len(_scores)
+    out["enabled"] = RERANK
+    out["model_loaded"] = _model is not None
+    total_ms = out.pop("total_ms")
+    out["avg_ms"] = round(total_ms / out["queries"], 2) if out["queries"] else 0.0
+    return out
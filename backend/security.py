@@ -41,6 +41,5 @@ def build_qdrant_security_filter(user: User) -> models.Filter:
     return models.Filter(
         must=must,
         must_not=must_not,
-        should=acl_should,
-        min_should=1,
+        should=acl_should,  # Qdrant: at least one `should` must match
     )
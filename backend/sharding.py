@@ -0,0 +1,377 @@
+"""
+Which tenants get a dedicated Qdrant collection, and moving them there (or
+back to the shared collection) without stopping ingest or search. The same
+move reindexes a tenant with another embedding model.
+
+    python -m backend.sharding status
+    python -m backend.sharding rebalance [--dry-run]
+    python -m backend.sharding move TENANT dedicated|shared
+    python -m backend.sharding reindex MODEL [TENANT ...]    # every tenant if none is named
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Callable
+from qdrant_client import models
+from dotenv import load_dotenv, find_dotenv
+
+# Before the backend imports, for the CLI: qdrant_store reads its settings when imported
+load_dotenv(find_dotenv(usecwd=True), override=True)
+
+from .db import get_conn
+from .qdrant_store import (get_qdrant, ensure_collection, tenant_route, set_tenant_route, shard_collection,
+                           tenant_collection, route_ttl_s, SHARED, DEDICATED, SPARSE_VECTOR, SHARD_ROUTE_KEY)
+from .answer_cache import invalidate_tenant
+from .chunk_store import get_chunk_store
+from .dedup import chunk_hash, rehash_chunks
+from .embeddings import EMBED_MODEL, embed_chunks, embedding_size
+from .sparse import sparse_doc_vector
+
+# Tenants always given their own collection, comma separated
+SHARD_DEDICATED_TENANTS = {t.strip() for t in os.getenv("SHARD_DEDICATED_TENANTS", "").split(",") if t.strip()}
+# Tenants with at least this many chunks get their own collection (0 = only the listed ones).
+# They go back to the shared one below half of it, so a tenant near the line does not flap.
+SHARD_DEDICATED_MIN_POINTS = int(os.getenv("SHARD_DEDICATED_MIN_POINTS", "50000"))
+SHARD_COPY_BATCH = int(os.getenv("SHARD_COPY_BATCH", "256"))
+# A claim whose move has not started this long after it was taken is abandoned
+MOVE_CLAIM_TTL_S = 3600
+
+def _tenant_filter(tenant_id: str) -> models.Filter:
+    return models.Filter(must=[models.FieldCondition(key="tenant_id", match=models.MatchValue(value=tenant_id))])
+
+def known_tenants() -> list[str]:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT tenant_id FROM documents UNION SELECT DISTINCT tenant_id FROM users")
+    rows = cur.fetchall()
+    conn.close()
+    return sorted(r["tenant_id"] for r in rows)
+
+def tenant_points(client, tenant_id: str) -> int:
+    collection = tenant_collection(tenant_id)
+    if not client.collection_exists(collection):
+        return 0
+    return client.count(collection_name=collection, count_filter=_tenant_filter(tenant_id), exact=True).count
+
+def wanted_shard(tenant_id: str, points: int, current: str) -> str:
+    """The shard the policy puts a tenant with this many points in."""
+    if tenant_id in SHARD_DEDICATED_TENANTS:
+        return DEDICATED
+    if SHARD_DEDICATED_MIN_POINTS <= 0:
+        return SHARED
+    threshold = SHARD_DEDICATED_MIN_POINTS if current == SHARED else SHARD_DEDICATED_MIN_POINTS / 2
+    return DEDICATED if points >= threshold else SHARED
+
+def _point(record: models.Record, sparse: bool) -> models.PointStruct:
+    vector = record.vector
+    if isinstance(vector, dict) and not sparse:
+        vector = vector[""]  # the target has no BM25 slot
+    return models.PointStruct(id=record.id, vector=vector, payload=record.payload)
+
+def _reembedded(records: list[models.Record], model: str, sparse: bool) -> list[models.PointStruct]:
+    """Copies of the points with their chunk texts (from the chunk store) embedded by another model."""
+    stored = get_chunk_store().get_many(
+        [(r.payload["doc_id"], r.payload["chunk_id"], r.payload.get("content_hash"))
+         for r in records if not r.payload.get("text")])
+    texts = [r.payload.get("text") or stored.get((r.payload["doc_id"], r.payload["chunk_id"])) for r in records]
+    missing = sum(text is None for text in texts)
+    if missing:
+        raise RuntimeError(f"{missing} chunks have no text of their version in the chunk store, "
+                           f"so they cannot be re-embedded")
+    dense = embed_chunks(texts, model).tolist()
+    return [models.PointStruct(
+        id=r.id,
+        vector={"": vec, SPARSE_VECTOR: sparse_doc_vector(text)} if sparse else vec,
+        payload={**r.payload, "content_hash": chunk_hash(text, model)},
+    ) for r, text, vec in zip(records, texts, dense)]
+
+def _scroll_ids(client, collection: str, tenant_id: str):
+    offset = None
+    while True:
+        records, offset = client.scroll(collection_name=collection, scroll_filter=_tenant_filter(tenant_id),
+                                        limit=SHARD_COPY_BATCH, offset=offset, with_payload=False)
+        yield [r.id for r in records]
+        if offset is None:
+            return
+
+def _copy(client, source: str, target: str, tenant_id: str, model: str | None = None,
+          report: Callable[[str, int, int], None] = lambda stage, done, total: None) -> int:
+    """
+    Copy the tenant's points that the target does not have yet, re-embedded
+    with model when the target is another model's index. Points already there
+    were written after the dual writes started and are newer than the copy.
+    """
+    sparse = SPARSE_VECTOR in (client.get_collection(target).config.params.sparse_vectors or {})
+    total = client.count(collection_name=source, count_filter=_tenant_filter(tenant_id), exact=True).count
+    copied = seen = 0
+    for ids in _scroll_ids(client, source, tenant_id):
+        seen += len(ids)
+        present = {r.id for r in client.retrieve(collection_name=target, ids=ids, with_payload=False)}
+        missing = [pid for pid in ids if pid not in present]
+        if missing:
+            records = client.retrieve(collection_name=source, ids=missing, with_payload=True,
+                                      with_vectors=model is None)
+            points = _reembedded(records, model, sparse) if model else [_point(r, sparse) for r in records]
+            client.upsert(collection_name=target, points=points, wait=True)
+            copied += len(records)
+        report("copy", seen, total)
+    return copied
+
+def _drop_deleted(client, source: str, target: str, tenant_id: str) -> int:
+    """Remove copies of points deleted from the source while they were being copied."""
+    dropped = 0
+    for ids in _scroll_ids(client, target, tenant_id):
+        present = {r.id for r in client.retrieve(collection_name=source, ids=ids, with_payload=False)}
+        gone = [pid for pid in ids if pid not in present]
+        if gone:
+            client.delete(collection_name=target, points_selector=models.PointIdsList(points=gone), wait=True)
+            dropped += len(gone)
+    return dropped
+
+def _drop_tenant(client, tenant_id: str, shard: str, model: str | None):
+    collection = shard_collection(tenant_id, shard, model)
+    if shard == SHARED:
+        if client.collection_exists(collection):
+            client.delete(collection_name=collection,
+                          points_selector=models.FilterSelector(filter=_tenant_filter(tenant_id)), wait=True)
+    elif client.collection_exists(collection):
+        client.delete_collection(collection)
+
+def _rehash(client, collection: str, tenant_id: str):
+    """Point the chunk hashes and the chunk store at the content hashes of the new model's points."""
+    offset = None
+    while True:
+        records, offset = client.scroll(collection_name=collection, scroll_filter=_tenant_filter(tenant_id),
+                                        limit=SHARD_COPY_BATCH, offset=offset,
+                                        with_payload=["doc_id", "chunk_id", "content_hash"])
+        rehash_chunks([(r.payload["content_hash"], r.payload["doc_id"], r.payload["chunk_id"], r.id) for r in records])
+        get_chunk_store().rehash([(r.payload["content_hash"], r.payload["doc_id"], r.payload["chunk_id"])
+                                  for r in records])
+        if offset is None:
+            return
+
+def _finish(client, tenant_id: str, old: tuple[str, str | None], new: tuple[str, str | None]):
+    _drop_tenant(client, tenant_id, *old)
+    if (old[1] or EMBED_MODEL) != (new[1] or EMBED_MODEL):
+        _rehash(client, shard_collection(tenant_id, *new), tenant_id)
+        invalidate_tenant(tenant_id)  # answers cached under the old model can no longer be looked up
+
+def claim_move(tenant_id: str) -> str | None:
+    """
+    Reserve the tenant for one move or reindex, atomically across workers: a
+    token to pass to move_tenant(), or None if a move is claimed or under way.
+    The move keeps the claim on every route it writes and renews it as it
+    copies; release_move() ends it. A claim not renewed for MOVE_CLAIM_TTL_S
+    (its worker died) can be taken over, and the interrupted move resumed.
+    """
+    token = uuid.uuid4().hex
+    now = time.time()
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO tenant_settings(tenant_id,key,value,updated_at) VALUES(?,?,?,?) "
+        "ON CONFLICT(tenant_id,key) DO UPDATE SET "
+        "value=json_set(tenant_settings.value, '$.claimed_by', ?, '$.claimed_at', ?), updated_at=excluded.updated_at "
+        "WHERE (json_extract(tenant_settings.value, '$.migrating_to') IS NULL "
+        "AND json_extract(tenant_settings.value, '$.claimed_by') IS NULL) "
+        "OR json_extract(tenant_settings.value, '$.claimed_at') < ?",
+        (tenant_id, SHARD_ROUTE_KEY,
+         json.dumps({"shard": SHARED, "migrating_to": None, "claimed_by": token, "claimed_at": now}),
+         datetime.utcnow().isoformat(), token, now, now - MOVE_CLAIM_TTL_S),
+    )
+    claimed = cur.rowcount == 1
+    conn.commit()
+    conn.close()
+    return token if claimed else None
+
+def release_move(tenant_id: str, token: str):
+    """Drop the claim if it is still ours, once the move is done or has failed."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE tenant_settings SET value=json_remove(value, '$.claimed_by', '$.claimed_at') "
+        "WHERE tenant_id=? AND key=? AND json_extract(value, '$.claimed_by')=?",
+        (tenant_id, SHARD_ROUTE_KEY, token),
+    )
+    conn.commit()
+    conn.close()
+
+def _renew_claim(tenant_id: str, token: str):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE tenant_settings SET value=json_set(value, '$.claimed_at', ?) "
+        "WHERE tenant_id=? AND key=? AND json_extract(value, '$.claimed_by')=?",
+        (time.time(), tenant_id, SHARD_ROUTE_KEY, token),
+    )
+    renewed = cur.rowcount == 1
+    conn.commit()
+    conn.close()
+    if not renewed:
+        raise RuntimeError(f"Another move of tenant {tenant_id} took over; stopping this one")
+
+def _holds_claim(tenant_id: str, token: str) -> bool:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT json_extract(value, '$.claimed_by') AS claimed_by FROM tenant_settings "
+                "WHERE tenant_id=? AND key=?", (tenant_id, SHARD_ROUTE_KEY))
+    row = cur.fetchone()
+    conn.close()
+    return row is not None and row["claimed_by"] == token
+
+def _renewing(tenant_id: str, claim: str, report: Callable[[str, int, int], None]):
+    """report() that also renews the claim, at most once a minute, while a move copies."""
+    renewed_at = time.monotonic()
+
+    def renew_and_report(stage: str, done: int, total: int):
+        nonlocal renewed_at
+        if time.monotonic() - renewed_at >= 60:
+            _renew_claim(tenant_id, claim)
+            renewed_at = time.monotonic()
+        report(stage, done, total)
+    return renew_and_report
+
+def move_tenant(client, tenant_id: str, shard: str, model: str | None = None,
+                on_progress: Callable[[str, int, int], None] | None = None, claim: str | None = None) -> int:
+    """
+    Move a tenant's points to another shard, or reindex them with another
+    embedding model (None keeps the current one), while it keeps ingesting and
+    searching:
+
+    1. route writes to both indexes and wait until every worker has seen that
+    2. copy what the target is missing, then drop copies of points deleted meanwhile
+    3. switch searches to the target, wait again, then delete the old copy
+
+    A reindex re-embeds the chunk texts in step 2, and ingests embed their chunks
+    with both models until step 3 is done. Each search uses the model and the
+    collection of the same route, so no question is embedded with one model
+    and searched against the other. Returns the tenant's points in the target.
+    If the move fails before step 3, the writes go back to the old index only,
+    so the tenant can be moved again. With a claim from claim_move(), the move
+    only runs while it holds it, and keeps it until release_move().
+    """
+    if claim is not None and not _holds_claim(tenant_id, claim):
+        raise RuntimeError(f"Another move of tenant {tenant_id} took over; not moving it twice at once")
+    report = on_progress or (lambda stage, done, total: None)
+    if claim is not None:
+        report = _renewing(tenant_id, claim, report)
+    route = tenant_route(tenant_id)
+    model = route.get("model") if model is None else None if model == EMBED_MODEL else model
+    current, target_index = (route["shard"], route.get("model")), (shard, model)
+    other = (route["migrating_to"], route.get("migrating_model")) if route.get("migrating_to") else None
+    source, target = shard_collection(tenant_id, *current), shard_collection(tenant_id, *target_index)
+    if current == target_index:
+        if other is not None:
+            # A move interrupted after the switch: finish it
+            set_tenant_route(tenant_id, shard, model=model, claimed_by=claim)
+            time.sleep(route_ttl_s())
+            _finish(client, tenant_id, other, target_index)
+        return tenant_points(client, tenant_id)
+    if not client.collection_exists(source):
+        set_tenant_route(tenant_id, shard, model=model, claimed_by=claim)  # nothing indexed yet
+        return 0
+
+    t0 = time.monotonic()
+    reembed = model or EMBED_MODEL if (model or EMBED_MODEL) != (current[1] or EMBED_MODEL) else None
+    size = embedding_size(reembed) if reembed else client.get_collection(source).config.params.vectors.size
+    ensure_collection(client, size, collection=target)
+    if other != target_index:
+        # Leftovers of an earlier, interrupted move may be stale
+        client.delete(collection_name=target, points_selector=models.FilterSelector(filter=_tenant_filter(tenant_id)),
+                      wait=True)
+    set_tenant_route(tenant_id, route["shard"], migrating_to=shard, model=current[1], migrating_model=model,
+                     claimed_by=claim)
+    try:
+        report("dual_write", 0, 0)
+        time.sleep(route_ttl_s())
+
+        copied = _copy(client, source, target, tenant_id, reembed, report)
+        dropped = _drop_deleted(client, source, target, tenant_id)
+        expected = client.count(collection_name=source, count_filter=_tenant_filter(tenant_id), exact=True).count
+        got = client.count(collection_name=target, count_filter=_tenant_filter(tenant_id), exact=True).count
+        if got != expected:
+            raise RuntimeError(f"Moving {tenant_id} to {target}: {got} points copied, {expected} in {source}; "
+                               f"run the move again")
+    except BaseException:
+        # Searches never left the old index; the copy's leftovers are dropped by the next move
+        set_tenant_route(tenant_id, route["shard"], model=current[1], claimed_by=claim)
+        raise
+
+    # Workers still on the old route keep writing to both indexes until they refresh it
+    report("switch", got, got)
+    set_tenant_route(tenant_id, shard, migrating_to=route["shard"], model=model, migrating_model=current[1],
+                     claimed_by=claim)
+    time.sleep(route_ttl_s())
+    set_tenant_route(tenant_id, shard, model=model, claimed_by=claim)
+    time.sleep(route_ttl_s())
+    _finish(client, tenant_id, current, target_index)
+    print(f"Moved tenant {tenant_id} to {target}{f' (reindexed with {reembed})' if reembed else ''}: {got} points "
+          f"({copied} copied, {dropped} deleted meanwhile) in {time.monotonic() - t0:.1f}s")
+    return got
+
+def claimed_move(client, tenant_id: str, shard: str, model: str | None = None) -> int | None:
+    """move_tenant() under a claim, as /admin/reindex runs it; None if the tenant is already being moved."""
+    claim = claim_move(tenant_id)
+    if claim is None:
+        print(f"{tenant_id}: being moved or reindexed, skipped")
+        return None
+    try:
+        return move_tenant(client, tenant_id, shard, model=model, claim=claim)
+    finally:
+        release_move(tenant_id, claim)
+
+def rebalance(client, dry_run: bool = False) -> list[tuple[str, str, str, int]]:
+    """Apply the policy to every known tenant; returns (tenant, from, to, points) of the moves."""
+    moves = []
+    for tenant_id in known_tenants():
+        if tenant_route(tenant_id).get("migrating_to"):
+            print(f"{tenant_id}: being moved or reindexed, skipped")
+            continue
+        current = tenant_route(tenant_id)["shard"]
+        points = tenant_points(client, tenant_id)
+        shard = wanted_shard(tenant_id, points, current)
+        if shard != current:
+            moves.append((tenant_id, current, shard, points))
+    for tenant_id, current, shard, points in moves:
+        print(f"{tenant_id}: {points} points, {current} -> {shard}{' (dry run)' if dry_run else ''}")
+        if not dry_run:
+            claimed_move(client, tenant_id, shard)
+    return moves
+
+def main():
+    ap = argparse.ArgumentParser(prog="python -m backend.sharding")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("status")
+    rebalance_cmd = sub.add_parser("rebalance")
+    rebalance_cmd.add_argument("--dry-run", action="store_true")
+    move_cmd = sub.add_parser("move")
+    move_cmd.add_argument("tenant_id")
+    move_cmd.add_argument("shard", choices=[SHARED, DEDICATED])
+    reindex_cmd = sub.add_parser("reindex")
+    reindex_cmd.add_argument("model", help="sentence-transformers model name")
+    reindex_cmd.add_argument("tenant_ids", nargs="*")
+    args = ap.parse_args()
+
+    client = get_qdrant()
+    if args.command == "status":
+        print(f"{'tenant':20} {'shard':10} {'points':>8}  collection")
+        for tenant_id in known_tenants():
+            route = tenant_route(tenant_id)
+            moving = f" (moving to {route['migrating_to']})" if route.get("migrating_to") else ""
+            print(f"{tenant_id:20} {route['shard']:10} {tenant_points(client, tenant_id):>8}  "
+                  f"{tenant_collection(tenant_id)}{moving}")
+    elif args.command == "rebalance":
+        if not rebalance(client, args.dry_run):
+            print("Every tenant is already where the policy puts it")
+    elif args.command == "reindex":
+        for tenant_id in args.tenant_ids or known_tenants():
+            claimed_move(client, tenant_id, tenant_route(tenant_id)["shard"], model=args.model)
+    else:
+        claimed_move(client, args.tenant_id, args.shard)
+    client.close()
+
+if __name__ == "__main__":
+    main()
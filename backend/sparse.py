@@ -0,0 +1,51 @@
+import os
+import re
+import zlib
+from collections import Counter
+from qdrant_client import models
+
+# BM25 term weights for Qdrant sparse vectors. Qdrant applies the IDF part
+# itself (Modifier.IDF, from its own document counts), so a chunk only carries
+# saturated term frequencies and a query carries 1.0 per term.
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+BM25_AVG_LEN = float(os.getenv("BM25_AVG_LEN", "150"))  # typical chunk length in terms
+
+# Words with inner "-", "_", "." or "/" stay whole (FIN-204, v2.1, HR/IT) and
+# are also indexed by their parts, so "FIN-204" and "FIN 204" both match
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in is it its
+me my no not of on or our should so that the their then there these they this to
+was we what when where which who why will with you your
+""".split())
+
+def terms(text: str) -> list[str]:
+    """Lowercased terms of a text, stopwords dropped, compound identifiers kept whole and split."""
+    out = []
+    for token in _TOKEN.findall(text.lower()):
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            out.append(token)
+        out.extend(p for p in parts if p not in STOPWORDS)
+    return out
+
+def _index(term: str) -> int:
+    # Stable across processes (unlike hash()), fits Qdrant's u32 sparse indices
+    return zlib.crc32(term.encode())
+
+def _sparse(weights: dict[int, float]) -> models.SparseVector:
+    indices = sorted(weights)
+    return models.SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+def sparse_doc_vector(text: str) -> models.SparseVector:
+    """BM25 term-frequency part for a chunk."""
+    words = terms(text)
+    counts = Counter(_index(t) for t in words)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * len(words) / BM25_AVG_LEN)
+    return _sparse({i: tf * (BM25_K1 + 1) / (tf + norm) for i, tf in counts.items()})
+
+def sparse_query_vector(text: str) -> models.SparseVector:
+    return _sparse({_index(t): 1.0 for t in terms(text)})
@@ -0,0 +1,47 @@
+import json
+from datetime import datetime
+from .db import get_conn
+
+def init_tenant_settings():
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS tenant_settings(
+      tenant_id TEXT NOT NULL,
+      key TEXT NOT NULL,
+      value TEXT NOT NULL,
+      updated_at TEXT NOT NULL,
+      PRIMARY KEY (tenant_id, key)
+    )
+    """)
+    conn.commit()
+    conn.close()
+
+def get_setting(tenant_id: str, key: str, default=None):
+    """One tenant's override for a setting (stored as JSON), or default if none is set."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT value FROM tenant_settings WHERE tenant_id=? AND key=?", (tenant_id, key))
+    row = cur.fetchone()
+    conn.close()
+    return json.loads(row["value"]) if row else default
+
+def set_setting(tenant_id: str, key: str, value):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO tenant_settings(tenant_id,key,value,updated_at) VALUES(?,?,?,?) "
+        "ON CONFLICT(tenant_id,key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at",
+        (tenant_id, key, json.dumps(value), datetime.utcnow().isoformat())
+    )
+    conn.commit()
+    conn.close()
+
+def settings_for_key(key: str) -> dict:
+    """Every tenant's override for one setting, {tenant_id: value}."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT tenant_id, value FROM tenant_settings WHERE key=?", (key,))
+    rows = cur.fetchall()
+    conn.close()
+    return {r["tenant_id"]: json.loads(r["value"]) for r in rows}
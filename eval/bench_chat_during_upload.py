@@ -0,0 +1,94 @@
+"""
+Chat-path latency while PDFs are being parsed: in-process threads vs the
+extraction process pool.
+
+A probe that does the Python work of a chat request (build the security filter,
+serialize it, hash the scope) runs every 20 ms while N bulk PDF extractions run
+in the background. With threads the parse holds the GIL and the probe's tail
+latency explodes; with the process pool it should stay close to idle.
+
+    python eval/bench_chat_during_upload.py --uploads 4 --pages 300
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_pdf_memory import make_pdf  # noqa: E402
+from backend import extract  # noqa: E402
+from backend.answer_cache import security_scope  # noqa: E402
+from backend.models import User  # noqa: E402
+from backend.security import build_qdrant_security_filter  # noqa: E402
+
+USER = User(user_id=7, username="probe", tenant_id="t1", role="member", groups=["hr", "finance"])
+
+
+def probe() -> float:
+    t0 = time.perf_counter()
+    for _ in range(5):
+        build_qdrant_security_filter(USER).model_dump_json()
+        security_scope(USER)
+    return (time.perf_counter() - t0) * 1000
+
+
+def measure_during(load, seconds_min: float = 2.0) -> list[float]:
+    done = threading.Event()
+
+    def background():
+        load()
+        done.set()
+
+    threading.Thread(target=background, daemon=True).start()
+    lat = []
+    t_end = time.monotonic() + seconds_min
+    while not done.is_set() or time.monotonic() < t_end:
+        lat.append(probe())
+        time.sleep(0.02)
+    return lat
+
+
+def parallel(fn, n: int):
+    def run():
+        threads = [threading.Thread(target=fn) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    return run
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--uploads", type=int, default=4)
+    ap.add_argument("--pages", type=int, default=300)
+    args = ap.parse_args()
+
+    pdf = os.path.join(tempfile.mkdtemp(), "bench.pdf")
+    make_pdf(pdf, args.pages)
+    list(extract.iter_pdf_pages_pooled(pdf))  # start the worker processes up front
+
+    scenarios = {
+        "idle": lambda: time.sleep(2.0),
+        f"{args.uploads} uploads, threads": parallel(lambda: list(extract.iter_pdf_pages(pdf)), args.uploads),
+        f"{args.uploads} uploads, process pool": parallel(lambda: list(extract.iter_pdf_pages_pooled(pdf)), args.uploads),
+    }
+
+    print(f"pages/upload={args.pages} EXTRACT_WORKERS={extract.EXTRACT_WORKERS}\n")
+    print(f"{'background load':30} {'wall s':>7} {'p50 ms':>7} {'p99 ms':>8} {'max ms':>8}")
+    for name, load in scenarios.items():
+        t0 = time.perf_counter()
+        lat = measure_during(load)
+        wall = time.perf_counter() - t0
+        p99 = sorted(lat)[int(0.99 * (len(lat) - 1))]
+        print(f"{name:30} {wall:>7.1f} {statistics.median(lat):>7.2f} {p99:>8.2f} {max(lat):>8.2f}")
+    extract.shutdown_extract_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Search latency and storage with chunk texts in the vector payloads vs in the
+chunk store (backend/chunk_store.py).
+
+Indexes the same synthetic chunks twice, once with "text" in every payload
+(how points were written before the store) and once with the text in a
+temporary chunk store, and runs the same searches through
+qdrant_store.search() against both. Reports the payload bytes per point the
+vector store keeps, the store's compressed size, and p50/p99 search latency
+with a cold and a warm LRU.
+
+    python eval/bench_chunk_store.py                                   # LocalIndex
+    python eval/bench_chunk_store.py --qdrant-url http://localhost:6333
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+from backend import chunk_store, qdrant_store  # noqa: E402
+from backend.local_index import LocalIndex  # noqa: E402
+from backend.models import User  # noqa: E402
+from backend.security import build_qdrant_security_filter  # noqa: E402
+
+WORDS = ("policy refund invoice approval travel expense laptop vacation payroll contract "
+         "onboarding security badge vendor budget audit employee manager quarterly report "
+         "reimbursement procedure request form deadline").split()
+
+
+def make_chunks(n: int, words: int, dim: int, rng: np.random.Generator):
+    centers = rng.standard_normal((32, dim)).astype(np.float32)
+    chunks = []
+    for i in range(n):
+        vec = centers[i % 32] + 0.6 * rng.standard_normal(dim).astype(np.float32)
+        text = " ".join(random.choices(WORDS, k=words)) + f" ref-{i}"
+        payload = {"tenant_id": "t1", "roles_allowed": ["admin"], "sensitive": False, "allowed_users": [],
+                   "allowed_groups": [], "doc_id": i // 20, "chunk_id": i % 20, "title": f"doc {i // 20}",
+                   "content_hash": uuid.uuid5(uuid.NAMESPACE_OID, text).hex}
+        chunks.append((i, vec.tolist(), payload, text))
+    return chunks, centers
+
+
+def run(client, queries, top_k: int) -> list[float]:
+    user = User(user_id=1, username="u", tenant_id="t1", role="admin", groups=[])
+    latencies = []
+    for vec in queries:
+        t0 = time.perf_counter()
+        hits = qdrant_store.search(client, vec, build_qdrant_security_filter(user), top_k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if any(not h.payload.get("text") for h in hits):
+            raise AssertionError("search hit without its text")
+    return sorted(latencies)
+
+
+def p(latencies: list[float], q: float) -> float:
+    return latencies[int(q * (len(latencies) - 1))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, default=20000)
+    ap.add_argument("--words", type=int, default=180, help="words per chunk")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=6)
+    ap.add_argument("--qdrant-url", default="")
+    args = ap.parse_args()
+
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    chunks, centers = make_chunks(args.points, args.words, args.dim, rng)
+    queries = [(centers[i % 32] + 0.6 * rng.standard_normal(args.dim)).tolist() for i in range(args.queries)]
+
+    os.environ["HYBRID_SEARCH"] = "0"
+    os.environ["SHARD_ROUTE_TTL_S"] = "3600"  # every tenant stays in the bench collection
+    qdrant_store._routes_read_at = time.monotonic()
+    tmp = tempfile.mkdtemp(prefix="bench_chunk_store_")
+    if args.qdrant_url:
+        client = QdrantClient(url=args.qdrant_url, api_key=os.getenv("QDRANT_API_KEY"), timeout=300)
+    else:
+        client = LocalIndex(os.path.join(tmp, "index"))
+    store = chunk_store.ChunkTextStore(os.path.join(tmp, "chunk_text.db"), chunk_store.CHUNK_TEXT_LRU)
+    chunk_store._store = store
+
+    print(f"points={args.points} words/chunk={args.words} dim={args.dim} queries={args.queries} "
+          f"top_k={args.top_k} store={args.qdrant_url or 'local index'} lru={store.lru_entries}\n")
+    print(f"{'texts in':14} {'payload B/pt':>13} {'text store MB':>14} {'p50 ms':>7} {'p99 ms':>7}")
+    created = []
+    try:
+        for where, warm in [("payload", True), ("chunk store", False), ("chunk store", True)]:
+            if not (where == "chunk store" and warm):
+                qdrant_store.COLLECTION = f"bench_chunk_store_{uuid.uuid4().hex[:8]}"
+                created.append(qdrant_store.COLLECTION)
+                qdrant_store.ensure_collection(client, args.dim)
+                points = [models.PointStruct(
+                    id=i, vector=vec, payload={**payload, "text": text} if where == "payload" else payload)
+                    for i, vec, payload, text in chunks]
+                if where == "chunk store":
+                    docs: dict[int, list] = {}
+                    for _, _, payload, text in chunks:
+                        docs.setdefault(payload["doc_id"], []).append(
+                            (payload["chunk_id"], payload["content_hash"], text))
+                    for doc_id, rows in docs.items():
+                        store.put_many("t1", doc_id, rows)
+                qdrant_store.upsert_chunks(client, points, wait=True)
+            if warm:
+                run(client, queries, args.top_k)  # the same queries again hit the LRU
+            latencies = run(client, queries, args.top_k)
+            payload_bytes = sum(len(json.dumps(pt.payload)) for pt in points) / len(points)
+            store_mb = store.stats()["stored_bytes"] / 2**20 if where == "chunk store" else 0.0
+            label = where if where == "payload" else f"store, {'warm' if warm else 'cold'} LRU"
+            print(f"{label:14} {payload_bytes:>13.0f} {store_mb:>14.1f} {p(latencies, 0.5):>7.2f} "
+                  f"{p(latencies, 0.99):>7.2f}")
+        print(f"\n(uncompressed text: {sum(len(t.encode()) for *_, t in chunks) / 2**20:.1f} MB; "
+              f"LRU hit rate over the store runs {store.stats()['lru_hit_rate']:.1%})")
+    finally:
+        for collection in created:
+            if client.collection_exists(collection):
+                client.delete_collection(collection)
+        client.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Fixed 900-character chunks vs token-aware sentence chunks: chunks per
+document, how many chunks the embedder would truncate, embed time, and
+retrieval hit rate.
+
+Builds a synthetic handbook where every paragraph holds one fact ("The
+approval limit for cost center CC-17 is 4200 dollars...") among filler
+sentences, asks one question per fact, and counts a hit when a top-k chunk
+contains the whole fact sentence. Needs the embedding model (EMBED_MODEL).
+
+    python eval/bench_chunking.py --docs 20 --top-k 5
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.chunking import iter_token_chunks  # noqa: E402
+from backend.embeddings import count_tokens, embed_texts, max_tokens  # noqa: E402
+from backend.ingest import iter_chunks, iter_clean  # noqa: E402
+
+FILLER = [
+    "Requests are reviewed by the finance team every Tuesday and Thursday.",
+    "Receipts must be attached as PDF or image files to the original request.",
+    "Managers can delegate approvals while they are on leave for more than three days.",
+    "Late submissions are accepted with a short written explanation from the employee.",
+    "International travel requires a separate pre-approval from the regional director.",
+    "Corporate cards should only be used for business expenses incurred while traveling.",
+    "The policy applies to full-time employees, contractors and interns alike.",
+    "Questions about this section can be sent to the shared finance mailbox.",
+]
+OWNERS = ["Priya Natarajan", "Tomás Álvarez", "Grace Okafor", "Lena Fischer", "Kenji Watanabe"]
+
+
+def make_corpus(n_docs: int, paragraphs: int, seed: int = 0):
+    rng = random.Random(seed)
+    docs, facts = [], []
+    for d in range(n_docs):
+        pages = []
+        for p in range(paragraphs):
+            cc = d * paragraphs + p
+            fact = (f"The approval limit for cost center CC-{cc} is {rng.randint(5, 95) * 100} dollars "
+                    f"and requests above it go to {rng.choice(OWNERS)}.")
+            sentences = rng.sample(FILLER, rng.randint(2, 6))
+            sentences.insert(rng.randint(0, len(sentences)), fact)
+            pages.append(" ".join(sentences))
+            facts.append((f"What is the approval limit for cost center CC-{cc}?", fact))
+        docs.append(["\n\n".join(pages)])
+    return docs, facts
+
+
+def evaluate(name: str, docs, facts, chunker, top_k: int):
+    chunks = [c for doc in docs for c in chunker(doc)]
+    tokens = count_tokens(chunks)
+    limit = max_tokens()
+
+    t0 = time.perf_counter()
+    vectors = embed_texts(chunks)
+    embed_s = time.perf_counter() - t0
+
+    q_vectors = embed_texts([q for q, _ in facts])
+    top = np.argsort(-(q_vectors @ vectors.T), axis=1)[:, :top_k]
+    hits = sum(any(fact in chunks[i] for i in row) for row, (_, fact) in zip(top, facts))
+
+    print(f"{name:28} {len(chunks) / len(docs):>10.1f} {np.mean(tokens):>11.0f} "
+          f"{sum(t > limit for t in tokens) / len(chunks):>10.1%} {embed_s:>8.2f} {hits / len(facts):>8.1%}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=20)
+    ap.add_argument("--paragraphs", type=int, default=30)
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--chunk-tokens", type=int, default=200)
+    ap.add_argument("--overlap-tokens", type=int, default=40)
+    args = ap.parse_args()
+
+    docs, facts = make_corpus(args.docs, args.paragraphs)
+    embed_texts(["warm up"])
+
+    print(f"docs={args.docs} questions={len(facts)} window={max_tokens()} tokens top_k={args.top_k}\n")
+    print(f"{'chunker':28} {'chunks/doc':>10} {'mean tokens':>11} {'truncated':>10} {'embed s':>8} {'hit@k':>8}")
+    evaluate("chars 900/150 (chunk_text)", docs, facts, lambda d: iter_chunks(iter_clean(d)), args.top_k)
+    evaluate(f"tokens {args.chunk_tokens}/{args.overlap_tokens}", docs, facts,
+             lambda d: iter_token_chunks(d, args.chunk_tokens, args.overlap_tokens), args.top_k)
+
+
+if __name__ == "__main__":
+    main()
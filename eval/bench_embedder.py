@@ -0,0 +1,64 @@
+"""
+Startup time and resident memory: per-module embedders vs the shared lazy embedder.
+
+Each scenario runs in a fresh Python process so imports and RSS do not leak
+between them.
+
+    python eval/bench_embedder.py
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Old layout: main.py and ingest.py each built a model at import time.
+LEGACY = """
+import json, resource, time
+t0 = time.perf_counter()
+from sentence_transformers import SentenceTransformer
+main_embedder = SentenceTransformer("all-MiniLM-L6-v2")
+ingest_embedder = SentenceTransformer("all-MiniLM-L6-v2")
+ready = time.perf_counter() - t0
+main_embedder.encode(["what is our refund policy?"], normalize_embeddings=True)
+first = time.perf_counter() - t0
+print(json.dumps({"import_s": ready, "first_query_s": first,
+                  "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+# New layout: one shared module, model loaded on first use.
+SHARED = """
+import json, resource, time
+t0 = time.perf_counter()
+from backend import embeddings
+ready = time.perf_counter() - t0
+rss_before_load = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+embeddings.embed_query("what is our refund policy?")
+embeddings.embed_texts(["a chunk from the ingest path"])
+first = time.perf_counter() - t0
+print(json.dumps({"import_s": ready, "first_query_s": first, "rss_before_load_mb": rss_before_load,
+                  "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def run_scenario(code: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    results = {"legacy (2 models at import)": run_scenario(LEGACY),
+               "shared (1 lazy model)": run_scenario(SHARED)}
+
+    print(f"{'scenario':32} {'import s':>10} {'1st query s':>12} {'max RSS MB':>11}")
+    for name, r in results.items():
+        print(f"{name:32} {r['import_s']:>10.2f} {r['first_query_s']:>12.2f} {r['max_rss_mb']:>11.0f}")
+
+    legacy, shared = results.values()
+    print(f"\nimport-time saving: {legacy['import_s'] - shared['import_s']:.2f}s")
+    print(f"resident memory saving: {legacy['max_rss_mb'] - shared['max_rss_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Filtered-search latency as the number of tenants sharing the collection grows,
+with and without payload indexes on the security-filter fields.
+
+Needs a real Qdrant server (payload indexes are a no-op in local mode), e.g.
+`docker run -p 6333:6333 qdrant/qdrant`. Uses throwaway collections.
+
+    python eval/bench_filtered_search.py --url http://localhost:6333 --points 50000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+from backend import qdrant_store  # noqa: E402
+from backend.models import User  # noqa: E402
+from backend.security import build_qdrant_security_filter  # noqa: E402
+
+DIM = 384
+TENANT_COUNTS = [1, 10, 50, 200]
+GROUPS = ["finance", "hr", "legal", "sales"]
+
+
+def fill(client: QdrantClient, collection: str, n_points: int, n_tenants: int, indexed: bool, rng):
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    hnsw = models.HnswConfigDiff(payload_m=16, m=0) if indexed and qdrant_store._tenant_index_enabled() else None
+    client.create_collection(
+        collection,
+        vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE),
+        hnsw_config=hnsw,
+    )
+    if indexed:
+        qdrant_store._ensure_payload_indexes(client, collection)
+
+    batch = 1000
+    for start in range(0, n_points, batch):
+        vecs = rng.standard_normal((min(batch, n_points - start), DIM)).astype(np.float32)
+        points = []
+        for i, v in enumerate(vecs):
+            pid = start + i
+            restricted = pid % 5 == 0
+            points.append(models.PointStruct(id=pid, vector=v.tolist(), payload={
+                "tenant_id": f"t{pid % n_tenants}",
+                "roles_allowed": ["member", "admin"] if pid % 3 else ["admin"],
+                "sensitive": pid % 7 == 0,
+                "allowed_users": [pid % 50] if restricted else [],
+                "allowed_groups": [GROUPS[pid % len(GROUPS)]] if restricted else [],
+            }))
+        client.upsert(collection, points=points, wait=True)
+
+
+def measure(client: QdrantClient, collection: str, n_tenants: int, queries: int, rng) -> list[float]:
+    out = []
+    for i in range(queries):
+        user = User(user_id=i % 50, username="bench", tenant_id=f"t{i % n_tenants}",
+                    role="member", groups=[GROUPS[i % len(GROUPS)]])
+        vec = rng.standard_normal(DIM).astype(np.float32).tolist()
+        t0 = time.perf_counter()
+        client.search(collection, query_vector=vec, query_filter=build_qdrant_security_filter(user), limit=6)
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default=os.getenv("BENCH_QDRANT_URL", "http://localhost:6333"))
+    ap.add_argument("--api-key", default=os.getenv("BENCH_QDRANT_API_KEY"))
+    ap.add_argument("--points", type=int, default=50_000)
+    ap.add_argument("--queries", type=int, default=300)
+    args = ap.parse_args()
+
+    client = QdrantClient(url=args.url, api_key=args.api_key, timeout=120)
+    rng = np.random.default_rng(0)
+
+    print(f"points={args.points} queries={args.queries} tenant_index={qdrant_store._tenant_index_enabled()}\n")
+    print(f"{'tenants':>8} {'indexes':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for n_tenants in TENANT_COUNTS:
+        for indexed in (False, True):
+            collection = f"bench_filtered_{n_tenants}_{int(indexed)}"
+            fill(client, collection, args.points, n_tenants, indexed, rng)
+            lat = measure(client, collection, n_tenants, args.queries, rng)
+            p99 = sorted(lat)[int(0.99 * (len(lat) - 1))]
+            print(f"{n_tenants:>8} {'yes' if indexed else 'no':>8} {statistics.median(lat):>8.2f} {p99:>8.2f}")
+            client.delete_collection(collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Search latency and result agreement of the in-process LocalIndex
+(VECTOR_STORE=local) vs Qdrant, through qdrant_store.search() with real
+security filters.
+
+Indexes the same synthetic points into both: clustered random vectors, a
+BM25 text, and payloads spread over --tenants tenants with mixed roles,
+sensitive flags and user/group ACLs. Every search result is also checked
+against the access rules written out by hand (tenant, role, sensitive for
+non-admins, ACLs), so a filter mismatch shows up as a violation.
+
+    python eval/bench_local_index.py                      # vs in-process Qdrant (agreement only)
+    python eval/bench_local_index.py --qdrant-url http://localhost:6333   # vs a Qdrant server
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+from backend import qdrant_store  # noqa: E402
+from backend.local_index import LocalIndex  # noqa: E402
+from backend.models import User  # noqa: E402
+from backend.security import build_qdrant_security_filter  # noqa: E402
+from backend.sparse import sparse_doc_vector  # noqa: E402
+
+ROLES = ["admin", "member"]
+GROUPS = ["hr", "legal", "sales"]
+WORDS = ("policy refund invoice approval travel expense laptop vacation payroll contract "
+         "onboarding security badge vendor budget audit").split()
+
+
+def make_points(n: int, tenants: int, dim: int, rng: np.random.Generator):
+    centers = rng.standard_normal((32, dim)).astype(np.float32)
+    points = []
+    for i in range(n):
+        vec = centers[i % 32] + 0.6 * rng.standard_normal(dim).astype(np.float32)
+        text = " ".join(random.choices(WORDS, k=12)) + f" ref-{i % 500}"
+        payload = {
+            "tenant_id": f"t{i % tenants}",
+            "roles_allowed": random.sample(ROLES, random.randint(1, 2)),
+            "sensitive": random.random() < 0.1,
+            "allowed_users": [random.randint(1, 20)] if random.random() < 0.1 else [],
+            "allowed_groups": [random.choice(GROUPS)] if random.random() < 0.1 else [],
+            "doc_id": i // 20, "chunk_id": i % 20, "title": f"doc {i // 20}", "text": text,
+        }
+        points.append(models.PointStruct(
+            id=i, vector={"": vec.tolist(), qdrant_store.SPARSE_VECTOR: sparse_doc_vector(text)}, payload=payload))
+    return points, centers
+
+
+def allowed(user: User, p: dict) -> bool:
+    if p["tenant_id"] != user.tenant_id or user.role not in p["roles_allowed"]:
+        return False
+    if p["sensitive"] and user.role != "admin":
+        return False
+    return (not p["allowed_users"] or not p["allowed_groups"]
+            or user.user_id in p["allowed_users"] or bool(set(user.groups) & set(p["allowed_groups"])))
+
+
+def run(client, queries, top_k: int, hybrid: bool):
+    os.environ["HYBRID_SEARCH"] = "1" if hybrid else "0"
+    latencies, results, violations = [], [], 0
+    for user, vec, text in queries:
+        t0 = time.perf_counter()
+        hits = qdrant_store.search(client, vec, build_qdrant_security_filter(user), top_k, query_text=text,
+                                   with_payload=True)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results.append([h.id for h in hits])
+        violations += sum(not allowed(user, h.payload) for h in hits)
+    latencies.sort()
+    return results, statistics.median(latencies), latencies[int(0.99 * (len(latencies) - 1))], violations
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, default=20000)
+    ap.add_argument("--tenants", type=int, default=10)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=6)
+    ap.add_argument("--qdrant-url", default="")
+    args = ap.parse_args()
+
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    points, centers = make_points(args.points, args.tenants, args.dim, rng)
+    queries = []
+    for i in range(args.queries):
+        user = User(user_id=random.randint(1, 20), username="u", tenant_id=f"t{i % args.tenants}",
+                    role=random.choice(ROLES), groups=random.sample(GROUPS, random.randint(0, 1)))
+        vec = (centers[i % 32] + 0.6 * rng.standard_normal(args.dim)).tolist()
+        queries.append((user, vec, " ".join(random.choices(WORDS, k=3)) + f" ref-{i % 500}"))
+
+    if args.qdrant_url:
+        qdrant = QdrantClient(url=args.qdrant_url, api_key=os.getenv("QDRANT_API_KEY"))
+    else:
+        qdrant = QdrantClient(":memory:")
+        os.environ["QDRANT_UPSERT_PARALLEL"] = "1"  # in-process Qdrant is not thread-safe
+    index_dir = tempfile.mkdtemp(prefix="local_index_")
+    local = LocalIndex(index_dir)
+    qdrant_store.COLLECTION = f"bench_local_{uuid.uuid4().hex[:8]}"
+
+    try:
+        load = {}
+        for name, client in (("qdrant", qdrant), ("local", local)):
+            qdrant_store._ready_collections.discard(qdrant_store.COLLECTION)
+            qdrant_store.ensure_collection(client, args.dim)
+            t0 = time.perf_counter()
+            qdrant_store.upsert_chunks(client, points, wait=True)
+            load[name] = time.perf_counter() - t0
+
+        local.close()
+        t0 = time.perf_counter()
+        local = LocalIndex(index_dir)
+        reopen_s = time.perf_counter() - t0
+        disk_mb = sum(f.stat().st_size for f in Path(index_dir).rglob("*") if f.is_file()) / 2**20
+
+        print(f"points={args.points} tenants={args.tenants} dim={args.dim} queries={args.queries} "
+              f"top_k={args.top_k} qdrant={args.qdrant_url or 'in-process'}")
+        print(f"upsert: qdrant {load['qdrant']:.1f}s, local {load['local']:.1f}s; "
+              f"local index reopened from disk in {reopen_s:.2f}s ({disk_mb:.0f} MB)\n")
+        print(f"{'store':8} {'retrieval':10} {'p50 ms':>7} {'p99 ms':>7} {'agree@k':>8} {'violations':>11}")
+        for hybrid in (False, True):
+            reference = None
+            for name, client in (("qdrant", qdrant), ("local", local)):
+                results, p50, p99, violations = run(client, queries, args.top_k, hybrid)
+                if reference is None:
+                    reference = results
+                agree = statistics.mean(
+                    len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(results, reference))
+                print(f"{name:8} {'hybrid' if hybrid else 'dense':10} {p50:>7.2f} {p99:>7.2f} {agree:>8.1%} {violations:>11}")
+    finally:
+        qdrant.delete_collection(qdrant_store.COLLECTION)
+        local.close()
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Peak RSS of PDF → clean → chunk: whole-document path vs the page-streaming path.
+
+Generates a synthetic text PDF (or uses --pdf), then runs each path in a
+fresh process and reports max RSS and time. Embedding is left out so the
+numbers isolate extraction and chunking.
+
+    python eval/bench_pdf_memory.py --pages 2000
+    python eval/bench_pdf_memory.py --pdf big_handbook.pdf
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+WHOLE = """
+import json, resource, sys, time
+from backend.extract import extract_pdf
+from backend.ingest import clean_text, chunk_text
+t0 = time.perf_counter()
+data = open(sys.argv[1], "rb").read()            # what `await file.read()` did
+chunks = chunk_text(clean_text(extract_pdf(data)))
+print(json.dumps({"chunks": len(chunks), "seconds": time.perf_counter() - t0,
+                  "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+STREAMING = """
+import json, resource, sys, time
+from backend.extract import iter_pdf_pages
+from backend.ingest import iter_clean, iter_chunks
+t0 = time.perf_counter()
+n = 0
+for chunk in iter_chunks(iter_clean(iter_pdf_pages(sys.argv[1]))):
+    n += 1
+print(json.dumps({"chunks": n, "seconds": time.perf_counter() - t0,
+                  "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+BASELINE = """
+import json, resource
+import backend.extract, backend.ingest
+print(json.dumps({"chunks": 0, "seconds": 0.0,
+                  "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+LINE = "Employees must submit expense reports within 30 days of travel, policy FIN-204 section {n}."
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 45):
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    font_ref = writer._add_object(font)
+    for p in range(pages):
+        page = writer.add_blank_page(width=612, height=792)
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 760 Td"]
+        for i in range(lines_per_page):
+            ops.append(f"({LINE.format(n=p * lines_per_page + i)}) '")
+        ops.append("ET")
+        stream = DecodedStreamObject()
+        stream.set_data("\n".join(ops).encode())
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font_ref}),
+        })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def run(code: str, pdf: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", code, pdf], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf")
+    ap.add_argument("--pages", type=int, default=2000)
+    args = ap.parse_args()
+
+    pdf = args.pdf
+    if not pdf:
+        pdf = os.path.join(tempfile.mkdtemp(), "bench.pdf")
+        make_pdf(pdf, args.pages)
+    print(f"{pdf}: {os.path.getsize(pdf) / 1e6:.1f} MB\n")
+
+    base = run(BASELINE, pdf)
+    print(f"{'path':22} {'chunks':>7} {'seconds':>8} {'max RSS MB':>11} {'over import MB':>15}")
+    for name, code in [("whole document", WHOLE), ("page streaming", STREAMING)]:
+        r = run(code, pdf)
+        print(f"{name:22} {r['chunks']:>7} {r['seconds']:>8.1f} {r['max_rss_mb']:>11.0f} "
+              f"{r['max_rss_mb'] - base['max_rss_mb']:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Search latency with a fresh QdrantClient per call vs the pooled process-wide client.
+
+Runs against a tiny local stand-in that speaks just enough of Qdrant's REST API
+(an empty search result), so the numbers isolate client and connection setup
+cost. Against Qdrant Cloud the per-call TLS handshake makes the gap larger.
+
+    python eval/bench_qdrant_client.py --calls 500
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # allow keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"result": [], "status": "ok", "time": 0.0}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stand_in() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timed_searches(get_client, calls: int) -> list[float]:
+    flt = models.Filter(must=[models.FieldCondition(key="tenant_id", match=models.MatchValue(value="t1"))])
+    vec = [0.01] * 384
+    out = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        get_client().search(collection_name="bench", query_vector=vec, query_filter=flt, limit=6)
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=500)
+    args = ap.parse_args()
+
+    server = start_stand_in()
+    os.environ["QDRANT_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.setdefault("QDRANT_API_KEY", "bench")
+    warnings.filterwarnings("ignore", message="Api key is used with an insecure connection")
+
+    from backend import qdrant_store
+
+    def fresh_client():
+        # What get_qdrant() used to do on every request
+        return QdrantClient(url=os.environ["QDRANT_URL"], api_key=os.environ["QDRANT_API_KEY"])
+
+    results = {
+        "new client per call": timed_searches(fresh_client, args.calls),
+        "pooled get_qdrant()": timed_searches(qdrant_store.get_qdrant, args.calls),
+    }
+
+    print(f"{'client':24} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, lat in results.items():
+        p99 = sorted(lat)[int(0.99 * (len(lat) - 1))]
+        print(f"{name:24} {statistics.mean(lat):>8.2f} {statistics.median(lat):>8.2f} {p99:>8.2f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
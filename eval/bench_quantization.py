@@ -0,0 +1,161 @@
+"""
+Vector memory, search latency and recall@k of full-precision vectors vs int8
+and binary quantization, with and without rescoring by the originals.
+
+Searches go through qdrant_store.search() with a tenant filter (dense only:
+quantization does not touch the BM25 half of hybrid search). Recall@k is
+measured against an exact NumPy top-k over the same tenant's vectors.
+
+By default the points are synthetic clustered 384-d vectors. With
+--from-collection they are the vectors already indexed by the app (read
+from QDRANT_COLLECTION through get_qdrant()), and held-out chunks serve as
+the queries, so the numbers are on our own data.
+
+    python eval/bench_quantization.py                                   # LocalIndex, synthetic
+    python eval/bench_quantization.py --from-collection --qdrant-url http://localhost:6333
+"""
+import argparse
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+load_dotenv(ROOT / ".env")
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+from backend import qdrant_store  # noqa: E402
+from backend.local_index import LocalIndex  # noqa: E402
+from backend.models import User  # noqa: E402
+from backend.quantize import wait_until_optimized  # noqa: E402
+from backend.security import build_qdrant_security_filter  # noqa: E402
+
+MODES = ["none", "int8", "binary"]
+
+
+def synthetic(n: int, queries: int, tenants: int, dim: int, rng: np.random.Generator):
+    centers = rng.standard_normal((64, dim)).astype(np.float32)
+    vectors = centers[np.arange(n + queries) % 64] + 0.7 * rng.standard_normal((n + queries, dim)).astype(np.float32)
+    tenant_ids = [f"t{i % tenants}" for i in range(n + queries)]
+    return vectors[:n], tenant_ids[:n], vectors[n:], tenant_ids[n:]
+
+
+def from_collection(n: int, queries: int):
+    client = qdrant_store.get_qdrant()
+    vectors, tenant_ids, offset = [], [], None
+    while len(vectors) < n + queries:
+        records, offset = client.scroll(collection_name=qdrant_store.COLLECTION, limit=256, offset=offset,
+                                        with_payload=["tenant_id"], with_vectors=True)
+        for r in records:
+            vectors.append(r.vector.get("") if isinstance(r.vector, dict) else r.vector)
+            tenant_ids.append(r.payload["tenant_id"])
+        if offset is None:
+            break
+    if len(vectors) <= queries:
+        sys.exit(f"{qdrant_store.COLLECTION} has only {len(vectors)} points")
+    order = np.random.default_rng(0).permutation(len(vectors))
+    vectors = np.asarray(vectors, dtype=np.float32)[order]
+    tenant_ids = [tenant_ids[i] for i in order]
+    return vectors[queries:], tenant_ids[queries:], vectors[:queries], tenant_ids[:queries]
+
+
+def exact_top_k(vectors: np.ndarray, tenant_ids: list[str], queries: np.ndarray, query_tenants: list[str], k: int):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    tenants = np.asarray(tenant_ids)
+    out = []
+    for q, tenant_id in zip(queries, query_tenants):
+        rows = np.flatnonzero(tenants == tenant_id)
+        scores = unit[rows] @ (q / np.linalg.norm(q))
+        out.append(set(rows[np.argsort(-scores)[:k]].tolist()))
+    return out
+
+
+def run(client, queries: np.ndarray, query_tenants: list[str], truth: list[set], k: int):
+    latencies, recalls = [], []
+    for q, tenant_id, expected in zip(queries, query_tenants, truth):
+        user = User(user_id=1, username="u", tenant_id=tenant_id, role="admin", groups=[])
+        t0 = time.perf_counter()
+        hits = qdrant_store.search(client, q.tolist(), build_qdrant_security_filter(user), k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        recalls.append(len({h.id for h in hits} & expected) / max(len(expected), 1))
+    latencies.sort()
+    return statistics.mean(recalls), statistics.median(latencies), latencies[int(0.99 * (len(latencies) - 1))]
+
+
+def vector_ram_mb(mode: str, n: int, dim: int) -> float:
+    """Vectors that have to stay in RAM for fast search: the originals, or only the quantized copy."""
+    per_vector = {"none": 4 * dim, "int8": dim + 4, "binary": math.ceil(dim / 8)}[mode]
+    return n * per_vector / 2**20
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, default=50000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--tenants", type=int, default=5)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--top-k", type=int, default=6)
+    ap.add_argument("--from-collection", action="store_true", help="use the vectors already in QDRANT_COLLECTION")
+    ap.add_argument("--qdrant-url", default="")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.from_collection:
+        vectors, tenant_ids, queries, query_tenants = from_collection(args.points, args.queries)
+    else:
+        vectors, tenant_ids, queries, query_tenants = synthetic(args.points, args.queries, args.tenants, args.dim, rng)
+    n, dim = vectors.shape
+    truth = exact_top_k(vectors, tenant_ids, queries, query_tenants, args.top_k)
+    points = [models.PointStruct(id=i, vector=v.tolist(), payload={
+        "tenant_id": t, "roles_allowed": ["admin"], "sensitive": False, "allowed_users": [], "allowed_groups": []})
+        for i, (v, t) in enumerate(zip(vectors, tenant_ids))]
+
+    index_dir = tempfile.mkdtemp(prefix="bench_quantization_")
+    if args.qdrant_url:
+        client = QdrantClient(url=args.qdrant_url, api_key=os.getenv("QDRANT_API_KEY"), timeout=300)
+    else:
+        client = LocalIndex(index_dir)
+    os.environ["HYBRID_SEARCH"] = "0"
+    os.environ["SHARD_ROUTE_TTL_S"] = "3600"  # every tenant stays in the bench collection
+    qdrant_store._routes_read_at = time.monotonic()
+    oversampling = os.getenv("QDRANT_OVERSAMPLING", "")
+
+    print(f"points={n} dim={dim} queries={len(queries)} top_k={args.top_k} "
+          f"data={'collection ' + qdrant_store.COLLECTION if args.from_collection else 'synthetic'} "
+          f"store={args.qdrant_url or 'local index'} oversampling={oversampling or 'int8 2, binary 8'}\n")
+    print(f"{'mode':8} {'rescore':8} {'vector RAM MB':>14} {'recall@k':>9} {'p50 ms':>7} {'p99 ms':>7}")
+    created = []
+    try:
+        for mode in MODES:
+            os.environ["QDRANT_QUANTIZATION"] = mode
+            qdrant_store.COLLECTION = f"bench_quant_{mode}_{uuid.uuid4().hex[:8]}"
+            created.append(qdrant_store.COLLECTION)
+            qdrant_store.ensure_collection(client, dim)
+            qdrant_store.upsert_chunks(client, points, wait=True)
+            wait_until_optimized(client, qdrant_store.COLLECTION)
+            for rescore in ([True] if mode == "none" else [True, False]):
+                os.environ["QDRANT_RESCORE"] = "1" if rescore else "0"
+                run(client, queries[:20], query_tenants[:20], truth[:20], args.top_k)  # warm-up
+                recall, p50, p99 = run(client, queries, query_tenants, truth, args.top_k)
+                print(f"{mode:8} {('yes' if rescore else 'no') if mode != 'none' else '-':8} "
+                      f"{vector_ram_mb(mode, n, dim):>14.1f} {recall:>9.1%} {p50:>7.2f} {p99:>7.2f}")
+        print("\n(vector RAM: float32 originals, or the quantized copy with the originals left on disk)")
+    finally:
+        for collection in created:
+            if client.collection_exists(collection):
+                client.delete_collection(collection)
+        client.close()
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Load test for question embedding: one encode per request vs the micro-batcher.
+
+Simulates N concurrent /chat/query workers (FastAPI runs sync endpoints in a
+threadpool) and reports p50/p99 latency and throughput for both paths.
+
+    python eval/bench_query_embed.py --concurrency 32 --requests 2000 --window-ms 5
+"""
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend import embeddings  # noqa: E402
+
+QUESTIONS = [
+    "What is our refund policy?",
+    "Who approves travel expenses over 500 EUR?",
+    "How many vacation days do new hires get?",
+    "What is the API key rotation schedule?",
+    "Which laptop models are supported by IT?",
+    "What does policy FIN-204 say about invoices?",
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def run(embed_one, concurrency: int, n_requests: int) -> dict:
+    def one(i: int) -> float:
+        t0 = time.perf_counter()
+        embed_one(QUESTIONS[i % len(QUESTIONS)] + f" #{i}")
+        return (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - t0
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 99),
+        "qps": n_requests / wall,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--window-ms", type=float, default=embeddings.EMBED_BATCH_WINDOW_MS)
+    ap.add_argument("--max-batch", type=int, default=embeddings.EMBED_BATCH_MAX)
+    args = ap.parse_args()
+
+    embeddings.warm_up()
+    batcher = embeddings.EmbeddingBatcher(window_ms=args.window_ms, max_batch=args.max_batch)
+
+    results = {
+        "per-request encode": run(lambda q: embeddings.embed_texts([q])[0], args.concurrency, args.requests),
+        f"micro-batched ({args.window_ms:g} ms / {args.max_batch})": run(batcher.embed, args.concurrency, args.requests),
+    }
+
+    print(f"concurrency={args.concurrency} requests={args.requests}\n")
+    print(f"{'path':32} {'p50 ms':>8} {'p99 ms':>8} {'QPS':>8}")
+    for name, r in results.items():
+        print(f"{name:32} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['qps']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Search latency and failures before, during and after an online reindex of a
+tenant with another embedding model (backend/sharding.py move_tenant).
+
+Indexes --points chunks for one tenant with the current model, then keeps
+searching from a background thread, the way /chat/query does (question
+embedded with the tenant's model, search routed to that model's
+collection), while the tenant is reindexed. Reports p50/p99, failed
+searches and searches that found nothing in each phase, and the reindex
+throughput. Routes, chunk hashes and chunk texts go to temporary files.
+
+Without --model both models are a synthetic bag-of-words embedder (384-d
+and 256-d), so the run needs no model download; with --model the chunks
+really are re-embedded by sentence-transformers, from EMBED_MODEL to it.
+
+    python eval/bench_reindex.py                                     # in-process Qdrant
+    python eval/bench_reindex.py --model BAAI/bge-small-en-v1.5
+    VECTOR_STORE=local python eval/bench_reindex.py                  # LocalIndex
+"""
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+from backend import answer_cache, chunk_store, db, dedup, embeddings, qdrant_store, sharding  # noqa: E402
+from backend.local_index import LocalIndex  # noqa: E402
+from backend.models import User  # noqa: E402
+from backend.security import build_qdrant_security_filter  # noqa: E402
+from backend.sparse import sparse_doc_vector  # noqa: E402
+from backend.tenant_settings import init_tenant_settings  # noqa: E402
+
+WORDS = ("policy refund invoice approval travel expense laptop vacation payroll contract "
+         "onboarding security badge vendor budget audit employee manager quarterly report").split()
+SYNTHETIC_TARGET = "synthetic-256d"
+
+
+def synthetic_embed(texts: list[str], model: str | None = None) -> np.ndarray:
+    """Sum of a fixed random vector per word: similar texts get similar vectors, as with a real model."""
+    model = model or embeddings.EMBED_MODEL
+    dim = 256 if model == SYNTHETIC_TARGET else 384
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for word in text.split():
+            seed = int(hashlib.md5(f"{model}/{word}".encode()).hexdigest()[:8], 16)
+            out[i] += np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+
+def search_once(client, text: str) -> tuple[float, bool, bool]:
+    """One search as /chat/query runs it → (ms, failed, empty)."""
+    user = User(user_id=1, username="u", tenant_id="t1", role="admin", groups=[])
+    t0 = time.perf_counter()
+    try:
+        model = qdrant_store.tenant_model("t1")
+        vec = embeddings.embed_texts([text], model)[0].tolist()
+        hits = qdrant_store.search(client, vec, build_qdrant_security_filter(user), 6, query_text=text,
+                                   embed_model=model)
+        return (time.perf_counter() - t0) * 1000, False, not hits
+    except Exception as e:
+        print(f"search failed: {e!r}")
+        return (time.perf_counter() - t0) * 1000, True, False
+
+
+def p(latencies: list[float], q: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[int(q * (len(latencies) - 1))] if latencies else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, default=5000)
+    ap.add_argument("--words", type=int, default=60, help="words per chunk")
+    ap.add_argument("--queries", type=int, default=200, help="before and after the reindex")
+    ap.add_argument("--route-ttl", type=float, default=1.0, help="SHARD_ROUTE_TTL_S for the run")
+    ap.add_argument("--model", default="", help="reindex with this sentence-transformers model (default: synthetic)")
+    ap.add_argument("--dense", action="store_true", help="dense only (HYBRID_SEARCH=0)")
+    ap.add_argument("--qdrant-url", default="")
+    args = ap.parse_args()
+
+    random.seed(0)
+    texts = [" ".join(random.choices(WORDS, k=args.words)) + f" ref-{i}" for i in range(args.points)]
+    queries = [" ".join(random.choices(WORDS, k=4)) + f" ref-{random.randrange(args.points)}"
+               for _ in range(args.queries)]
+
+    os.environ["HYBRID_SEARCH"] = "0" if args.dense else "1"
+    os.environ["SHARD_ROUTE_TTL_S"] = str(args.route_ttl)
+    embeddings.CHUNK_EMBED_CACHE_MAX = 0  # every chunk really is re-embedded
+    if not args.model:
+        embeddings.embed_texts = synthetic_embed
+        sharding.embedding_size = lambda model=None: synthetic_embed([""], model).shape[1]
+    target = args.model or SYNTHETIC_TARGET
+    tmp = tempfile.mkdtemp(prefix="bench_reindex_")
+    db.DB_PATH = Path(tmp) / "app.db"
+    init_tenant_settings()
+    dedup.init_chunk_hashes()
+    answer_cache.init_answer_cache()
+    chunk_store._store = chunk_store.ChunkTextStore(os.path.join(tmp, "chunk_text.db"), chunk_store.CHUNK_TEXT_LRU)
+    if os.getenv("VECTOR_STORE") == "local":
+        client = LocalIndex(os.path.join(tmp, "index"))
+    elif args.qdrant_url:
+        client = QdrantClient(url=args.qdrant_url, api_key=os.getenv("QDRANT_API_KEY"), timeout=300)
+    else:
+        client = QdrantClient(":memory:")
+        os.environ["QDRANT_UPSERT_PARALLEL"] = "1"  # in-process Qdrant is not thread-safe
+    qdrant_store.COLLECTION = f"bench_reindex_{os.getpid()}"
+
+    try:
+        vectors = embeddings.embed_chunks(texts)
+        qdrant_store.ensure_collection(client, vectors.shape[1], "t1")
+        points, docs = [], {}
+        for i, (text, vec) in enumerate(zip(texts, vectors)):
+            doc_id, chunk_id = i // 20, i % 20
+            h = dedup.chunk_hash(text)
+            payload = {"tenant_id": "t1", "roles_allowed": ["admin"], "sensitive": False, "allowed_users": [],
+                       "allowed_groups": [], "doc_id": doc_id, "chunk_id": chunk_id, "title": f"doc {doc_id}",
+                       "content_hash": h}
+            pid = qdrant_store.point_id("t1", doc_id, chunk_id)
+            dense = vec.tolist()
+            vector = {"": dense, qdrant_store.SPARSE_VECTOR: sparse_doc_vector(text)} \
+                if qdrant_store.has_sparse_vectors("t1") else dense
+            points.append(models.PointStruct(id=pid, vector=vector, payload=payload))
+            docs.setdefault(doc_id, []).append(((chunk_id, h, "", pid), (chunk_id, h, text)))
+        for doc_id, rows in docs.items():
+            chunk_store.get_chunk_store().put_many("t1", doc_id, [stored for _, stored in rows])
+            dedup.record_chunks("t1", doc_id, [hashed for hashed, _ in rows])
+        qdrant_store.upsert_chunks(client, points, wait=True)
+
+        results = {"before": [], "during": [], "after": []}
+        for q in queries[:20]:
+            search_once(client, q)  # warm-up
+        results["before"] = [search_once(client, q) for q in queries]
+
+        done = threading.Event()
+
+        def searcher():
+            i = 0
+            while not done.is_set():
+                results["during"].append(search_once(client, queries[i % len(queries)]))
+                i += 1
+
+        thread = threading.Thread(target=searcher)
+        thread.start()
+        t0 = time.perf_counter()
+        try:
+            n = sharding.move_tenant(client, "t1", qdrant_store.SHARED, model=target)
+        finally:
+            done.set()
+            thread.join()
+        reindex_s = time.perf_counter() - t0
+        results["after"] = [search_once(client, q) for q in queries]
+
+        store = "local" if os.getenv("VECTOR_STORE") == "local" else args.qdrant_url or "in-process Qdrant"
+        print(f"\npoints={args.points} words/chunk={args.words} route_ttl={args.route_ttl}s "
+              f"retrieval={'dense' if args.dense else 'hybrid'} store={store}")
+        print(f"reindexed {embeddings.EMBED_MODEL if args.model else 'synthetic-384d'} -> {target}: {n} points "
+              f"in {reindex_s:.1f}s ({n / reindex_s:.0f} chunks/s, including 3 route waits)\n")
+        print(f"{'phase':8} {'searches':>9} {'p50 ms':>7} {'p99 ms':>7} {'failed':>7} {'empty':>6}")
+        for phase, runs in results.items():
+            latencies = [ms for ms, _, _ in runs]
+            print(f"{phase:8} {len(runs):>9} {p(latencies, 0.5):>7.2f} {p(latencies, 0.99):>7.2f} "
+                  f"{sum(failed for _, failed, _ in runs):>7} {sum(empty for _, _, empty in runs):>6}")
+    finally:
+        for name in {qdrant_store.COLLECTION, qdrant_store.shard_collection("t1", qdrant_store.SHARED, target)}:
+            if client.collection_exists(name):
+                client.delete_collection(name)
+        client.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
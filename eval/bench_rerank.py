@@ -0,0 +1,105 @@
+"""
+Added latency vs answer quality of the cross-encoder rerank stage, on
+eval/golden.json.
+
+Runs in-process against the same Qdrant collection and SQLite users as the
+API (index the golden test document first, e.g. with eval/run_eval.py).
+For every golden question it retrieves the vector top-k, and the
+over-fetched candidates reranked down to top-k (cold, then with cached
+scores), and checks whether the expected documents were retrieved and
+whether the expected keywords are in the context, or with --answers in the
+LLM's answer.
+
+    python eval/bench_rerank.py --candidates 24 --answers
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+load_dotenv(ROOT / ".env")
+
+from backend import rerank  # noqa: E402
+from backend.db import get_conn  # noqa: E402
+from backend.embeddings import embed_query  # noqa: E402
+from backend.models import User  # noqa: E402
+from backend.qdrant_store import bootstrap_schema, get_qdrant, search  # noqa: E402
+from backend.security import build_qdrant_security_filter  # noqa: E402
+
+GOLDEN_PATH = Path(__file__).parent / "golden.json"
+
+
+def load_user(username: str) -> User:
+    conn = get_conn()
+    row = conn.execute("SELECT * FROM users WHERE username=?", (username,)).fetchone()
+    conn.close()
+    return User(user_id=row["user_id"], username=username, tenant_id=row["tenant_id"],
+                role=row["role"], groups=json.loads(row["groups"] or "[]"))
+
+
+def retrieve(test: dict, mode: str, top_k: int, candidates: int, budget_ms: float):
+    user = load_user(test["username"])
+    q_vec = embed_query(test["question"])
+    q_filter = build_qdrant_security_filter(user)
+    qc = get_qdrant()
+
+    t0 = time.perf_counter()
+    if mode == "vector":
+        hits = search(qc, q_vec, q_filter, top_k=top_k, query_text=test["question"])
+    else:
+        hits = search(qc, q_vec, q_filter, top_k=max(top_k, candidates), query_text=test["question"])
+        hits = rerank.rerank(test["question"], hits, top_k, budget_ms=budget_ms)
+    return hits, (time.perf_counter() - t0) * 1000
+
+
+def grade(test: dict, hits: list, answers: bool) -> dict:
+    doc_ids = {int(h.payload["doc_id"]) for h in hits}
+    context = "\n\n---\n\n".join(h.payload["text"] for h in hits)
+    result = {
+        "docs": doc_ids == set(test["expected_doc_ids"]),
+        "context": all(kw.lower() in context.lower() for kw in test["expected_keywords"]),
+    }
+    if answers:
+        from backend.rag_llm import answer_from_context
+        answer = answer_from_context(test["question"], context or "NO_CONTEXT").lower()
+        result["answer"] = all(kw.lower() in answer for kw in test["expected_keywords"])
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--top-k", type=int, default=6)
+    ap.add_argument("--candidates", type=int, default=rerank.RERANK_CANDIDATES)
+    ap.add_argument("--budget-ms", type=float, default=rerank.RERANK_BUDGET_MS)
+    ap.add_argument("--answers", action="store_true", help="also generate answers with the local LLM")
+    args = ap.parse_args()
+
+    tests = json.loads(GOLDEN_PATH.read_text())
+    bootstrap_schema(get_qdrant())
+    rerank.get_reranker()  # load outside the timed region
+    for test in tests:
+        embed_query(test["question"])  # warm the embedder and the question cache
+
+    print(f"golden tests={len(tests)} top_k={args.top_k} candidates={args.candidates} budget={args.budget_ms:g}ms\n")
+    print(f"{'retrieval':20} {'avg ms':>7} {'p95 ms':>7} {'docs ok':>8} {'kw in ctx':>10} {'kw in answer':>13}")
+    for mode in ("vector", "rerank (cold)", "rerank (cached)"):
+        latencies, grades = [], []
+        for test in tests:
+            hits, ms = retrieve(test, mode, args.top_k, args.candidates, args.budget_ms)
+            latencies.append(ms)
+            grades.append(grade(test, hits, args.answers))
+        latencies.sort()
+        share = lambda key: f"{sum(g[key] for g in grades)}/{len(grades)}" if key in grades[0] else "-"
+        print(f"{mode:20} {statistics.mean(latencies):>7.1f} {latencies[int(0.95 * (len(latencies) - 1))]:>7.1f} "
+              f"{share('docs'):>8} {share('context'):>10} {share('answer'):>13}")
+    print(f"\nrerank stats: {rerank.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Per-tenant search latency with every tenant in the shared collection vs big
+tenants moved to dedicated collections (backend/sharding.py).
+
+Indexes synthetic points for one big tenant and --tenants small ones (the
+big tenant holds --big-share of the points) into the shared collection, and
+runs each tenant's searches through qdrant_store.search() with real security
+filters. Then the sharding policy moves every tenant with at least
+--min-points points to its own collection, online, and the same searches
+run again. Routes go to a temporary SQLite file, not backend/app.db.
+
+    python eval/bench_sharding.py                                   # in-process Qdrant
+    python eval/bench_sharding.py --qdrant-url http://localhost:6333
+    VECTOR_STORE=local python eval/bench_sharding.py                # LocalIndex
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+from backend import db, qdrant_store, sharding  # noqa: E402
+from backend.local_index import LocalIndex  # noqa: E402
+from backend.models import User  # noqa: E402
+from backend.security import build_qdrant_security_filter  # noqa: E402
+from backend.sparse import sparse_doc_vector  # noqa: E402
+from backend.tenant_settings import init_tenant_settings  # noqa: E402
+
+WORDS = ("policy refund invoice approval travel expense laptop vacation payroll contract "
+         "onboarding security badge vendor budget audit").split()
+
+
+def make_points(counts: dict[str, int], dim: int, rng: np.random.Generator):
+    centers = rng.standard_normal((32, dim)).astype(np.float32)
+    points, i = [], 0
+    for tenant_id, n in counts.items():
+        for _ in range(n):
+            vec = centers[i % 32] + 0.6 * rng.standard_normal(dim).astype(np.float32)
+            text = " ".join(random.choices(WORDS, k=12)) + f" ref-{i % 500}"
+            payload = {"tenant_id": tenant_id, "roles_allowed": ["admin", "member"], "sensitive": False,
+                       "allowed_users": [], "allowed_groups": [], "doc_id": i // 20, "chunk_id": i % 20,
+                       "title": f"doc {i // 20}", "text": text}
+            points.append(models.PointStruct(
+                id=i, vector={"": vec.tolist(), qdrant_store.SPARSE_VECTOR: sparse_doc_vector(text)}, payload=payload))
+            i += 1
+    return points, centers
+
+
+def run(client, queries, top_k: int) -> dict[str, tuple[list[float], list[list]]]:
+    out = {}
+    for tenant_id, vec, text in queries:
+        user = User(user_id=1, username="u", tenant_id=tenant_id, role="member", groups=[])
+        t0 = time.perf_counter()
+        hits = qdrant_store.search(client, vec, build_qdrant_security_filter(user), top_k, query_text=text,
+                                   with_payload=["tenant_id"])
+        ms = (time.perf_counter() - t0) * 1000
+        if any(h.payload["tenant_id"] != tenant_id for h in hits):
+            raise AssertionError(f"search for {tenant_id} returned another tenant's chunk")
+        latencies, results = out.setdefault(tenant_id, ([], []))
+        latencies.append(ms)
+        results.append([h.id for h in hits])
+    return out
+
+
+def p(latencies: list[float], q: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[int(q * (len(latencies) - 1))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, default=10000)
+    ap.add_argument("--tenants", type=int, default=4, help="small tenants next to the big one")
+    ap.add_argument("--big-share", type=float, default=0.8)
+    ap.add_argument("--min-points", type=int, default=2000, help="SHARD_DEDICATED_MIN_POINTS for the run")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=40, help="per tenant")
+    ap.add_argument("--top-k", type=int, default=6)
+    ap.add_argument("--dense", action="store_true", help="dense only (HYBRID_SEARCH=0)")
+    ap.add_argument("--qdrant-url", default="")
+    args = ap.parse_args()
+
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    big = int(args.points * args.big_share)
+    counts = {"big": big, **{f"small{i}": (args.points - big) // args.tenants for i in range(args.tenants)}}
+    points, centers = make_points(counts, args.dim, rng)
+    queries = [(tenant_id, (centers[i % 32] + 0.6 * rng.standard_normal(args.dim)).tolist(),
+                " ".join(random.choices(WORDS, k=3)) + f" ref-{i % 500}")
+               for i in range(args.queries) for tenant_id in counts]
+
+    os.environ["HYBRID_SEARCH"] = "0" if args.dense else "1"
+    os.environ["SHARD_ROUTE_TTL_S"] = "0"
+    tmp = tempfile.mkdtemp(prefix="bench_sharding_")
+    db.DB_PATH = Path(tmp) / "app.db"
+    init_tenant_settings()
+    if os.getenv("VECTOR_STORE") == "local":
+        client = LocalIndex(os.path.join(tmp, "index"))
+    elif args.qdrant_url:
+        client = QdrantClient(url=args.qdrant_url, api_key=os.getenv("QDRANT_API_KEY"))
+    else:
+        client = QdrantClient(":memory:")
+        os.environ["QDRANT_UPSERT_PARALLEL"] = "1"  # in-process Qdrant is not thread-safe
+    qdrant_store.COLLECTION = f"bench_sharding_{uuid.uuid4().hex[:8]}"
+    sharding.SHARD_DEDICATED_MIN_POINTS = args.min_points
+
+    try:
+        qdrant_store.ensure_collection(client, args.dim)
+        qdrant_store.upsert_chunks(client, points, wait=True)
+        run(client, queries[:len(counts)], args.top_k)  # warm-up
+        before = run(client, queries, args.top_k)
+
+        t0 = time.perf_counter()
+        for tenant_id, n in counts.items():
+            if sharding.wanted_shard(tenant_id, n, qdrant_store.SHARED) == qdrant_store.DEDICATED:
+                sharding.move_tenant(client, tenant_id, qdrant_store.DEDICATED)
+        move_s = time.perf_counter() - t0
+        run(client, queries[:len(counts)], args.top_k)
+        after = run(client, queries, args.top_k)
+
+        store = "local" if os.getenv("VECTOR_STORE") == "local" else args.qdrant_url or "in-process Qdrant"
+        print(f"points={args.points} tenants={len(counts)} queries/tenant={args.queries} top_k={args.top_k} "
+              f"retrieval={'dense' if args.dense else 'hybrid'} store={store}")
+        print(f"moved tenants with >= {args.min_points} points in {move_s:.1f}s\n")
+        print(f"{'tenant':8} {'points':>7} {'shard':10} {'p50 before':>11} {'p50 after':>10} "
+              f"{'p99 before':>11} {'p99 after':>10} {'same top-k':>11}")
+        for tenant_id, n in counts.items():
+            (lat_b, res_b), (lat_a, res_a) = before[tenant_id], after[tenant_id]
+            same = statistics.mean(len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(res_a, res_b))
+            print(f"{tenant_id:8} {n:>7} {qdrant_store.tenant_route(tenant_id)['shard']:10} "
+                  f"{p(lat_b, 0.5):>11.2f} {p(lat_a, 0.5):>10.2f} {p(lat_b, 0.99):>11.2f} {p(lat_a, 0.99):>10.2f} "
+                  f"{same:>11.1%}")
+        print("\n(latency in ms; with hybrid search BM25 IDF is per collection, so a move also shifts "
+              "the fused rankings of the tenants left in the shared one; dense results are unchanged)")
+    finally:
+        for tenant_id in counts:
+            collection = qdrant_store.tenant_collection(tenant_id)
+            if client.collection_exists(collection):
+                client.delete_collection(collection)
+        if client.collection_exists(qdrant_store.COLLECTION):
+            client.delete_collection(qdrant_store.COLLECTION)
+        client.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
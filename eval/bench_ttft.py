@@ -0,0 +1,111 @@
+"""
+Time to first token with and without KV reuse of the prompt prefix.
+
+Runs the local GGUF model in-process on one replica. Each synthetic context
+(a document from bench_chunking.make_corpus, cut to about --context-tokens)
+is asked two of its questions:
+
+- cold: the KV cache is cleared before every request, so the system prompt,
+  context and question are all evaluated (the behaviour without reuse)
+- warm prefix: a new context every request, only the system prompt is reused
+- hot context: the same context again with another question, only the
+  question is evaluated
+- interleaved: every context once, then every context again; the second pass
+  restores the context from the prompt cache when LLM_PROMPT_CACHE_MB is set,
+  otherwise it behaves like warm prefix
+
+    LLM_PROMPT_CACHE_MB=2048 python eval/bench_ttft.py --contexts 6
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+load_dotenv(ROOT / ".env")
+
+from bench_chunking import make_corpus  # noqa: E402
+from backend import llm_llamacpp, rag_llm  # noqa: E402
+
+
+def make_contexts(n: int, context_tokens: int) -> list[tuple[str, list[str]]]:
+    docs, facts = make_corpus(n, 40)
+    contexts = []
+    for d, doc in enumerate(docs):
+        kept = []
+        for paragraph in doc[0].split("\n\n"):
+            if rag_llm.count_tokens("\n\n".join(kept + [paragraph])) > context_tokens:
+                break
+            kept.append(paragraph)
+        questions = [q for q, fact in facts[d * 40:(d + 1) * 40] if any(fact in p for p in kept)]
+        contexts.append(("\n\n".join(kept), questions[:2]))
+    return contexts
+
+
+def ttft(llm, question: str, context: str, cold: bool) -> float:
+    if cold:
+        llm.reset()
+    t0 = time.perf_counter()
+    stream = llm.create_chat_completion(messages=rag_llm._build_messages(question, context),
+                                        max_tokens=8, temperature=0.1, stream=True)
+    first = None
+    for chunk in stream:
+        if first is None and chunk["choices"][0]["delta"].get("content"):
+            first = time.perf_counter()
+    return ((first or time.perf_counter()) - t0) * 1000
+
+
+def run(name: str, backend, llm, requests: list[tuple[str, str, bool]], measured: set[int]):
+    before = backend.stats()
+    times = []
+    for i, (question, context, cold) in enumerate(requests):
+        ms = ttft(llm, question, context, cold)
+        if i in measured:
+            times.append(ms)
+    after = backend.stats()
+    prompt = after["prompt_tokens"] - before["prompt_tokens"]
+    evaluated = after["evaluated_tokens"] - before["evaluated_tokens"]
+    restores = after["context_cache_hits"] - before["context_cache_hits"]
+    print(f"{name:14} {statistics.mean(times):>8.0f} {statistics.median(times):>8.0f} "
+          f"{prompt / len(requests):>11.0f} {evaluated / len(requests):>10.0f} {restores:>9}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--contexts", type=int, default=6)
+    ap.add_argument("--context-tokens", type=int, default=rag_llm.CONTEXT_MAX_TOKENS)
+    args = ap.parse_args()
+
+    if rag_llm.LLM_MODE != "local_llamacpp":
+        sys.exit("bench_ttft measures the in-process model: set LLM_MODE=local_llamacpp")
+    backend = rag_llm.get_backend()
+    llm = backend.replicas[0]
+    contexts = make_contexts(args.contexts, args.context_tokens)
+    saved_cache = llm.cache
+
+    print(f"contexts={len(contexts)} context_tokens~{args.context_tokens} n_threads={llm_llamacpp.LLM_N_THREADS} "
+          f"prompt_cache={llm_llamacpp.LLM_PROMPT_CACHE_MB}MB\n")
+    print(f"{'mode':14} {'avg ms':>8} {'p50 ms':>8} {'prompt tok':>11} {'eval tok':>10} {'restores':>9}")
+
+    llm.cache = None  # cold means nothing to restore either
+    run("cold", backend, llm, [(qs[0], ctx, True) for ctx, qs in contexts], set(range(len(contexts))))
+    llm.cache = saved_cache
+
+    llm.reset()
+    backend.prime(llm, rag_llm._build_messages("", ""))
+    run("warm prefix", backend, llm, [(qs[0], ctx, False) for ctx, qs in contexts], set(range(len(contexts))))
+
+    hot = [(q, ctx, False) for ctx, qs in contexts for q in qs[:2]]
+    run("hot context", backend, llm, hot, set(range(1, len(hot), 2)))
+
+    interleaved = [(qs[0], ctx, False) for ctx, qs in contexts] + [(qs[-1], ctx, False) for ctx, qs in contexts]
+    run("interleaved", backend, llm, interleaved, set(range(len(contexts), len(interleaved))))
+    print("\n(prompt/eval tok: average per request in the mode, including unmeasured warm-up requests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Ingest upsert throughput (chunks/sec): one big upsert vs batched, parallel,
+retrying upserts.
+
+Runs against a local stand-in for Qdrant's upsert endpoint that adds a fixed
+round-trip delay, a per-point processing cost and an optional transient
+failure rate, so the effect of batching, parallelism and retries is visible
+without a real cluster.
+
+    python eval/bench_upsert.py --chunks 2000 --rtt-ms 40 --fail-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from qdrant_client import models  # noqa: E402
+
+SETTINGS = {"rtt_s": 0.04, "per_point_s": 0.0002, "fail_rate": 0.0}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_PUT(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        n = len(body.get("points", []))
+        time.sleep(SETTINGS["rtt_s"] + n * SETTINGS["per_point_s"])
+        if random.random() < SETTINGS["fail_rate"]:
+            self._reply(503, {"status": {"error": "transient"}, "time": 0.0})
+        else:
+            self._reply(200, {"result": {"operation_id": 1, "status": "completed"}, "status": "ok", "time": 0.0})
+
+    def _reply(self, code: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_points(n: int) -> list[models.PointStruct]:
+    vecs = np.random.default_rng(0).standard_normal((n, 384)).astype(np.float32)
+    return [
+        models.PointStruct(id=i, vector=v.tolist(), payload={"tenant_id": "t1", "doc_id": 1, "chunk_id": i, "text": "x" * 900})
+        for i, v in enumerate(vecs)
+    ]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=2000)
+    ap.add_argument("--rtt-ms", type=float, default=40)
+    ap.add_argument("--fail-rate", type=float, default=0.05)
+    args = ap.parse_args()
+    SETTINGS.update(rtt_s=args.rtt_ms / 1000, fail_rate=args.fail_rate)
+    random.seed(0)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["QDRANT_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.setdefault("QDRANT_API_KEY", "bench")
+    warnings.filterwarnings("ignore", message="Api key is used with an insecure connection")
+
+    from backend import qdrant_store
+    client = qdrant_store.get_qdrant()
+    points = make_points(args.chunks)
+
+    def single_call():
+        # Old behaviour: everything in one request, no retry
+        client.upsert(collection_name=qdrant_store.COLLECTION, points=points)
+
+    def configured(batch: int, parallel: int):
+        def run():
+            os.environ["QDRANT_UPSERT_BATCH"] = str(batch)
+            os.environ["QDRANT_UPSERT_PARALLEL"] = str(parallel)
+            qdrant_store.upsert_chunks(client, points)
+        return run
+
+    scenarios = {
+        "single upsert (old)": single_call,
+        "batch=64 parallel=1": configured(64, 1),
+        "batch=64 parallel=4": configured(64, 4),
+        "batch=32 parallel=8": configured(32, 8),
+    }
+
+    print(f"chunks={args.chunks} rtt={args.rtt_ms:g}ms fail_rate={args.fail_rate:g}\n")
+    print(f"{'scenario':24} {'seconds':>8} {'chunks/s':>9}  result")
+    for name, run in scenarios.items():
+        t0 = time.perf_counter()
+        try:
+            run()
+            result = "ok"
+        except Exception as e:
+            result = f"FAILED ({type(e).__name__})"
+        dt = time.perf_counter() - t0
+        print(f"{name:24} {dt:>8.2f} {args.chunks / dt:>9.0f}  {result}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Recall@k and latency of dense-only vs hybrid (dense + BM25, RRF) retrieval.
+
+Indexes a synthetic handbook, one paragraph per point, where each paragraph
+holds one fact about a cost center ("The approval limit for cost center
+CC-17 is 4200 dollars...") among near-identical filler. Two query sets:
+natural questions, and bare identifiers ("CC-17 approval limit") of the
+kind dense embeddings tend to miss. A query is recalled when the paragraph
+with its fact is in the top k. Searches go through qdrant_store.search()
+with a real security filter. Needs the embedding model.
+
+    python eval/eval_hybrid.py                    # in-process Qdrant (recall only)
+    python eval/eval_hybrid.py --qdrant-url http://localhost:6333   # latency too
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+from bench_chunking import make_corpus  # noqa: E402
+from backend import qdrant_store  # noqa: E402
+from backend.embeddings import embed_texts  # noqa: E402
+from backend.models import User  # noqa: E402
+from backend.security import build_qdrant_security_filter  # noqa: E402
+from backend.sparse import sparse_doc_vector  # noqa: E402
+
+USER = User(user_id=1, username="eval", tenant_id="eval", role="member", groups=[])
+
+
+def index(client: QdrantClient, paragraphs: list[str]):
+    vectors = embed_texts(paragraphs)
+    qdrant_store.ensure_collection(client, vectors.shape[1])
+    points = [
+        models.PointStruct(
+            id=i,
+            vector={"": vec.tolist(), qdrant_store.SPARSE_VECTOR: sparse_doc_vector(text)},
+            payload={"tenant_id": USER.tenant_id, "roles_allowed": ["member"], "sensitive": False,
+                     "allowed_users": [], "allowed_groups": [], "text": text},
+        )
+        for i, (text, vec) in enumerate(zip(paragraphs, vectors))
+    ]
+    qdrant_store.upsert_chunks(client, points, wait=True)
+
+
+def evaluate(client: QdrantClient, queries: list[tuple[str, int]], top_k: int) -> tuple[float, float, float]:
+    q_filter = build_qdrant_security_filter(USER)
+    q_vectors = embed_texts([q for q, _ in queries])
+    hits, latencies = 0, []
+    for (question, target), vec in zip(queries, q_vectors):
+        t0 = time.perf_counter()
+        points = qdrant_store.search(client, vec.tolist(), q_filter, top_k, query_text=question)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += any(p.id == target for p in points)
+    latencies.sort()
+    return hits / len(queries), statistics.median(latencies), latencies[int(0.95 * (len(latencies) - 1))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=10)
+    ap.add_argument("--paragraphs", type=int, default=30)
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--qdrant-url", default="")
+    args = ap.parse_args()
+
+    client = QdrantClient(url=args.qdrant_url, api_key=os.getenv("QDRANT_API_KEY")) if args.qdrant_url else QdrantClient(":memory:")
+    qdrant_store.COLLECTION = f"eval_hybrid_{uuid.uuid4().hex[:8]}"
+
+    docs, facts = make_corpus(args.docs, args.paragraphs)
+    paragraphs = [p for doc in docs for page in doc for p in page.split("\n\n")]
+    assert all(fact in p for p, (_, fact) in zip(paragraphs, facts))  # one fact per paragraph, same order
+    questions = [(q, i) for i, (q, _) in enumerate(facts)]
+    identifiers = [(q.split("cost center ")[1].rstrip("?") + " approval limit", i) for i, (q, _) in enumerate(facts)]
+
+    try:
+        index(client, paragraphs)
+        print(f"points={len(paragraphs)} top_k={args.top_k} qdrant={args.qdrant_url or 'in-process'}\n")
+        print(f"{'queries':14} {'retrieval':10} {'recall@k':>9} {'p50 ms':>7} {'p95 ms':>7}")
+        for name, queries in [("questions", questions), ("identifiers", identifiers)]:
+            for mode in ("dense", "hybrid"):
+                os.environ["HYBRID_SEARCH"] = "1" if mode == "hybrid" else "0"
+                recall, p50, p95 = evaluate(client, queries, args.top_k)
+                print(f"{name:14} {mode:10} {recall:>9.1%} {p50:>7.1f} {p95:>7.1f}")
+    finally:
+        client.delete_collection(qdrant_store.COLLECTION)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import json
 import requests
 import os
+import time
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -79,9 +80,20 @@ def main():
         },
         headers={"Authorization": f"Bearer {test_token}"}
     )
-    if test_upload.status_code != 200:
+    if not test_upload.ok:
         print(f"Failed to upload test doc: {test_upload.text}")
         return
+
+    # Ingest runs in the background: wait for the job to finish
+    job_id = test_upload.json()["job_id"]
+    while True:
+        job = requests.get(f"{API}/documents/jobs/{job_id}", headers={"Authorization": f"Bearer {test_token}"}).json()
+        if job["status"] == "failed":
+            print(f"Failed to index test doc: {job['error']}")
+            return
+        if job["status"] == "done":
+            break
+        time.sleep(0.5)
     
     print("✅ Test document uploaded\n")
     
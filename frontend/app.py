@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import json
+import time
 
 API = "http://localhost:8000"
 
@@ -14,6 +15,24 @@ def auth_headers():
     t = st.session_state.get("token")
     return {"Authorization": f"Bearer {t}"} if t else {}
 
+def wait_for_ingest_job(job_id: str):
+    """Poll the background ingest job and show its progress until it finishes."""
+    bar = st.progress(0.0, text="Queued...")
+    while True:
+        r = requests.get(f"{API}/documents/jobs/{job_id}", headers=auth_headers())
+        if r.status_code != 200:
+            st.error(r.json().get("detail", r.text))
+            return
+        job = r.json()
+        bar.progress(job["progress"], text=f"{job['stage']} ({job['chunks_done']}/{job['chunks_total']} chunks)")
+        if job["status"] == "done":
+            st.success(f"✅ Indexed {job['chunks_done']} chunks from {job['title']} (doc_id {job['doc_id']})")
+            return
+        if job["status"] == "failed":
+            st.error(f"❌ Ingest failed: {job['error']}")
+            return
+        time.sleep(0.5)
+
 def get_user_info():
     """Decode basic user info from token for UI display."""
     if "token" not in st.session_state:
@@ -91,7 +110,7 @@ elif "token" in st.session_state:
             
             if st.button("🚀 Ingest URL", type="primary"):
                 if title and url:
-                    with st.spinner("Extracting text..."):
+                    with st.spinner("Queueing URL..."):
                         r = requests.post(
                             f"{API}/documents/upload_url",
                             params={
@@ -104,8 +123,8 @@ elif "token" in st.session_state:
                             },
                             headers=auth_headers(),
                         )
-                    if r.status_code == 200:
-                        st.success(r.json())
+                    if r.ok:
+                        wait_for_ingest_job(r.json()["job_id"])
                     else:
                         st.error(r.json().get("detail", r.text))
 
@@ -122,7 +141,7 @@ elif "token" in st.session_state:
                 sensitive = st.checkbox("🔒 Sensitive")
             
             if uploaded_file and title and st.button("🚀 Upload PDF", type="primary"):
-                with st.spinner("Processing PDF..."):
+                with st.spinner("Uploading PDF..."):
                     files = {"file": uploaded_file.getvalue()}
                     data = {
                         "title": title,
@@ -137,8 +156,8 @@ elif "token" in st.session_state:
                         data=data,
                         headers=auth_headers()
                     )
-                if r.status_code == 200:
-                    st.success(r.json())
+                if r.ok:
+                    wait_for_ingest_job(r.json()["job_id"])
                 else:
                     st.error(r.json().get("detail", r.text))
 
@@ -162,24 +181,36 @@ elif "token" in st.session_state:
                 st.markdown(prompt)
             
             with st.chat_message("assistant"):
-                with st.spinner("Searching secure documents..."):
-                    r = requests.post(
-                        f"{API}/chat/query",
+                citations = []
+
+                def answer_tokens():
+                    """Read the NDJSON stream: citations first, then answer tokens."""
+                    with requests.post(
+                        f"{API}/chat/stream",
                         json={"question": prompt},
-                        headers=auth_headers()
-                    )
-                
-                if r.status_code == 200:
-                    data = r.json()
-                    st.markdown(data["answer"])
+                        headers=auth_headers(),
+                        stream=True,
+                    ) as r:
+                        r.raise_for_status()
+                        for line in r.iter_lines():
+                            if not line:
+                                continue
+                            event = json.loads(line)
+                            if event["type"] == "citations":
+                                citations.extend(event["citations"])
+                            elif event["type"] == "token":
+                                yield event["text"]
+
+                try:
+                    answer = st.write_stream(answer_tokens())
                     
                     msg = {
                         "role": "assistant", 
-                        "content": data["answer"],
-                        "citations": data["citations"]
+                        "content": answer,
+                        "citations": citations
                     }
                     st.session_state.messages.append(msg)
-                else:
+                except requests.RequestException:
                     st.error("Chat failed")
                     st.session_state.messages.append({"role": "assistant", "content": "Error"})
             
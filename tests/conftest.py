@@ -0,0 +1,59 @@
+"""
+Backend fixtures: a temporary SQLite database and chunk store, an in-process
+Qdrant and a deterministic stand-in for the embedding model, so the tests
+need neither a Qdrant server nor a model download.
+"""
+import hashlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+_tmp = tempfile.mkdtemp(prefix="rag_tests_")
+os.environ.setdefault("CHUNK_EMBED_CACHE_DB", os.path.join(_tmp, "chunk_embeddings.db"))
+os.environ.setdefault("CHUNK_STORE_DB", os.path.join(_tmp, "chunk_text.db"))
+os.environ["CHUNKER"] = "chars"  # the token chunker needs the model's tokenizer
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "")
+os.environ["QDRANT_UPSERT_PARALLEL"] = "1"  # the in-process Qdrant is not thread-safe
+
+from qdrant_client import QdrantClient  # noqa: E402
+from backend import answer_cache, chunk_store, db, dedup, embeddings, qdrant_store  # noqa: E402
+from backend.tenant_settings import init_tenant_settings  # noqa: E402
+
+
+def fake_embed(texts: list[str], model: str | None = None) -> np.ndarray:
+    """A fixed random unit vector per (model, text); 256-d for models named "*-256d", 384-d otherwise."""
+    model = model or embeddings.EMBED_MODEL
+    dim = 256 if model.endswith("-256d") else 384
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        seed = int(hashlib.md5(f"{model}/{text}".encode()).hexdigest()[:8], 16)
+        vec = np.random.default_rng(seed).standard_normal(dim)
+        out[i] = vec / np.linalg.norm(vec)
+    return out
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    """Fresh database, chunk store and Qdrant for one test; yields the Qdrant client."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "app.db")
+    monkeypatch.setattr(embeddings, "embed_texts", fake_embed)
+    monkeypatch.setattr(embeddings, "embedding_size", lambda model=None: fake_embed([""], model).shape[1])
+    monkeypatch.setattr(chunk_store, "_store", chunk_store.ChunkTextStore(str(tmp_path / "chunk_text.db"), 100))
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "_client", client)
+    monkeypatch.setattr(qdrant_store, "COLLECTION", f"test_{tmp_path.name}")
+    for name in ("_ready_collections", "_sparse_collections", "_quantized_collections", "_routes"):
+        monkeypatch.setattr(qdrant_store, name, type(getattr(qdrant_store, name))())
+    monkeypatch.setattr(qdrant_store, "_routes_read_at", float("-inf"))
+    db.init_db()
+    init_tenant_settings()
+    dedup.init_chunk_hashes()
+    answer_cache.init_answer_cache()
+    yield client
+    client.close()
@@ -0,0 +1,45 @@
+import pytest
+
+from backend import embeddings, ingest, qdrant_store
+from backend.chunk_store import ChunkTextStore, get_chunk_store
+from backend.embed_cache import cache_key
+from backend.models import User
+from backend.security import build_qdrant_security_filter
+
+ADMIN = User(user_id=1, username="admin", tenant_id="t1", role="admin", groups=[])
+MEMBER = User(user_id=2, username="member", tenant_id="t1", role="member", groups=[])
+
+
+def _search(client, user: User, text: str) -> list:
+    vec = embeddings.embed_texts([text], qdrant_store.tenant_model(user.tenant_id))[0].tolist()
+    return qdrant_store.search(client, vec, build_qdrant_security_filter(user), 5)
+
+
+def test_failed_replace_does_not_serve_new_text_through_old_points(backend, monkeypatch):
+    doc_id, _, _ = ingest.ingest_document_for_user(
+        ADMIN, "handbook", ["admin", "member"], "pdf", "handbook.pdf", "public holiday list", False, 10)
+    assert [h.payload["text"] for h in _search(backend, MEMBER, "public holiday list")] == ["public holiday list"]
+
+    def failing_upsert(*args, **kwargs):
+        raise RuntimeError("qdrant unavailable")
+
+    monkeypatch.setattr(ingest, "upsert_chunks", failing_upsert)
+    with pytest.raises(RuntimeError):
+        ingest.ingest_document_for_user(ADMIN, "handbook", ["admin"], "pdf", "handbook.pdf", "board salaries",
+                                        False, 10, doc_id=doc_id)
+
+    # The old point, still visible to members, must not serve the admin-only replacement text,
+    # whether its old text is still cached in this worker or not
+    get_chunk_store()._lru.clear()
+    hits = _search(backend, MEMBER, "public holiday list") + _search(backend, MEMBER, "board salaries")
+    assert "board salaries" not in [h.payload["text"] for h in hits]
+
+
+def test_text_of_another_version_is_left_out(tmp_path):
+    store = ChunkTextStore(str(tmp_path / "chunk_text.db"), 10)
+    store.put_many("t1", 1, [(0, cache_key("m", "old"), "old")])
+    store.put_many("t1", 1, [(0, cache_key("m", "new"), "new")])
+    assert store.get_many([(1, 0, cache_key("m", "old"))]) == {}
+    # a point of another model's index: its hash is checked against the text
+    assert store.get_many([(1, 0, cache_key("m2", "new"))], "m2") == {(1, 0): "new"}
+    assert store.stats()["stale"] == 1
@@ -0,0 +1,12 @@
+import numpy as np
+
+from backend.embed_cache import QueryEmbeddingCache
+
+
+def test_cached_vectors_own_their_data():
+    cache = QueryEmbeddingCache("m", max_entries=10)
+    batch = np.ones((32, 64), dtype=np.float32)
+    cache.put("q", batch[3])
+    cached = cache.get("q")
+    assert cached.base is None
+    assert cache.stats()["memory_bytes"] == batch[3].nbytes
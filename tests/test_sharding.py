@@ -0,0 +1,59 @@
+import pytest
+
+from backend import ingest, sharding
+from backend.models import User
+from backend.qdrant_store import DEDICATED, SHARED, set_tenant_route, tenant_route, write_indexes
+
+ADMIN = User(user_id=1, username="admin", tenant_id="t1", role="admin", groups=[])
+
+
+@pytest.fixture
+def indexed(backend, monkeypatch):
+    monkeypatch.setenv("SHARD_ROUTE_TTL_S", "0")
+    ingest.ingest_document_for_user(ADMIN, "handbook", ["admin"], "pdf", "handbook.pdf",
+                                    "public holiday list. " * 200, False, 50)
+    return backend
+
+
+def test_claimed_move(indexed):
+    assert sharding.claimed_move(indexed, "t1", DEDICATED) == sharding.tenant_points(indexed, "t1") > 0
+    route = tenant_route("t1")
+    assert (route["shard"], route["migrating_to"], route.get("claimed_by")) == (DEDICATED, None, None)
+
+
+def test_failed_move_sends_writes_back_and_can_run_again(indexed, monkeypatch):
+    def failing_copy(*args, **kwargs):
+        raise RuntimeError("qdrant unavailable")
+
+    claim = sharding.claim_move("t1")
+    with monkeypatch.context() as m:
+        m.setattr(sharding, "_copy", failing_copy)
+        with pytest.raises(RuntimeError):
+            sharding.move_tenant(indexed, "t1", DEDICATED, claim=claim)
+    sharding.release_move("t1", claim)
+
+    assert tenant_route("t1")["migrating_to"] is None
+    assert len(write_indexes("t1")) == 1
+    assert sharding.claimed_move(indexed, "t1", DEDICATED) > 0
+
+
+def test_cli_skips_a_tenant_claimed_elsewhere(indexed):
+    claim = sharding.claim_move("t1")
+    assert sharding.claim_move("t1") is None
+    assert sharding.claimed_move(indexed, "t1", DEDICATED) is None
+    assert tenant_route("t1")["shard"] == SHARED
+    sharding.release_move("t1", claim)
+    assert sharding.claim_move("t1") is not None
+
+
+def test_move_of_a_dead_worker_is_taken_over_once_its_claim_expires(indexed, monkeypatch):
+    claim = sharding.claim_move("t1")
+    set_tenant_route("t1", SHARED, migrating_to=DEDICATED, claimed_by=claim)  # the worker died here
+    assert sharding.claim_move("t1") is None
+    monkeypatch.setattr(sharding, "MOVE_CLAIM_TTL_S", -1)
+    takeover = sharding.claim_move("t1")
+    assert takeover is not None
+    with pytest.raises(RuntimeError):
+        sharding.move_tenant(indexed, "t1", DEDICATED, claim=claim)
+    assert sharding.move_tenant(indexed, "t1", DEDICATED, claim=takeover) > 0
+    assert tenant_route("t1")["shard"] == DEDICATED